@@ -1,37 +1,102 @@
 import os
 import re
+import itertools
 from dotenv import load_dotenv
 import time
+from typing import TYPE_CHECKING
 import pandas as pd
-import google.generativeai as genai
 
 load_dotenv()
 
-from file_handler import read_data_file
+from file_handler import read_data_file, read_data_file_chunks, COLUMNAR_EXTENSIONS
 from database_manager import DatabaseManager
-from image_extractor import ImageHandler 
-from paragraph_handler import ParagraphHandler
-from sql_assistant_gui import SQLAssistantGUI
+from nl_query_cache import NLQueryCache
+from llm_executor import LLMExecutor, LLMJobCancelled
+from batch_image_extractor import BatchImageExtractor
+from table_copier import BatchedTableCopier
+from directory_ingest import DirectoryIngestor
+from incremental_loader import IncrementalLoader
+from exporter import BackgroundExporter, iter_dataframe_batches, iter_sqlite_batches
+from llm_backends import create_model_backend, is_offline_backend
+from metrics import METRICS, span
+from virtual_table import IteratorRowSource
+
+if TYPE_CHECKING:
+    # Only the annotation needs it; the headless runner drives SQLAssistant on machines without Tk.
+    from sql_assistant_gui import SQLAssistantGUI
+
+STREAMING_INGEST_THRESHOLD_BYTES = int(os.getenv("STREAMING_INGEST_THRESHOLD_MB", "100")) * 1024 * 1024
+MOVE_BATCH_ROWS = int(os.getenv("MOVE_BATCH_ROWS", "50000"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "0")) or None
+AUTO_SAVE_RESULTS = os.getenv("AUTO_SAVE_RESULTS", "1").strip().lower() in ("1", "true", "yes")
+AUTO_SAVE_FORMAT = os.getenv("AUTO_SAVE_FORMAT", "csv").strip().lstrip(".")
+STREAM_LLM_TABLES = os.getenv("LLM_STREAM_RESULTS", "1").strip().lower() in ("1", "true", "yes")
 
 class SQLAssistant:
-    def __init__(self, gui: SQLAssistantGUI, db_name="assistant_db.sqlite"):
+    def __init__(self, gui: "SQLAssistantGUI", db_name="assistant_db.sqlite"):
         self.gui = gui
         self.db_mgr = DatabaseManager(db_name)
-        self.image_handler = None
-        self.paragraph_handler = None
-        self.text_to_sql_model = None
-        self._init_llm_handlers()
-
-    def _init_llm_handlers(self):
+        self.nl_cache = NLQueryCache(self.db_mgr)
+        self._image_handler = None
+        self._paragraph_handler = None
+        self._text_to_sql_model = None
+        self.llm = LLMExecutor(
+            max_workers=int(os.getenv("LLM_MAX_WORKERS", "4")),
+            timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", "90")),
+            retries=int(os.getenv("LLM_RETRIES", "2")),
+            on_change=lambda count: self._refresh_active_work(),
+        )
+        self.db_mgr.on_query_change = lambda running: self._refresh_active_work()
+        self.gui.cancel_callback = self._cancel_background_work
+        self._job_finishers = {}
+        self._active_batch = None
+        self._batch_images_left = 0
+        self.copier = BatchedTableCopier(self.db_mgr, batch_size=MOVE_BATCH_ROWS)
+        self._active_copy = False
+        self.ingestor = DirectoryIngestor(self.db_mgr, max_workers=INGEST_WORKERS)
+        self._active_ingest = False
+        self.incremental_loader = IncrementalLoader(self.db_mgr)
+        self.exporter = BackgroundExporter(on_change=lambda count: self._refresh_active_work())
+        self.gui.exporter = self.exporter
+
+    # Model clients (and PIL / the Gemini SDK behind them) are built on first use, not at startup.
+    @property
+    def image_handler(self):
         image_api_key = os.getenv("IMAGE_GOOGLE_API_KEY")
-        if image_api_key:
-            self.image_handler = ImageHandler(api_key=image_api_key)
-        
+        if self._image_handler is None and (image_api_key or is_offline_backend()):
+            from image_extractor import ImageHandler
+
+            self._image_handler = ImageHandler(api_key=image_api_key)
+        return self._image_handler
+
+    @property
+    def paragraph_handler(self):
         text_api_key = os.getenv("GOOGLE_API_KEY")
-        if text_api_key:
-            genai.configure(api_key=text_api_key)
-            self.paragraph_handler = ParagraphHandler(api_key=text_api_key)
-            self.text_to_sql_model = genai.GenerativeModel("gemini-1.5-flash")
+        if self._paragraph_handler is None and (text_api_key or is_offline_backend()):
+            from paragraph_handler import ParagraphHandler
+
+            self._paragraph_handler = ParagraphHandler(api_key=text_api_key)
+        return self._paragraph_handler
+
+    @property
+    def text_to_sql_model(self):
+        text_api_key = os.getenv("GOOGLE_API_KEY")
+        if self._text_to_sql_model is None and (text_api_key or is_offline_backend()):
+            self._text_to_sql_model = create_model_backend("gemini-1.5-flash", text_api_key)
+        return self._text_to_sql_model
+
+    def _refresh_active_work(self):
+        self.gui.set_active_jobs(len(self.llm.active_jobs()) + int(self.db_mgr.query_running) + int(self._active_copy)
+                                 + int(self._active_ingest) + self.exporter.active + self._batch_images_left)
+
+    def _cancel_background_work(self):
+        self.db_mgr.cancel_query()
+        self.copier.cancel()
+        self.ingestor.cancel()
+        self.exporter.cancel()
+        self.llm.cancel_all()
+        if self._active_batch:
+            self._active_batch.cancel()
 
     def run(self):
         self.gui.display_message("Welcome!", "👋 SQL Assistant Starting Up!", symbol="🤖")
@@ -39,7 +104,6 @@ class SQLAssistant:
             self.gui.display_message("Error", "❌ Oh no! I couldn't connect to the database.", symbol="🚨")
             return
         
-        time.sleep(1.5)
         try:
             while True:
                 choice = self.gui.prompt_for_menu_choice("Main Menu", "What would you like to do?", self.main_menu_options)
@@ -47,18 +111,26 @@ class SQLAssistant:
                     break
                 self._process_choice(choice)
         finally:
+            self.llm.shutdown()
+            self.exporter.shutdown(wait=True)
             self.db_mgr.close()
             self.gui.display_message("Goodbye!", "Talk to you later! 👋", symbol="🚪")
-            time.sleep(2)
-            self.gui.root.quit()
+            self.gui.shutdown()
 
     @property
     def main_menu_options(self):
+        ready = len([job for job in self.llm.finished_jobs() if job in self._job_finishers])
+        running = len([job for job in self.llm.active_jobs() if job in self._job_finishers])
         return [
             {"value": "1", "text": "📄 Scan File (CSV/Excel)"}, {"value": "2", "text": "🖼️ Extract Table from Image"},
             {"value": "3", "text": "🗣️ Chat with Data (Natural Language Query)"}, {"value": "4", "text": "↔️ Move/Copy Data Between Tables"},
             {"value": "5", "text": "📝 Create Table from Paragraph"}, {"value": "6", "text": "📋 List All Tables"},
-            {"value": "7", "text": "💻 Execute Custom SQL Query"}, {"value": "0", "text": "🚪 Exit"}
+            {"value": "7", "text": "💻 Execute Custom SQL Query"},
+            {"value": "8", "text": f"📥 Review Background Extractions ({ready} ready, {running} running)"},
+            {"value": "9", "text": "🗂️ Batch Extract Tables from Images"}, {"value": "10", "text": "📈 Performance Metrics"},
+            {"value": "11", "text": "🧭 Index Advisor Report"}, {"value": "12", "text": "🗃️ Bulk Ingest Directory"},
+            {"value": "13", "text": "🔄 Incremental Refresh (skip unchanged files)"},
+            {"value": "0", "text": "🚪 Exit"}
         ]
         
     def _process_choice(self, choice):
@@ -73,11 +145,16 @@ class SQLAssistant:
         elif choice == '5': self._handle_paragraph_to_table()
         elif choice == '6': self._list_all_tables()
         elif choice == '7': self._handle_custom_sql()
+        elif choice == '8': self._handle_background_jobs()
+        elif choice == '9': self._handle_batch_image_to_table()
+        elif choice == '10': self._handle_metrics()
+        elif choice == '11': self._handle_index_advisor()
+        elif choice == '12': self._handle_bulk_ingest()
+        elif choice == '13': self._handle_incremental_refresh()
         else:
             self.gui.display_message("Invalid Choice", "Please select a valid option from the menu.", symbol="❓")
 
         if needs_return_prompt:
-            self.gui.root.update_idletasks()
             self.gui.prompt_for_menu_choice("Action Complete", "Press button to return to Main Menu.", [{"value": "ok", "text": "Return to Menu"}])
 
     def _sanitize_table_name(self, raw_name, default_suggestion="new_table"):
@@ -85,36 +162,54 @@ class SQLAssistant:
         if not final_name: final_name = default_suggestion
         return final_name
         
-    def _offer_download(self, df: pd.DataFrame, filename: str):
-        if df is not None and not df.empty:
-            try:
-                output_filename = f"{filename}.csv"
-                df.to_csv(output_filename, index=False)
-                self.gui.update_status(f"Success! Full table also saved as {output_filename}")
-            except Exception as e:
-                self.gui.update_status(f"Could not save file: {e}")
+    def export_source(self, df, sql_query=None, params=None):
+        # A capped result only holds part of the rows, so re-read the full result from the database instead.
+        if sql_query and df is not None and df.attrs.get("truncated") and self.db_mgr.db_name != ":memory:":
+            return lambda: iter_sqlite_batches(self.db_mgr.db_name, sql_query, params)
+        return lambda: iter_dataframe_batches(df)
+
+    def _offer_download(self, df: pd.DataFrame, filename: str, sql_query=None, params=None):
+        if AUTO_SAVE_RESULTS and df is not None and not df.empty:
+            output_filename = f"{filename}.{AUTO_SAVE_FORMAT}"
+            self.gui.export_in_background(self.export_source(df, sql_query, params), output_filename)
 
     def _list_all_tables(self):
         tables = self.db_mgr.list_tables(show_output=True)
         if tables:
             df = pd.DataFrame(tables, columns=["Available Tables"])
 
-            self.gui.update_status("🚀 Wait for 10 seconds.")
             self.gui.display_table(df, "Database Tables")
-            time.sleep(10)
+            table_options = [{"value": t, "text": f"Browse '{t}'"} for t in tables] + [{"value": "no", "text": "Not Now"}]
+            table_name = self.gui.prompt_for_menu_choice("Browse Table", "Open a table to scroll through its rows?", table_options)
+            if table_name and table_name != "no":
+                self._browse_table(table_name)
         else:
             self.gui.display_message("Info", "No tables in the database yet.", symbol="📂")
 
+    def _browse_table(self, table_name):
+        pager = self.db_mgr.browse_table(table_name)
+        if pager is None:
+            self.gui.display_table(self.db_mgr.execute_query(f'SELECT * FROM "{table_name}";', fetch_all=True), f"Table: {table_name}")
+            return
+        # Pages are fetched on the GUI thread as the user scrolls, through the reader connection.
+        export_source = lambda: iter_sqlite_batches(self.db_mgr.db_name, f'SELECT * FROM "{table_name}";')
+        self.gui.display_row_source(IteratorRowSource(pager.columns, pager), f"Table: {table_name} (paged by rowid)",
+                                    export_source=export_source)
+
     def _handle_scan_file(self):
-        file_path = self.gui.prompt_for_file("a data file (CSV/Excel)")
+        file_path = self.gui.prompt_for_file("a data file (CSV/Excel/Parquet/Arrow)")
         if not file_path: return
+
+        # Columnar files always stream: their record batches go to SQLite without a full pandas copy.
+        if os.path.exists(file_path) and (file_path.endswith(COLUMNAR_EXTENSIONS) or os.path.getsize(file_path) >= STREAMING_INGEST_THRESHOLD_BYTES):
+            self._handle_streaming_scan_file(file_path)
+            return
         
         self.gui.display_message("Processing", f"Reading file: {os.path.basename(file_path)}...", symbol="⚙️")
         df, suggested_name = read_data_file(file_path)
         
         if df is not None:
             self.gui.display_table(df, f"Full Data from: {os.path.basename(file_path)}")
-            self.gui.root.update_idletasks()
             self._offer_download(df, suggested_name)
             
             raw_table_name = self.gui.prompt_for_text_input(f"Enter table name to save this data (default: {suggested_name})")
@@ -127,6 +222,114 @@ class SQLAssistant:
         else:
             self.gui.display_message("Error", "Could not read the uploaded file.", symbol="❌")
 
+    def _handle_streaming_scan_file(self, file_path):
+        size_mb = os.path.getsize(file_path) / (1024 * 1024)
+        self.gui.display_message("Processing", f"Streaming file ({size_mb:,.0f} MB): {os.path.basename(file_path)}...", symbol="⚙️")
+        chunks, suggested_name = read_data_file_chunks(file_path)
+        if chunks is None:
+            self.gui.display_message("Error", "Could not read the uploaded file.", symbol="❌")
+            return
+
+        try:
+            first_chunk = next(chunks)
+        except StopIteration:
+            self.gui.display_message("Error", "The uploaded file contains no rows.", symbol="❌")
+            return
+        except Exception as e:
+            self.gui.display_message("Error", f"Could not read the uploaded file: {e}", symbol="❌")
+            return
+
+        preview = first_chunk.slice(0, 1000).to_pandas() if hasattr(first_chunk, "schema") else first_chunk.head(1000)
+        self.gui.display_table(preview, f"Preview (first rows) of: {os.path.basename(file_path)}")
+
+        raw_table_name = self.gui.prompt_for_text_input(f"Enter table name to save this data (default: {suggested_name})")
+        table_name = self._sanitize_table_name(raw_table_name or suggested_name)
+
+        def report_progress(rows_loaded, rows_per_sec):
+            self.gui.update_status(f"📥 {rows_loaded:,} rows loaded into '{table_name}' ({rows_per_sec:,.0f} rows/sec)")
+
+        if self.db_mgr.load_chunks_to_table(itertools.chain([first_chunk], chunks), table_name, progress_callback=report_progress):
+            self.gui.display_message("Success!", f"🎉 Data streamed into table '{table_name}'.", symbol="✅")
+        else:
+            self.gui.display_message("Error", f"😬 Failed to load data into '{table_name}'.", symbol="❌")
+
+    def _handle_bulk_ingest(self):
+        source = self.gui.prompt_for_text_input("Enter a folder or glob pattern of data files (e.g. exports/ or exports/**/*.csv):")
+        if not source: return
+        paths = DirectoryIngestor.resolve_paths(source)
+        if not paths:
+            self.gui.display_message("Info", f"No CSV/Excel/Parquet/Arrow files found for '{source}'.", symbol="📂")
+            return
+
+        mode = self.gui.prompt_for_menu_choice("Ingest Destination", f"Found {len(paths)} files. Where should the rows go?",
+                                               [{"value": "separate", "text": "One table per file"},
+                                                {"value": "union", "text": "Union all files into one table"}])
+        if not mode: return
+        union_table = None
+        template = "{stem}_table"
+        if mode == "union":
+            union_table = self._sanitize_table_name(self.gui.prompt_for_text_input("Enter the union table name:") or "", "ingested_data")
+        else:
+            template = self.gui.prompt_for_text_input("Table name template ({stem}, {parent}, {ext}; default: {stem}_table):") or template
+            try:
+                DirectoryIngestor.table_name_for(paths[0], template)
+            except (KeyError, IndexError, ValueError):
+                self.gui.display_message("Error", f"Invalid template '{template}'. Use only {{stem}}, {{parent}} and {{ext}}.", symbol="❌")
+                return
+
+        def progress(files_done, total_files, rows, rows_per_sec):
+            self.gui.update_status(f"🗃️ {files_done}/{total_files} files, {rows:,} rows ingested ({rows_per_sec:,.0f} rows/sec)")
+
+        self.gui.display_message("Processing", f"Ingesting {len(paths)} files with {self.ingestor.max_workers} parser processes...", symbol="⚙️")
+        self._active_ingest = True
+        self._refresh_active_work()
+        try:
+            results = self.ingestor.ingest(paths, template, union_table, progress_callback=progress,
+                                           source_root=DirectoryIngestor.source_root(source))
+        finally:
+            self._active_ingest = False
+            self._refresh_active_work()
+
+        if results:
+            self.gui.display_table(DirectoryIngestor.stats_frame(results), "Bulk Ingest Report")
+            ok = sum(r.ok for r in results)
+            self.gui.update_status(f"🗃️ {ok}/{len(results)} files ingested, {sum(r.rows for r in results if r.ok):,} rows")
+
+    def _handle_incremental_refresh(self):
+        source = self.gui.prompt_for_text_input("Enter a data file, folder or glob pattern to refresh:")
+        if not source: return
+        paths = DirectoryIngestor.resolve_paths(source)
+        if not paths:
+            self.gui.display_message("Info", f"No CSV/Excel/Parquet/Arrow files found for '{source}'.", symbol="📂")
+            return
+
+        if len(paths) == 1:
+            suggested_name = DirectoryIngestor.table_name_for(paths[0])
+            tables = [self._sanitize_table_name(self.gui.prompt_for_text_input(f"Enter the table to refresh (default: {suggested_name})") or "", suggested_name)]
+        else:
+            tables = [DirectoryIngestor.table_name_for(path) for path in paths]
+        raw_keys = self.gui.prompt_for_text_input("Key column(s) identifying a row, comma-separated (blank = match whole rows by hash):")
+        key_columns = [col for col in re.split(r'[\s,]+', raw_keys or "") if col]
+
+        def progress(rows, written, rows_per_sec):
+            self.gui.update_status(f"🔄 {rows:,} rows compared, {written:,} written ({rows_per_sec:,.0f} rows/sec)")
+
+        self._active_ingest = True
+        self._refresh_active_work()
+        try:
+            results = [self.incremental_loader.sync_file(path, table, key_columns, progress_callback=progress)
+                       for path, table in zip(paths, tables)]
+        finally:
+            self._active_ingest = False
+            self._refresh_active_work()
+
+        results = [r for r in results if r is not None]
+        if results:
+            self.gui.display_table(IncrementalLoader.report_frame(results), "Incremental Refresh Report")
+            skipped = sum(r.status == "unchanged" for r in results)
+            self.gui.update_status(f"🔄 {len(results) - skipped} file(s) synced, {skipped} unchanged, "
+                                   f"{sum(r.written for r in results):,} rows written, {sum(r.deleted for r in results):,} deleted")
+
     def _handle_image_to_table(self):
         if not self.image_handler:
             self.gui.display_message("Feature Unavailable", "Image Handler is not ready. Check your API key.", symbol="🖼️")
@@ -135,12 +338,23 @@ class SQLAssistant:
         image_path = self.gui.prompt_for_file("an image file (PNG/JPG)")
         if not image_path: return
 
-        self.gui.display_message("Processing", "Asking Gemini Vision to extract table...", symbol="🤖")
-        df, suggested_name = self.image_handler.image_to_dataframe(image_path)
+        finisher = lambda result: self._finish_image_to_table(image_path, *result)
+        if STREAM_LLM_TABLES:
+            source = self.gui.stream_table(f"Extracting from {os.path.basename(image_path)} (streaming)...")
+            job = self.llm.submit(f"Image: {os.path.basename(image_path)}", self.image_handler.image_to_dataframe, image_path,
+                                  retry_if=lambda result: result[0] is None, row_sink=source)
+            self._watch_streamed_job(job, finisher, source)
+            return
+
+        job = self.llm.submit(f"Image: {os.path.basename(image_path)}", self.image_handler.image_to_dataframe, image_path,
+                              retry_if=lambda result: result[0] is None)
+        self._job_finishers[job] = finisher
+        self.gui.display_message("Processing", "Gemini Vision is extracting the table in the background.\n"
+                                 "Keep working; open '📥 Review Background Extractions' when it is ready.", symbol="🤖")
 
+    def _finish_image_to_table(self, image_path, df, suggested_name):
         if df is not None and not df.empty:
             self.gui.display_table(df, f"Table from {os.path.basename(image_path)}")
-            self.gui.root.update_idletasks()
             self._offer_download(df, suggested_name)
             
             raw_table_name = self.gui.prompt_for_text_input(f"Enter table name to save this data (default: {suggested_name})")
@@ -153,6 +367,62 @@ class SQLAssistant:
         else:
             self.gui.display_message("Error", "❌ Gemini Vision failed to extract a table.", symbol="💥")
 
+    def _handle_batch_image_to_table(self):
+        if not self.image_handler:
+            self.gui.display_message("Feature Unavailable", "Image Handler is not ready. Check your API key.", symbol="🖼️")
+            return
+
+        source = self.gui.prompt_for_text_input("Enter a folder or glob pattern of images (e.g. scans/ or scans/**/*.png):")
+        if not source: return
+        image_paths = BatchImageExtractor.resolve_paths(source)
+        if not image_paths:
+            self.gui.display_message("Info", f"No images found for '{source}'.", symbol="📂")
+            return
+
+        mode = self.gui.prompt_for_menu_choice("Batch Destination", f"Found {len(image_paths)} images. Where should the tables go?",
+                                               [{"value": "separate", "text": "One table per image"}, {"value": "shared", "text": "Append all into one table"}])
+        if not mode: return
+        shared_table = None
+        if mode == "shared":
+            shared_table = self._sanitize_table_name(self.gui.prompt_for_text_input("Enter the shared table name:") or "", "image_batch_data")
+
+        batch = BatchImageExtractor(
+            self.image_handler,
+            max_in_flight=int(os.getenv("IMAGE_BATCH_MAX_IN_FLIGHT", "4")),
+            requests_per_minute=float(os.getenv("IMAGE_BATCH_REQUESTS_PER_MINUTE", "60")),
+        )
+        self._active_batch = batch
+        self._batch_images_left = len(image_paths)
+        self._refresh_active_work()
+        self.gui.display_message("Processing", f"Extracting tables from {len(image_paths)} images "
+                                 f"({batch.max_in_flight} at a time)...", symbol="🤖")
+
+        results = []
+        start = time.perf_counter()
+        try:
+            for result in batch.iter_results(image_paths):
+                if result.ok:
+                    if shared_table:
+                        result.df.insert(0, "source_image", os.path.basename(result.image_path))
+                        saved = self.db_mgr.load_df_to_table(result.df, shared_table, if_exists='append')
+                    else:
+                        saved = self.db_mgr.load_df_to_table(result.df, self._sanitize_table_name(result.suggested_name, "image_table"))
+                    if not saved:
+                        result.error = "failed to save to database"
+                results.append(result)
+                self._batch_images_left = len(image_paths) - len(results)
+                self._refresh_active_work()
+                self.gui.update_status(f"🖼️ {len(results)}/{len(image_paths)} images processed")
+        finally:
+            self._active_batch = None
+            self._batch_images_left = 0
+            self._refresh_active_work()
+
+        summary = BatchImageExtractor.summarize(results, time.perf_counter() - start)
+        print(f"\n📈 [BATCH IMAGE EXTRACTION]\n{summary}")
+        self.gui.display_table(BatchImageExtractor.stats_frame(results), "Batch Image Extraction Report")
+        self.gui.update_status(summary.replace("\n", " | "))
+
     def _handle_paragraph_to_table(self):
         if not self.paragraph_handler:
             self.gui.display_message("Feature Unavailable", "Paragraph Handler is not ready. Check API key.", symbol="📝")
@@ -161,12 +431,23 @@ class SQLAssistant:
         paragraph = self.gui.prompt_for_text_input("Paste or type your paragraph below:")
         if not paragraph: return
 
-        self.gui.display_message("Processing", "Asking Gemini to analyze the paragraph...", symbol="🤖")
-        df = self.paragraph_handler.paragraph_to_table(paragraph)
+        preview = paragraph[:40] + ("..." if len(paragraph) > 40 else "")
+        if STREAM_LLM_TABLES:
+            source = self.gui.stream_table("Extracting table from paragraph (streaming)...")
+            job = self.llm.submit(f"Paragraph: {preview}", self.paragraph_handler.paragraph_to_table, paragraph,
+                                  retry_if=lambda result: result is None, row_sink=source)
+            self._watch_streamed_job(job, self._finish_paragraph_to_table, source)
+            return
+
+        job = self.llm.submit(f"Paragraph: {preview}", self.paragraph_handler.paragraph_to_table, paragraph,
+                              retry_if=lambda result: result is None)
+        self._job_finishers[job] = self._finish_paragraph_to_table
+        self.gui.display_message("Processing", "Gemini is analyzing the paragraph in the background.\n"
+                                 "Keep working; open '📥 Review Background Extractions' when it is ready.", symbol="🤖")
 
+    def _finish_paragraph_to_table(self, df):
         if df is not None and not df.empty:
             self.gui.display_table(df, "Table Extracted from Paragraph")
-            self.gui.root.update_idletasks()
             self._offer_download(df, "paragraph_extract")
             
             raw_table_name = self.gui.prompt_for_text_input("Enter table name for this data:")
@@ -179,6 +460,89 @@ class SQLAssistant:
         else:
             self.gui.display_message("Error", "❌ Gemini could not create a structured table from the text.", symbol="💥")
 
+    def _watch_streamed_job(self, job, finisher, source):
+        # The table fills in while the job runs; Cancel in the status bar stops it like any background job.
+        try:
+            result = job.result()
+        except LLMJobCancelled:
+            self.gui.display_message("Cancelled", f"'{job.description}' was cancelled.", symbol="🛑")
+            return
+        except Exception as e:
+            self.gui.display_message("Error", f"'{job.description}' failed after {job.attempts} attempt(s): {e}", symbol="💥")
+            return
+        finally:
+            self.llm.forget(job)
+            # A cancelled or timed-out call may still be streaming on its abandoned thread; its rows are dropped from here on.
+            source.close()
+        finisher(result)
+
+    def _handle_background_jobs(self):
+        jobs = [job for job in self.llm.finished_jobs() + self.llm.active_jobs() if job in self._job_finishers]
+        if not jobs:
+            self.gui.display_message("Info", "No background extractions right now.", symbol="📥")
+            return
+
+        status_icons = {"done": "✅", "failed": "❌", "cancelled": "🛑", "running": "⏳"}
+        options = []
+        for idx, job in enumerate(jobs):
+            elapsed = time.time() - job.submitted_at
+            options.append({"value": str(idx), "text": f"{status_icons[job.status]} {job.description} ({job.status}, {elapsed:.0f}s)"})
+        options.append({"value": "back", "text": "↩️ Back"})
+
+        choice = self.gui.prompt_for_menu_choice("Background Extractions", "Pick a finished job to review, or a running one to cancel.", options)
+        if not choice or choice == "back":
+            return
+        job = jobs[int(choice)]
+
+        if job.status == "running":
+            confirm = self.gui.prompt_for_menu_choice("Cancel Job", f"Cancel '{job.description}'?", [{"value": "yes", "text": "Yes, Cancel It"}, {"value": "no", "text": "No, Keep Running"}])
+            if confirm == "yes":
+                job.cancel()
+                self.gui.display_message("Cancelled", f"'{job.description}' was cancelled.", symbol="🛑")
+            return
+
+        finisher = self._job_finishers.pop(job)
+        self.llm.forget(job)
+        if job.status == "cancelled":
+            self.gui.display_message("Cancelled", f"'{job.description}' was cancelled.", symbol="🛑")
+        elif job.status == "failed":
+            self.gui.display_message("Error", f"'{job.description}' failed after {job.attempts} attempt(s): {job.future.exception()}", symbol="💥")
+        else:
+            finisher(job.result())
+
+    def _handle_metrics(self):
+        metrics_df = METRICS.to_dataframe()
+        if metrics_df.empty:
+            self.gui.display_message("Info", "No timings recorded yet. Run an action first.", symbol="📈")
+            return
+        self.gui.display_table(metrics_df, "Pipeline Stage Timings (rolling p50/p95)")
+        export = self.gui.prompt_for_menu_choice("Export Metrics", "Export these timings?",
+                                                 [{"value": "json", "text": "Export as JSON"}, {"value": "csv", "text": "Export as CSV"},
+                                                  {"value": "reset", "text": "Reset Timings"}, {"value": "no", "text": "Not Now"}])
+        if export in ("json", "csv"):
+            path = METRICS.export(f"pipeline_metrics.{export}")
+            self.gui.update_status(f"📈 Metrics exported to {path}")
+        elif export == "reset":
+            METRICS.reset()
+            self.gui.update_status("📈 Metrics reset.")
+
+    def _handle_index_advisor(self):
+        advisor = self.db_mgr.index_advisor
+        report_df = advisor.report_frame()
+        if report_df.empty:
+            self.gui.display_message("Info", "No full-table scans observed yet. Run some queries first.", symbol="🧭")
+            return
+        self.gui.display_table(report_df, "Index Advisor (created and recommended indexes)")
+        pending = [rec for rec in advisor.recommendations() if not rec["created"]]
+        if not pending:
+            return
+        choice = self.gui.prompt_for_menu_choice("Create Indexes", f"Create the {len(pending)} recommended index(es) now?",
+                                                 [{"value": "yes", "text": "Create"}, {"value": "no", "text": "Not Now"}])
+        if choice == "yes":
+            self.gui.update_status("🧭 Creating recommended indexes...")
+            advisor.create_recommended()
+            self.gui.display_table(advisor.report_frame(), "Index Advisor (after/speedup fill in when each sample query runs again)")
+
     def _handle_custom_sql(self):
         custom_sql = self.gui.prompt_for_text_input("Enter your custom SQL query:")
         if not custom_sql: return
@@ -191,16 +555,24 @@ class SQLAssistant:
 
         if is_select and result_df is not None:
             
-            self.gui.display_table(result_df, "Custom Query Result")
-            self._offer_download(result_df, "custom_query_result")
-            self.gui.update_status("🚀 Wait till 15 seconds .Till then see what you can do with it.")
-            time.sleep(15)
+            self.gui.display_table(result_df, "Custom Query Result", export_source=self.export_source(result_df, custom_sql))
+            self._offer_download(result_df, "custom_query_result", custom_sql)
         elif result_df is True:
             self.gui.display_message("Success", "✅ Your query was executed successfully.", symbol="👍")
+        elif self.db_mgr.last_abort:
+            self._show_query_abort()
         else:
             self.gui.display_message("Error", "❌ Your SQL query failed to execute. Check the console for database errors.", symbol="💥")
+
+    def _show_query_abort(self):
+        abort = self.db_mgr.last_abort
+        symbol = "🛑" if abort["reason"] == "cancelled" else "⏱️"
+        self.gui.display_message("Query Stopped", f"The query {abort['reason']} after {abort['elapsed']:.1f}s "
+                                 f"(~{abort['vm_steps']:,} VM steps). Nothing was changed.", symbol=symbol)
             
     def _handle_move_data(self):
+        if self._resume_copy_jobs():
+            return
         tables = self.db_mgr.list_tables(show_output=False)
         if len(tables) < 1:
             self.gui.display_message("Info", "You need at least one table to act as a source.", symbol="📂")
@@ -212,7 +584,6 @@ class SQLAssistant:
 
         cols = self.db_mgr.get_table_columns(source_table)
         self.gui.display_message("Info", f"Columns in '{source_table}': {', '.join(cols)}", symbol="📜")
-        self.gui.root.update_idletasks()
         
         cols_to_select = self.gui.prompt_for_text_input(f"Columns to select from '{source_table}' (e.g., col1, col2 or * for all):") or "*"
         where_clause = self.gui.prompt_for_text_input(f"Enter a WHERE clause for '{source_table}' (optional):")
@@ -230,27 +601,85 @@ class SQLAssistant:
             return
         
         self.gui.display_table(preview_df, "Data to Move (Preview)")
-        self.gui.root.update_idletasks()
         confirm = self.gui.prompt_for_menu_choice("Confirm Action", "Proceed with moving this data?", [{"value": "yes", "text": "Yes, Proceed"}, {"value": "no", "text": "No, Cancel"}])
         if confirm != "yes":
             self.gui.display_message("Cancelled", "Move operation cancelled.", symbol="🛑")
             return
 
-        final_query = f"CREATE TABLE {dest_table_name} AS {select_query};"
-        if dest_table_name in tables:
-            final_query = f"INSERT INTO {dest_table_name} {select_query};"
+        dest_db = None
+        target = self.gui.prompt_for_menu_choice("Destination", f"Where should '{dest_table_name}' live?",
+                                                 [{"value": "here", "text": "This Database"}, {"value": "file", "text": "Another SQLite File"}])
+        if target == "file":
+            dest_db = self.gui.prompt_for_text_input("Path of the destination SQLite file (created if missing):")
+            if not dest_db: return
+        mode = self.gui.prompt_for_menu_choice("Copy or Move", "Keep the rows in the source table?",
+                                               [{"value": "copy", "text": "Copy (keep source rows)"}, {"value": "move", "text": "Move (delete from source)"}])
+        if not mode: return
+
+        self._run_copy_job(lambda progress: self.copier.start(source_table, dest_table_name, cols_to_select, where_clause or None,
+                                                             dest_db=dest_db, move=(mode == "move"), progress_callback=progress))
+
+    def _resume_copy_jobs(self):
+        pending = self.copier.pending_jobs()
+        if not pending:
+            return False
+        options = [{"value": job.job_id, "text": f"↩️ Resume: {job.description}"} for job in pending]
+        options += [{"value": "discard", "text": "🗑️ Discard Unfinished Jobs"}, {"value": "new", "text": "➕ Start a New Move/Copy"}]
+        choice = self.gui.prompt_for_menu_choice("Unfinished Move/Copy", "Some batched copies did not finish.", options)
+        if choice == "discard":
+            for job in pending:
+                self.copier.discard(job.job_id)
+            return False
+        if not choice or choice == "new":
+            return False
+        self._run_copy_job(lambda progress: self.copier.resume(choice, progress_callback=progress))
+        return True
+
+    def _run_copy_job(self, run):
+        def progress(rows_copied, total, rows_per_sec):
+            done = f"{rows_copied:,} / {total:,}" if total else f"{rows_copied:,}"
+            self.gui.update_status(f"🚚 {done} rows copied ({rows_per_sec:,.0f} rows/sec) — Cancel pauses the job.")
+
+        self._active_copy = True
+        self._refresh_active_work()
+        try:
+            job = run(progress)
+        finally:
+            self._active_copy = False
+            self._refresh_active_work()
 
-        self.gui.update_status(f"Executing: {final_query}")
-        if self.db_mgr.execute_query(final_query):
-            self.gui.display_message("Success", f"✅ Data successfully moved/copied to '{dest_table_name}'.", symbol="🎉")
+        if job is None:
+            self.gui.display_message("Error", "❌ The move/copy operation failed. Check the console for database errors.", symbol="💥")
+        elif job.status == "paused":
+            self.gui.display_message("Paused", f"⏸️ Paused after {job.rows_copied:,} rows. Choose Move/Copy again to resume.", symbol="🛑")
         else:
-            self.gui.display_message("Error", "❌ The move/copy operation failed.", symbol="💥")
+            self.gui.display_message("Success", f"✅ {job.rows_copied:,} rows {'moved' if job.move else 'copied'} to '{job.dest_table}'.", symbol="🎉")
+
+    def generate_sql(self, table_name, natural_query):
+        with span("nl.cache_lookup"):
+            generated_sql = self.nl_cache.get(table_name, natural_query)
+        if generated_sql:
+            self.gui.update_status(f"⚡ Reusing cached SQL for: {natural_query}")
+            return generated_sql, True
+
+        if self.text_to_sql_model is None:
+            raise RuntimeError("Text-to-SQL model is not ready. Check your API key.")
+        self.gui.update_status(f"Generating SQL for: {natural_query}")
+        schema_str = self.db_mgr.describe_table(table_name)
+        prompt = f"SQL generator for SQLite. Convert to SQL. Only SQL.\nContext:{schema_str}\nUser question for '{table_name}':\n\"{natural_query}\"\nSQL Query:"
+
+        job = self.llm.submit(f"Text-to-SQL: {natural_query}", self.text_to_sql_model.generate_content, prompt)
+        try:
+            with span("nl.text_to_sql_round_trip", nbytes=len(prompt.encode("utf-8"))):
+                response = job.result()
+        finally:
+            self.llm.forget(job)
+        return response.text.strip().replace("```sql", "").replace("```", "").strip(), False
 
     def _handle_natural_language_query(self):
         tables = self.db_mgr.list_tables(show_output=True)
         if not tables:
             self.gui.display_message("Info", "No tables yet to chat about!", symbol="📂")
-            self.gui.root.update_idletasks()
             self.gui.prompt_for_menu_choice("Action Complete", "Press button to return to Main Menu.", [{"value": "ok", "text": "Return to Menu"}])
             return
 
@@ -263,19 +692,23 @@ class SQLAssistant:
             if not natural_query or natural_query.lower() == 'done':
                 break
             
-            self.gui.update_status(f"Generating SQL for: {natural_query}")
-            schema_str = f"Table '{table_name}' columns: {', '.join(self.db_mgr.get_table_columns(table_name))}"
-            prompt = f"SQL generator for SQLite. Convert to SQL. Only SQL.\nContext:{schema_str}\nUser question for '{table_name}':\n\"{natural_query}\"\nSQL Query:"
-            
-            response = self.text_to_sql_model.generate_content(prompt)
-            generated_sql = response.text.strip().replace("```sql", "").replace("```", "").strip()
+            try:
+                generated_sql, from_cache = self.generate_sql(table_name, natural_query)
+            except LLMJobCancelled:
+                self.gui.display_message("Cancelled", "SQL generation was cancelled.", symbol="🛑")
+                continue
+            except Exception as e:
+                self.gui.display_message("Error", f"❌ Could not generate SQL: {e}", symbol="💥")
+                continue
             
-            self.gui.display_message("Generated SQL", generated_sql, symbol="💡")
-            self.gui.root.update_idletasks()
-            time.sleep(1)
+            self.gui.display_message("Generated SQL", generated_sql, symbol="⚡" if from_cache else "💡")
+            self.gui.update_status(f"{'⚡' if from_cache else '💡'} {generated_sql}")
 
             result_df = self.db_mgr.execute_query(generated_sql, fetch_all=True)
             if result_df is not None:
-                self.gui.display_table(result_df, f"Query Result for '{table_name}'")
-                self._offer_download(result_df, f"{table_name}_query_result")
-                self.gui.root.update_idletasks()
\ No newline at end of file
+                if not from_cache:
+                    self.nl_cache.put(table_name, natural_query, generated_sql)
+                self.gui.display_table(result_df, f"Query Result for '{table_name}'", export_source=self.export_source(result_df, generated_sql))
+                self._offer_download(result_df, f"{table_name}_query_result", generated_sql)
+            elif self.db_mgr.last_abort:
+                self._show_query_abort()
\ No newline at end of file
@@ -0,0 +1,88 @@
+import concurrent.futures
+import glob
+import os
+import threading
+import time
+import pandas as pd
+from llm_executor import TokenBucket
+
+class ImageResult:
+    def __init__(self, image_path, df=None, suggested_name=None, latency=0.0, error=None):
+        self.image_path = image_path
+        self.df = df
+        self.suggested_name = suggested_name
+        self.latency = latency
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None and self.df is not None and not self.df.empty
+
+
+class BatchImageExtractor:
+    IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp', '.gif', '.tif', '.tiff')
+
+    def __init__(self, image_handler, max_in_flight=4, requests_per_minute=60):
+        self.image_handler = image_handler
+        self.max_in_flight = max_in_flight
+        self.rate_limiter = TokenBucket(requests_per_minute / 60.0, capacity=max_in_flight)
+        self._cancel_event = threading.Event()
+
+    @classmethod
+    def resolve_paths(cls, path_or_glob):
+        path_or_glob = os.path.expanduser(path_or_glob.strip())
+        if os.path.isdir(path_or_glob):
+            candidates = [os.path.join(path_or_glob, name) for name in os.listdir(path_or_glob)]
+        else:
+            candidates = glob.glob(path_or_glob, recursive=True)
+        return sorted(p for p in candidates if os.path.isfile(p) and p.lower().endswith(cls.IMAGE_EXTENSIONS))
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def _extract_one(self, image_path):
+        if not self.rate_limiter.acquire(cancel_event=self._cancel_event):
+            return ImageResult(image_path, error="cancelled")
+        start = time.perf_counter()
+        try:
+            df, suggested_name = self.image_handler.image_to_dataframe(image_path)
+        except Exception as e:
+            return ImageResult(image_path, latency=time.perf_counter() - start, error=str(e))
+        latency = time.perf_counter() - start
+        if df is None or df.empty:
+            return ImageResult(image_path, latency=latency, error="no table extracted")
+        return ImageResult(image_path, df, suggested_name, latency)
+
+    def iter_results(self, image_paths):
+        # Results are yielded on the caller's thread in completion order, so the caller is the
+        # single writer to the database while up to max_in_flight requests run concurrently.
+        self._cancel_event.clear()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="image-batch") as pool:
+            futures = [pool.submit(self._extract_one, path) for path in image_paths]
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    yield future.result()
+            finally:
+                self._cancel_event.set()
+
+    @staticmethod
+    def stats_frame(results):
+        return pd.DataFrame([{
+            "image": os.path.basename(r.image_path),
+            "status": "ok" if r.ok else "failed",
+            "rows": len(r.df) if r.df is not None else 0,
+            "latency_s": round(r.latency, 2),
+            "error": r.error or "",
+        } for r in results])
+
+    @staticmethod
+    def summarize(results, wall_time):
+        latencies = pd.Series([r.latency for r in results if r.latency > 0], dtype=float)
+        succeeded = sum(1 for r in results if r.ok)
+        lines = [
+            f"Images processed: {len(results)} ({succeeded} ok, {len(results) - succeeded} failed)",
+            f"Wall time: {wall_time:.1f}s",
+        ]
+        if not latencies.empty:
+            lines.append(f"Latency p50/p95/max: {latencies.quantile(0.5):.2f}s / {latencies.quantile(0.95):.2f}s / {latencies.max():.2f}s")
+        return "\n".join(lines)
@@ -0,0 +1,296 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+from file_handler import read_data_file, read_data_file_chunks
+from database_manager import DatabaseManager
+from paragraph_handler import ParagraphHandler
+from image_extractor import ImageHandler
+from llm_backends import ReplayBackend
+
+EXCEL_MAX_ROWS = 1_048_575
+STARTUP_PROBES = {
+    "startup_import_gui": "import sql_assistant_gui",
+    "startup_show_window": "from sql_assistant_gui import SQLAssistantGUI\ngui = SQLAssistantGUI()\ngui.root.update()\ngui.root.destroy()",
+    "startup_import_app": "import assistant_cli",
+    "startup_build_app": ("import types, assistant_cli\n"
+                          "assistant_cli.SQLAssistant(types.SimpleNamespace(set_active_jobs=lambda count: None), db_name=':memory:')"),
+}
+STARTUP_HARNESS = """import json, sys, time
+_start = time.perf_counter()
+{probe}
+print(json.dumps({{"seconds": time.perf_counter() - _start, "modules": len(sys.modules),
+                  "pandas_loaded": "pandas" in sys.modules, "pil_loaded": "PIL" in sys.modules}}))
+"""
+
+class PeakMemorySampler:
+    # Samples resident set size from /proc so numpy/sqlite allocations are counted too.
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.baseline = None
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _rss_bytes():
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            return None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            rss = self._rss_bytes()
+            if rss is not None and rss > self.peak:
+                self.peak = rss
+
+    def __enter__(self):
+        self.baseline = self.peak = self._rss_bytes()
+        if self.baseline is not None:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            rss = self._rss_bytes()
+            if rss is not None and rss > self.peak:
+                self.peak = rss
+
+    @property
+    def peak_delta_mb(self):
+        if self.baseline is None:
+            return None
+        return round((self.peak - self.baseline) / (1024 * 1024), 1)
+
+
+def measure(results, benchmark, fn, rows=None, **labels):
+    quiet = io.StringIO()
+    with PeakMemorySampler() as mem, contextlib.redirect_stdout(quiet):
+        start = time.perf_counter()
+        value = fn()
+        seconds = time.perf_counter() - start
+    record = {"benchmark": benchmark, **labels, "rows": rows, "seconds": round(seconds, 4),
+              "rows_per_sec": round(rows / seconds) if rows and seconds > 0 else None,
+              "peak_mem_delta_mb": mem.peak_delta_mb}
+    results.append(record)
+    rate = f" ({record['rows_per_sec']:,} rows/sec)" if record["rows_per_sec"] else ""
+    label = " ".join(f"{k}={v}" for k, v in labels.items())
+    print(f"⏱️ {benchmark:<28} {label:<22} rows={rows or 0:>10,} {seconds:>9.3f}s{rate} peakΔ={mem.peak_delta_mb} MB")
+    return value
+
+
+def synthetic_frame(rows, seed=42):
+    rng = np.random.default_rng(seed)
+    categories = np.array(["north", "south", "east", "west", "central"])
+    return pd.DataFrame({
+        "Order ID": np.arange(1, rows + 1),
+        "Region": categories[rng.integers(0, len(categories), rows)],
+        "Amount (USD)": rng.normal(100, 25, rows).round(2),
+        "Quantity": rng.integers(1, 50, rows),
+        "Order Date": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1500, rows), unit="D"),
+        "Note": np.char.add("item-", rng.integers(0, 10_000, rows).astype(str)),
+    })
+
+
+def write_synthetic_file(workdir, rows, fmt):
+    path = os.path.join(workdir, f"synthetic_{rows}.{fmt}")
+    if not os.path.exists(path):
+        df = synthetic_frame(rows)
+        if fmt == "csv":
+            df.to_csv(path, index=False)
+        elif fmt == "parquet":
+            df.to_parquet(path, index=False)
+        elif fmt == "arrow":
+            df.to_feather(path)
+        else:
+            df.to_excel(path, index=False)
+    return path
+
+
+def bench_ingest_and_query(results, workdir, sizes, formats):
+    for fmt in formats:
+        for rows in sizes:
+            if fmt == "xlsx" and rows > EXCEL_MAX_ROWS:
+                print(f"⏭️ Skipping xlsx at {rows:,} rows (Excel sheets hold at most {EXCEL_MAX_ROWS + 1:,} rows).")
+                continue
+            path = write_synthetic_file(workdir, rows, fmt)
+            db_path = os.path.join(workdir, f"bench_{fmt}_{rows}.sqlite")
+            if os.path.exists(db_path):
+                os.remove(db_path)
+            db = DatabaseManager(db_path)
+            with contextlib.redirect_stdout(io.StringIO()):
+                db.connect()
+
+            df, _ = measure(results, "read_data_file", lambda: read_data_file(path), rows, format=fmt)
+            measure(results, "load_df_to_table", lambda: db.load_df_to_table(df, "bench"), rows, format=fmt)
+            del df
+
+            def stream():
+                chunks, _ = read_data_file_chunks(path)
+                return db.load_chunks_to_table(chunks, "bench_stream")
+            measure(results, "streaming_ingest", stream, rows, format=fmt)
+
+            measure(results, "execute_query_fetch_all", lambda: db.execute_query("SELECT * FROM bench;", fetch_all=True), rows, format=fmt)
+            measure(results, "execute_query_aggregate",
+                    lambda: db.execute_query("SELECT Region, COUNT(*), AVG(Amount_USD) FROM bench GROUP BY Region;", fetch_all=True),
+                    rows, format=fmt)
+            measure(results, "execute_query_filter",
+                    lambda: db.execute_query("SELECT * FROM bench WHERE Quantity = 7 AND Region = 'north';", fetch_all=True),
+                    rows, format=fmt)
+            with contextlib.redirect_stdout(io.StringIO()):
+                db.close()
+
+
+def bench_parsing(results, parse_sizes):
+    paragraph_handler = ParagraphHandler(model=ReplayBackend("benchmark"))
+    image_handler = ImageHandler(model=ReplayBackend("benchmark"), cache_dir=None)
+    for rows in parse_sizes:
+        df = synthetic_frame(rows).astype(str)
+        header = "| " + " | ".join(df.columns) + " |"
+        divider = "|" + "---|" * len(df.columns)
+        body = "\n".join("| " + " | ".join(values) + " |" for values in df.itertuples(index=False, name=None))
+        markdown = f"{header}\n{divider}\n{body}"
+        measure(results, "markdown_to_dataframe", lambda: paragraph_handler._markdown_to_dataframe(markdown), rows,
+                bytes=len(markdown))
+
+        json_text = df.to_json(orient="records")
+        measure(results, "image_json_parse", lambda: image_handler._parse_table_json(json_text), rows, bytes=len(json_text))
+
+
+def bench_gui(results, gui_sizes):
+    try:
+        from sql_assistant_gui import SQLAssistantGUI
+        gui = SQLAssistantGUI()
+    except Exception as e:
+        print(f"⏭️ Skipping GUI benchmark (no usable Tk display: {e}). Try running under xvfb-run.")
+        results.append({"benchmark": "display_table", "skipped": str(e)})
+        return
+    try:
+        gui.root.update()
+        for rows in gui_sizes:
+            df = synthetic_frame(rows)
+
+            def fill():
+                gui.display_table(df, "Benchmark")
+                gui.root.update()
+            measure(results, "display_table", fill, rows)
+    finally:
+        gui.root.destroy()
+
+
+def bench_startup(results, runs):
+    # Every run is a fresh interpreter, so nothing is already in sys.modules and the timings are true cold starts.
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    env = {**os.environ, "LLM_BACKEND": "replay"}
+    for benchmark, probe in STARTUP_PROBES.items():
+        samples = []
+        for _ in range(runs):
+            proc = subprocess.run([sys.executable, "-c", STARTUP_HARNESS.format(probe=probe)], cwd=repo_dir, env=env,
+                                  capture_output=True, text=True)
+            if proc.returncode != 0:
+                break
+            samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        if not samples:
+            reason = (proc.stderr.strip().splitlines() or ["failed"])[-1]
+            print(f"⏭️ Skipping {benchmark}: {reason}")
+            results.append({"benchmark": benchmark, "skipped": reason})
+            continue
+        seconds = sorted(sample["seconds"] for sample in samples)
+        record = {"benchmark": benchmark, "rows": None, "seconds": round(seconds[len(seconds) // 2], 4),
+                  "min_seconds": round(seconds[0], 4), "runs": len(samples), "modules": samples[-1]["modules"],
+                  "pandas_loaded": samples[-1]["pandas_loaded"], "pil_loaded": samples[-1]["pil_loaded"]}
+        results.append(record)
+        print(f"⏱️ {benchmark:<28} median={record['seconds']:.3f}s min={record['min_seconds']:.3f}s "
+              f"modules={record['modules']} pandas={record['pandas_loaded']} PIL={record['pil_loaded']}")
+
+
+def current_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare_with_baseline(results, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    key = lambda r: (r["benchmark"], r.get("format"), r.get("rows"))
+    previous = {key(r): r for r in baseline.get("results", []) if "seconds" in r}
+    print(f"\n📊 Compared with {baseline_path} ({baseline.get('version', 'unknown')}):")
+    for record in results:
+        old = previous.get(key(record))
+        if old and "seconds" in record and old["seconds"] > 0:
+            ratio = record["seconds"] / old["seconds"]
+            marker = "🔺" if ratio > 1.10 else ("🔻" if ratio < 0.90 else "▫️")
+            print(f"{marker} {record['benchmark']:<28} rows={record.get('rows') or 0:>10,} {old['seconds']:.3f}s -> {record['seconds']:.3f}s (x{ratio:.2f})")
+
+
+def parse_sizes(text):
+    return [int(float(part)) for part in text.split(",") if part.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the SQL Assistant startup, ingest, query, parsing and render hot paths.")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated row counts for file ingest/query (up to 1e7).")
+    parser.add_argument("--formats", default="csv,xlsx", help="Comma-separated synthetic file formats: csv, xlsx, parquet, arrow.")
+    parser.add_argument("--parse-sizes", default="1000,10000,100000", help="Row counts for the Markdown/JSON response parsers.")
+    parser.add_argument("--gui-sizes", default="10000,200000", help="Row counts for display_table under Tk.")
+    parser.add_argument("--startup-runs", type=int, default=5, help="Cold interpreter runs per startup probe (median is reported).")
+    parser.add_argument("--suites", default="startup,ingest,parsing,gui", help="Which suites to run: startup, ingest, parsing, gui.")
+    parser.add_argument("--workdir", default=None, help="Where synthetic files and databases are kept (default: a temp dir).")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file to write results to.")
+    parser.add_argument("--baseline", default=None, help="Previous results JSON to compare against.")
+    args = parser.parse_args(argv)
+
+    suites = {s.strip() for s in args.suites.split(",")}
+    workdir = args.workdir or tempfile.mkdtemp(prefix="sql_assistant_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    results = []
+    try:
+        if "startup" in suites:
+            bench_startup(results, args.startup_runs)
+        if "ingest" in suites:
+            bench_ingest_and_query(results, workdir, parse_sizes(args.sizes), [f.strip() for f in args.formats.split(",") if f.strip()])
+        if "parsing" in suites:
+            bench_parsing(results, parse_sizes(args.parse_sizes))
+        if "gui" in suites:
+            bench_gui(results, parse_sizes(args.gui_sizes))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "version": current_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Benchmark results saved to {args.output}")
+
+    if args.baseline:
+        compare_with_baseline(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,47 @@
+import os
+import re
 import sqlite3
+import threading
+import time
 import pandas as pd
 from table_utils import offer_download_df, display_df_preview
+from schema_catalog import SchemaCatalog
+from metrics import span
+from dtype_inference import optimize_dtypes, create_table_ddl, sqlite_affinity, arrow_affinity
+from index_advisor import IndexAdvisor
+from query_result_cache import QueryResultCache
+from result_pager import KeysetPager
+
+DDL_PATTERN = re.compile(r'^\s*(CREATE|DROP|ALTER)\b', re.IGNORECASE)
+CONSOLE_PREVIEW_ROWS = 20
+PROGRESS_HANDLER_STEPS = 10_000
 
 class DatabaseManager:
+    INTERNAL_TABLE_PREFIX = "_assistant_"
+
     def __init__(self, db_name="assistant_db.sqlite"):
         self.db_name = db_name
         self.conn = None
+        self.reader_conn = None
+        self.reader_lock = threading.Lock()
+        self.catalog = SchemaCatalog(self)
+        self.query_timeout = float(os.getenv("QUERY_TIMEOUT_SECONDS", "60"))
+        # How long a statement waits for another connection's write lock before "database is locked".
+        self.busy_timeout = float(os.getenv("SQLITE_BUSY_TIMEOUT_SECONDS", "5"))
+        self.max_rows = int(os.getenv("QUERY_MAX_ROWS", "1000000"))
+        self.query_running = False
+        self.vm_steps = 0
+        self.last_abort = None
+        self.on_query_change = None
+        self._deadline = None
+        self._cancel_requested = threading.Event()
+        self.result_cache = QueryResultCache(max_entries=int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "64")),
+                                             max_bytes=int(float(os.getenv("QUERY_CACHE_MAX_MB", "64")) * 1024 * 1024))
+        self.index_advisor = IndexAdvisor(self, auto_create=os.getenv("AUTO_CREATE_INDEXES", "0").strip().lower() in ("1", "true", "yes"))
 
     def connect(self):
         try:
-            self.conn = sqlite3.connect(self.db_name)
+            self.conn = sqlite3.connect(self.db_name, timeout=self.busy_timeout)
             self.conn.row_factory = sqlite3.Row
             print(f"✅ Successfully connected to database: {self.db_name}")
             return True
@@ -19,12 +51,19 @@ class DatabaseManager:
             return False
 
     def close(self):
+        if self.reader_conn:
+            with self.reader_lock:
+                self.reader_conn.close()
+                self.reader_conn = None
         if self.conn:
             self.conn.close()
             self.conn = None
+            self.catalog.invalidate()
+            self.result_cache.invalidate()
             print(f"🔒 Database connection to '{self.db_name}' closed.")
 
-    def execute_query(self, sql_query, params=None, fetch_all=False, fetch_one=False, is_ddl_dml=False, show_code=True):
+    def execute_query(self, sql_query, params=None, fetch_all=False, fetch_one=False, is_ddl_dml=False, show_code=True,
+                      timeout=None, max_rows=None):
         if not self.conn:
             print("⚠️ Error: No active database connection.")
             if not self.connect():
@@ -38,9 +77,28 @@ class DatabaseManager:
                 print("📌 Parameters:", params)
             print("──────────────────────────────")
 
+        max_rows = self.max_rows if max_rows is None else max_rows
+        cacheable = fetch_all and QueryResultCache.is_cacheable(sql_query)
+        if cacheable:
+            cached_df = self._cached_result(sql_query, params, max_rows)
+            if cached_df is not None:
+                return cached_df
+
         cursor = self.conn.cursor()
+        if fetch_all:
+            # Plain tuples are much cheaper to build than sqlite3.Row and are all the DataFrame needs.
+            cursor.row_factory = None
+        changes_before = self.conn.total_changes
+        start = time.perf_counter()
+        self._start_query_guard(self.query_timeout if timeout is None else timeout)
         try:
-            cursor.execute(sql_query, params or ())
+            with span("db.execute"):
+                cursor.execute(sql_query, params or ())
+            if DDL_PATTERN.match(sql_query):
+                self.catalog.invalidate()
+            # total_changes also catches writes the statement classifier missed.
+            if not QueryResultCache.is_read(sql_query) or self.conn.total_changes != changes_before:
+                self.result_cache.invalidate()
 
             if is_ddl_dml:
                 self.conn.commit()
@@ -48,41 +106,190 @@ class DatabaseManager:
                 return True
 
             result = None
+            truncated = False
             if fetch_all:
-                result = cursor.fetchall()
-                if result:
-                    df = pd.DataFrame(result, columns=[desc[0] for desc in cursor.description])
-                    print("\n📊 [QUERY RESULT]")
-                    print(df.to_string() if not df.empty else "No rows returned.")
-                    return df
-                else:
-                    print("ℹ️ Query executed, no results to fetch.")
-                    return pd.DataFrame()
+                with span("db.fetch_all") as fetch_span:
+                    if max_rows:
+                        result = cursor.fetchmany(max_rows)
+                        truncated = len(result) == max_rows and cursor.fetchone() is not None
+                    else:
+                        result = cursor.fetchall()
+                    fetch_span.rows = len(result)
             elif fetch_one:
                 result = cursor.fetchone()
-                if result:
-                    row_dict = dict(result)
-                    print("\n📄 [QUERY RESULT (Single Row)]")
-                    print(row_dict)
-                    return row_dict
-                else:
-                    print("ℹ️ Query executed, no single row result to fetch.")
-                    return None
+        except sqlite3.Error as e:
+            self._report_query_error(e, start)
+            self.conn.rollback()
+            return None
+        finally:
+            self._stop_query_guard()
 
-            if not is_ddl_dml and not fetch_all and not fetch_one:
-                print("✅ Query executed (no fetch specified).")
-                return True
+        self.last_abort = None
+        if fetch_all:
+            self._observe_query(sql_query, params, time.perf_counter() - start)
+            if not result:
+                print("ℹ️ Query executed, no results to fetch.")
+                return pd.DataFrame()
+            with span("db.build_dataframe", rows=len(result)):
+                df = pd.DataFrame.from_records(result, columns=[desc[0] for desc in cursor.description])
+            if truncated:
+                print(f"✂️ Result capped at {max_rows:,} rows (QUERY_MAX_ROWS); remaining rows were not fetched.")
+                df.attrs["truncated"] = True
+            elif cacheable:
+                self.result_cache.put(sql_query, params, df, max_rows)
+            self._print_result_preview(df, "📊 [QUERY RESULT]")
+            return df
+        elif fetch_one:
+            self._observe_query(sql_query, params, time.perf_counter() - start)
+            if result:
+                row_dict = dict(result)
+                print("\n📄 [QUERY RESULT (Single Row)]")
+                print(row_dict)
+                return row_dict
+            print("ℹ️ Query executed, no single row result to fetch.")
+            return None
+
+        print("✅ Query executed (no fetch specified).")
+        return True
+
+    def _start_query_guard(self, timeout):
+        self._deadline = time.monotonic() + timeout if timeout else None
+        self._cancel_requested.clear()
+        self.vm_steps = 0
+        self.query_running = True
+        self.conn.set_progress_handler(self._on_progress, PROGRESS_HANDLER_STEPS)
+        if self.on_query_change:
+            self.on_query_change(True)
+
+    def _run_guarded(self, budget, fn, *args):
+        # Runs one step of a longer read under the guard and returns what is left of the time budget.
+        step_start = time.monotonic()
+        self._start_query_guard(budget)
+        try:
+            result = fn(*args)
+        finally:
+            self._stop_query_guard()
+        return result, (max(budget - (time.monotonic() - step_start), 1e-6) if budget else budget)
+
+    def _stop_query_guard(self):
+        self.query_running = False
+        if self.conn:
+            self.conn.set_progress_handler(None, 0)
+        if self.on_query_change:
+            self.on_query_change(False)
+
+    def _on_progress(self):
+        # Called by SQLite every PROGRESS_HANDLER_STEPS VM instructions; a non-zero return aborts the statement.
+        self.vm_steps += PROGRESS_HANDLER_STEPS
+        if self._cancel_requested.is_set():
+            return 1
+        return int(self._deadline is not None and time.monotonic() > self._deadline)
+
+    def cancel_query(self):
+        # Safe to call from any thread, e.g. the GUI's Cancel button.
+        if self.query_running and self.conn:
+            self._cancel_requested.set()
+            self.conn.interrupt()
+            return True
+        return False
 
+    def _report_query_error(self, error, start):
+        elapsed = time.perf_counter() - start
+        if isinstance(error, sqlite3.OperationalError) and "interrupt" in str(error).lower():
+            reason = "cancelled" if self._cancel_requested.is_set() else "timed out"
+            self.last_abort = {"reason": reason, "elapsed": elapsed, "vm_steps": self.vm_steps}
+            icon = "🛑" if reason == "cancelled" else "⏱️"
+            print(f"{icon} Query {reason} after {elapsed:.2f}s (~{self.vm_steps:,} VM steps); changes rolled back.")
+        else:
+            self.last_abort = None
+            print(f"🚨 SQL Error: {error}")
+
+    @staticmethod
+    def _print_result_preview(df, heading):
+        print(f"\n{heading}")
+        if df.empty:
+            print("No rows returned.")
+            return
+        print(df.head(CONSOLE_PREVIEW_ROWS).to_string())
+        if len(df) > CONSOLE_PREVIEW_ROWS:
+            print(f"... {len(df) - CONSOLE_PREVIEW_ROWS:,} more rows not shown ({len(df):,} total).")
+
+    def iter_query_batches(self, sql_query, params=None, batch_size=5000, as_dataframe=True, timeout=None):
+        # Errors are raised, not swallowed: a consumer must never mistake a cut-off result for a complete one.
+        # The timeout covers time spent inside SQLite, not time the consumer spends between batches.
+        if not self.conn and not self.connect():
+            raise sqlite3.OperationalError(f"No connection to '{self.db_name}'.")
+        budget = self.query_timeout if timeout is None else timeout
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        start = time.perf_counter()
+        try:
+            with span("db.execute"):
+                _, budget = self._run_guarded(budget, cursor.execute, sql_query, params or ())
+            columns = [desc[0] for desc in cursor.description or ()]
+            while True:
+                with span("db.fetch_batch") as batch_span:
+                    rows, budget = self._run_guarded(budget, cursor.fetchmany, batch_size)
+                    batch_span.rows = len(rows)
+                if not rows:
+                    break
+                yield pd.DataFrame.from_records(rows, columns=columns) if as_dataframe else rows
         except sqlite3.Error as e:
-            print(f"🚨 SQL Error: {e}")
-            self.conn.rollback()
+            self._report_query_error(e, start)
+            raise
+        finally:
+            cursor.close()
+
+    def reader_connection(self):
+        # A second connection the GUI thread may page through; an in-memory DB cannot be shared this way.
+        if self.db_name == ":memory:":
+            return None
+        if self.reader_conn is None:
+            self.reader_conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        return self.reader_conn
+
+    def browse_table(self, table_name, page_size=500, columns=None):
+        if not self.table_exists(table_name):
+            print(f"❌ Table '{table_name}' does not exist.")
             return None
+        conn = self.reader_connection()
+        if conn is None:
+            return None
+        try:
+            return KeysetPager(conn, table_name, columns=columns, page_size=page_size, lock=self.reader_lock)
+        except sqlite3.Error as e:
+            print(f"⚠️ Cannot page through '{table_name}' by rowid: {e}")
+            return None
+
+    def _data_version(self):
+        return self.conn.execute("PRAGMA data_version;").fetchone()[0]
+
+    def _cached_result(self, sql_query, params, max_rows=None):
+        try:
+            self.result_cache.sync(self._data_version())
+        except sqlite3.Error:
+            self.result_cache.invalidate()
+            return None
+        with span("db.result_cache_lookup") as lookup_span:
+            df = self.result_cache.get(sql_query, params, max_rows)
+            lookup_span.rows = len(df) if df is not None else 0
+        if df is not None:
+            self._print_result_preview(df, f"⚡ [RESULT CACHE HIT] {len(df):,} rows served without re-running the query.")
+        return df
+
+    def _observe_query(self, sql_query, params, elapsed):
+        # Advice is best effort: a failure here must never fail the user's query.
+        try:
+            with span("db.index_advisor"):
+                self.index_advisor.observe(sql_query, params, elapsed)
+        except Exception as e:
+            print(f"⚠️ Index advisor skipped query: {e}")
 
     def list_tables(self, show_output=True):
-        query = "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';"
-        tables_df = self.execute_query(query, fetch_all=True, show_code=False)
-        if tables_df is not None and not tables_df.empty:
-            table_names = tables_df['name'].tolist()
+        if not self.conn and not self.connect():
+            return []
+        table_names = self.catalog.table_names()
+        if table_names:
             if show_output:
                 print("\n📁 --- Available Tables ---")
                 for name in table_names:
@@ -94,24 +301,163 @@ class DatabaseManager:
             return []
 
     def get_table_columns(self, table_name):
-        query = f"PRAGMA table_info({table_name});"
         if not self.conn:
             self.connect()
         if not self.conn:
             return []
 
-        cursor = self.conn.cursor()
         try:
-            cursor.execute(query)
-            columns_info = cursor.fetchall()
-            if columns_info:
-                return [col_info['name'] for col_info in columns_info]
-            return []
+            table = self.catalog.table(table_name)
+            return table.column_names if table else []
         except sqlite3.Error as e:
             print(f"⚠️ Error fetching column info for {table_name}: {e}")
             return []
 
-    def load_df_to_table(self, df, table_name, if_exists='replace'):
+    def describe_table(self, table_name):
+        table = self.catalog.table(table_name) if self.conn or self.connect() else None
+        if table is None:
+            return f"Table '{table_name}' columns: "
+        return table.describe()
+
+    @staticmethod
+    def _clean_column_names(columns):
+        cleaned = [col.replace(' ', '_').replace('-', '_').replace('.', '_').replace('(', '').replace(')', '') for col in columns]
+        return ['_'.join(filter(None, c.split('_'))) for c in cleaned]
+
+    @staticmethod
+    def _rows_for_sqlite(df):
+        frame = df.astype(object)
+        for col in df.columns[[pd.api.types.is_datetime64_any_dtype(t) for t in df.dtypes]]:
+            # Same text as datetime.isoformat(' '): microseconds are kept, and omitted only when they are zero.
+            frame[col] = df[col].dt.strftime('%Y-%m-%d %H:%M:%S.%f').str.removesuffix('.000000').astype(object)
+        frame = frame.where(df.notna(), None)
+        return frame.itertuples(index=False, name=None)
+
+    @staticmethod
+    def _arrow_rows_for_sqlite(batch):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        columns = []
+        for column in batch.columns:
+            if pa.types.is_dictionary(column.type):
+                column = column.dictionary_decode()
+            if pa.types.is_date(column.type):
+                column = column.cast(pa.timestamp('s'))
+            if pa.types.is_timestamp(column.type):
+                # At 'us' Arrow's %S prints six fractional digits; dropping an all-zero fraction matches the pandas path.
+                if column.type.unit != 's':
+                    column = column.cast(pa.timestamp('us', tz=column.type.tz), safe=False)
+                column = pc.strftime(column, format='%Y-%m-%d %H:%M:%S')
+                column = pc.replace_substring_regex(column, pattern=r'\.000000$', replacement='')
+            elif pa.types.is_decimal(column.type):
+                column = column.cast(pa.float64())
+            elif pa.types.is_nested(column.type) or pa.types.is_time(column.type) or pa.types.is_duration(column.type):
+                column = pa.array([None if value is None else str(value) for value in column.to_pylist()], pa.string())
+            columns.append(column.to_pylist())
+        return zip(*columns)
+
+    def table_exists(self, table_name):
+        return self.catalog.table(table_name) is not None
+
+    @classmethod
+    def chunk_columns(cls, chunk):
+        return cls._clean_column_names(chunk.schema.names if hasattr(chunk, "schema") else chunk.columns)
+
+    @staticmethod
+    def chunk_affinities(chunk, columns):
+        # Column affinity comes from the first chunk; SQLite coerces later chunks into it.
+        if hasattr(chunk, "schema"):
+            return [arrow_affinity(field.type) for field in chunk.schema]
+        typed_first, _ = optimize_dtypes(chunk.set_axis(columns, axis=1))
+        return [sqlite_affinity(dtype) for dtype in typed_first.dtypes]
+
+    @staticmethod
+    def insert_sql_for(table_name, columns):
+        placeholders = ", ".join("?" for _ in columns)
+        quoted_columns = ", ".join(f'"{col}"' for col in columns)
+        return f'INSERT INTO "{table_name}" ({quoted_columns}) VALUES ({placeholders});'
+
+    def create_chunk_table(self, cursor, table_name, chunk, if_exists='replace'):
+        columns = self.chunk_columns(chunk)
+        return columns, self.create_table_for_columns(cursor, table_name, columns, self.chunk_affinities(chunk, columns), if_exists)
+
+    def create_table_for_columns(self, cursor, table_name, columns, affinities, if_exists='replace'):
+        exists = self.table_exists(table_name)
+        if exists and if_exists == 'fail':
+            raise ValueError(f"Table '{table_name}' already exists.")
+        if exists and if_exists == 'replace':
+            cursor.execute(f'DROP TABLE "{table_name}";')
+        column_defs = ", ".join(f'"{col}" {affinity}' for col, affinity in zip(columns, affinities))
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS "{table_name}" ({column_defs});')
+        return self.insert_sql_for(table_name, columns)
+
+    @classmethod
+    def rows_for_sqlite(cls, chunk, start=0, stop=None):
+        # Arrow record batches are converted straight from their columns without a pandas copy.
+        stop = len(chunk) if stop is None else stop
+        if hasattr(chunk, "schema"):
+            return cls._arrow_rows_for_sqlite(chunk.slice(start, stop - start))
+        return cls._rows_for_sqlite(chunk.iloc[start:stop])
+
+    def insert_chunk(self, cursor, insert_sql, chunk, columns, batch_size=5000):
+        if not hasattr(chunk, "schema"):
+            chunk.columns = columns
+        with span("db.chunk_insert", rows=len(chunk)):
+            for batch_start in range(0, len(chunk), batch_size):
+                cursor.executemany(insert_sql, self.rows_for_sqlite(chunk, batch_start, batch_start + batch_size))
+
+    def load_chunks_to_table(self, chunks, table_name, if_exists='replace', batch_size=5000, progress_callback=None):
+        if not self.conn:
+            print("⚠️ Error: No active database connection to load data.")
+            if not self.connect():
+                return False
+
+        print(f"\n📥 Streaming chunks into SQL table: '{table_name}' (if_exists='{if_exists}', batch_size={batch_size})")
+        columns = None
+        insert_sql = None
+        total_rows = 0
+        start = time.perf_counter()
+        if self.conn.in_transaction:
+            self.conn.commit()
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            for chunk in chunks:
+                if columns is None:
+                    columns, insert_sql = self.create_chunk_table(cursor, table_name, chunk, if_exists)
+                    print(f"[🧾 SQL CODE GENERATED]\n{insert_sql}")
+                self.insert_chunk(cursor, insert_sql, chunk, columns, batch_size)
+                total_rows += len(chunk)
+
+                elapsed = time.perf_counter() - start
+                rows_per_sec = total_rows / elapsed if elapsed > 0 else 0.0
+                print(f"⏳ {total_rows:,} rows loaded ({rows_per_sec:,.0f} rows/sec)")
+                if progress_callback:
+                    progress_callback(total_rows, rows_per_sec)
+
+            if columns is None:
+                self.conn.rollback()
+                print(f"❌ No data to load into table '{table_name}'.")
+                return False
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            self.catalog.invalidate()
+            self.result_cache.invalidate()
+            print(f"🚨 Error streaming data into SQL table '{table_name}': {e}")
+            return False
+
+        self.catalog.invalidate()
+        self.result_cache.invalidate()
+        elapsed = time.perf_counter() - start
+        print(f"✅ {total_rows:,} rows streamed into '{table_name}' in {elapsed:.1f}s ({total_rows / max(elapsed, 1e-9):,.0f} rows/sec).")
+        with span("db.preview"):
+            preview_df = self.execute_query(f"SELECT * FROM {table_name} LIMIT 3;", fetch_all=True, show_code=False)
+        display_df_preview(preview_df, f"👀 Preview of '{table_name}' from DB")
+        return True
+
+    def load_df_to_table(self, df, table_name, if_exists='replace', optimize=True):
         if df is None or df.empty:
             print(f"❌ Cannot load empty DataFrame to table '{table_name}'.")
             return False
@@ -120,20 +466,49 @@ class DatabaseManager:
             if not self.connect():
                 return False
 
-        df.columns = [col.replace(' ', '_').replace('-', '_').replace('.', '_').replace('(', '').replace(')', '') for col in df.columns]
-        df.columns = ['_'.join(filter(None, c.split('_'))) for c in df.columns]
+        with span("db.sanitize_columns"):
+            df.columns = self._clean_column_names(df.columns)
+        # read_data_file may have optimized already; inferring a second time only costs another pass.
+        if optimize and not df.attrs.get("dtypes_optimized"):
+            with span("db.infer_dtypes", rows=len(df)):
+                df, report = optimize_dtypes(df)
+            print(report.summary())
 
         print(f"\n📥 Loading DataFrame into SQL table: '{table_name}' (if_exists='{if_exists}')")
-        print("[🧾 SQL CODE GENERATED (Conceptual - via Pandas)]")
-        print(f"DataFrame with columns {df.columns.tolist()} to be loaded into '{table_name}'.")
 
         try:
-            df.to_sql(table_name, self.conn, if_exists=if_exists, index=False)
+            with span("db.to_sql", rows=len(df), nbytes=int(df.memory_usage(deep=True).sum())):
+                exists = self.table_exists(table_name)
+                if exists and if_exists == 'fail':
+                    raise ValueError(f"Table '{table_name}' already exists.")
+                if self.conn.in_transaction:
+                    self.conn.commit()
+                if exists and if_exists == 'replace':
+                    self.conn.execute(f'DROP TABLE "{table_name}";')
+                if not exists or if_exists == 'replace':
+                    ddl = create_table_ddl(table_name, df)
+                    print(f"[🧾 SQL CODE GENERATED]\n{ddl}")
+                    self.conn.execute(ddl)
+                else:
+                    # Appended frames may bring columns the table lacks (e.g. images with different headers).
+                    existing = {row[1].lower() for row in self.conn.execute(f'PRAGMA table_info("{table_name}");')}
+                    for col, dtype in df.dtypes.items():
+                        if col.lower() not in existing:
+                            print(f"➕ Adding column '{col}' to '{table_name}'.")
+                            self.conn.execute(f'ALTER TABLE "{table_name}" ADD COLUMN "{col}" {sqlite_affinity(dtype)};')
+                df.to_sql(table_name, self.conn, if_exists='append', index=False)
+                self.conn.commit()
+            self.catalog.invalidate()
+            self.result_cache.invalidate()
             print(f"✅ DataFrame successfully loaded into table '{table_name}'.")
-            preview_df = self.execute_query(f"SELECT * FROM {table_name} LIMIT 3;", fetch_all=True, show_code=False)
+            with span("db.preview"):
+                preview_df = self.execute_query(f"SELECT * FROM {table_name} LIMIT 3;", fetch_all=True, show_code=False)
             display_df_preview(preview_df, f"👀 Preview of '{table_name}' from DB")
             return True
         except Exception as e:
+            self.conn.rollback()
+            self.catalog.invalidate()
+            self.result_cache.invalidate()
             print(f"🚨 Error loading DataFrame to SQL table '{table_name}': {e}")
             return False
 
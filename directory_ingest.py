@@ -0,0 +1,262 @@
+import concurrent.futures
+import glob
+import multiprocessing
+import os
+import queue
+import re
+import time
+from file_handler import SUPPORTED_EXTENSIONS, iter_data_file_chunks
+from database_manager import DatabaseManager
+from metrics import span
+
+SOURCE_FILE_COLUMN = "source_file"
+
+# Set in each worker process by _init_worker; a ProcessPoolExecutor cannot pass queues as task arguments.
+_worker_queue = None
+_worker_cancel = None
+
+
+def _init_worker(out_queue, cancel_event):
+    global _worker_queue, _worker_cancel
+    _worker_queue = out_queue
+    _worker_cancel = cancel_event
+
+
+def _parse_file(file_path, chunk_rows, source_label):
+    rows = 0
+    columns = affinities = None
+    try:
+        for chunk in iter_data_file_chunks(file_path, chunk_rows):
+            if _worker_cancel.is_set():
+                raise InterruptedError("cancelled")
+            if source_label is not None:
+                chunk[SOURCE_FILE_COLUMN] = source_label
+            # Type inference and row conversion happen here, so the single writer only runs executemany.
+            # The writer only uses a file's affinities when its first chunk creates or widens the table.
+            if columns is None:
+                columns = DatabaseManager.chunk_columns(chunk)
+                affinities = DatabaseManager.chunk_affinities(chunk, columns)
+            records = list(DatabaseManager.rows_for_sqlite(chunk))
+            # put() blocks while the writer is behind, which bounds memory to the queue size.
+            _worker_queue.put(("chunk", file_path, columns, affinities, records))
+            rows += len(chunk)
+        _worker_queue.put(("done", file_path, rows, None))
+    except Exception as e:
+        _worker_queue.put(("done", file_path, rows, f"{type(e).__name__}: {e}"))
+    return rows
+
+
+class FileIngestResult:
+    def __init__(self, file_path, table_name, rows=0, seconds=0.0, error=None):
+        self.file_path = file_path
+        self.table_name = table_name
+        self.rows = rows
+        self.seconds = seconds
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class DirectoryIngestor:
+    def __init__(self, db_mgr, max_workers=None, chunk_rows=20_000, queue_size=None, batch_size=5000):
+        self.db_mgr = db_mgr
+        self.max_workers = max_workers or (len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()) or 1
+        self.chunk_rows = chunk_rows
+        self.queue_size = queue_size or 2 * self.max_workers
+        self.batch_size = batch_size
+        # spawn keeps worker processes independent of the Tk and logic threads running in this one.
+        self._context = multiprocessing.get_context("spawn")
+        # Created on first ingest: a process-shared Event allocates OS semaphores and starts the resource tracker.
+        self._cancel_event = None
+
+    @staticmethod
+    def resolve_paths(path_or_glob):
+        path_or_glob = os.path.expanduser(path_or_glob.strip())
+        if os.path.isdir(path_or_glob):
+            candidates = [os.path.join(path_or_glob, name) for name in os.listdir(path_or_glob)]
+        else:
+            candidates = glob.glob(path_or_glob, recursive=True)
+        return sorted(p for p in candidates if os.path.isfile(p) and p.lower().endswith(SUPPORTED_EXTENSIONS))
+
+    @staticmethod
+    def source_root(path_or_glob):
+        # The folder a glob starts from: "exports/**/*.csv" -> "exports".
+        root = os.path.expanduser(path_or_glob.strip())
+        if not os.path.isdir(root):
+            root = os.path.dirname(root)
+            while glob.has_magic(root):
+                root = os.path.dirname(root)
+        return os.path.abspath(root or os.curdir)
+
+    @staticmethod
+    def source_label(file_path, root):
+        # Relative to the glob root, so exports/2024/orders.csv and exports/2025/orders.csv stay distinct.
+        return os.path.relpath(os.path.abspath(file_path), root).replace(os.sep, "/")
+
+    @staticmethod
+    def table_name_for(file_path, template="{stem}_table"):
+        stem, ext = os.path.splitext(os.path.basename(file_path))
+        parent = os.path.basename(os.path.dirname(os.path.abspath(file_path)))
+        name = template.format(stem=stem, ext=ext.lstrip('.'), parent=parent)
+        return re.sub(r'\W+', '_', name).strip('_') or "imported_table"
+
+    def cancel(self):
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+
+    def ingest(self, paths, table_template="{stem}_table", union_table=None, if_exists='replace', progress_callback=None,
+               source_root=None):
+        if not self.db_mgr.conn and not self.db_mgr.connect():
+            return []
+        conn = self.db_mgr.conn
+        if conn.in_transaction:
+            conn.commit()
+        if self._cancel_event is None:
+            self._cancel_event = self._context.Event()
+        self._cancel_event.clear()
+        out_queue = self._context.Queue(maxsize=self.queue_size)
+        tables = {path: union_table or self.table_name_for(path, table_template) for path in paths}
+        results = {path: FileIngestResult(path, tables[path]) for path in paths}
+        labels = {}
+        if union_table and paths:
+            root = source_root or os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+            labels = {path: self.source_label(path, root) for path in paths}
+        else:
+            self._reject_name_collisions(tables, results)
+        started = {}
+        table_state = {}
+        pending = {path for path in paths if results[path].ok}
+        total_rows = 0
+        start = time.perf_counter()
+        cursor = conn.cursor()
+        print(f"\n🗃️ [BULK INGEST] {len(paths)} file(s), {self.max_workers} parser process(es), "
+              f"{'union into ' + union_table if union_table else 'one table per file'}")
+
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self._context,
+                                                      initializer=_init_worker, initargs=(out_queue, self._cancel_event))
+        futures = {pool.submit(_parse_file, path, self.chunk_rows, labels.get(path)): path
+                   for path in paths if path in pending}
+        try:
+            if union_table and if_exists == 'replace' and self.db_mgr.table_exists(union_table):
+                cursor.execute(f'DROP TABLE "{union_table}";')
+            while pending:
+                try:
+                    message = out_queue.get(timeout=0.5)
+                except queue.Empty:
+                    # A worker that died (e.g. killed by the OS) never reports "done" for its file.
+                    for future, path in futures.items():
+                        if path in pending and future.done() and future.exception() is not None:
+                            message = ("done", path, 0, f"parser process failed: {future.exception()}")
+                            break
+                    else:
+                        continue
+
+                if message[0] == "chunk":
+                    _, path, columns, affinities, records = message
+                    started.setdefault(path, time.perf_counter())
+                    self._write_chunk(cursor, table_state, tables[path], columns, affinities, records, if_exists, union_table is not None)
+                    total_rows += len(records)
+                    elapsed = time.perf_counter() - start
+                    if progress_callback:
+                        progress_callback(len(paths) - len(pending), len(paths), total_rows, total_rows / elapsed if elapsed > 0 else 0.0)
+                    continue
+
+                _, path, rows, error = message
+                if path not in pending:
+                    continue
+                pending.discard(path)
+                result = results[path]
+                result.rows = rows
+                result.seconds = time.perf_counter() - started.get(path, start)
+                result.error = error
+                if error:
+                    self._discard_file(cursor, table_state, tables[path], labels.get(path))
+                    print(f"❌ {os.path.basename(path)}: {error}")
+                else:
+                    print(f"✅ {os.path.basename(path)} -> '{tables[path]}' ({rows:,} rows)")
+                # Each finished file is committed, so one bad file never undoes the others.
+                conn.commit()
+                if progress_callback:
+                    elapsed = time.perf_counter() - start
+                    progress_callback(len(paths) - len(pending), len(paths), total_rows, total_rows / elapsed if elapsed > 0 else 0.0)
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            for path in pending:
+                results[path].error = f"writer failed: {e}"
+            print(f"🚨 Bulk ingest stopped: {e}")
+        finally:
+            self._cancel_event.set()
+            self._drain(out_queue, futures)
+            pool.shutdown(wait=True, cancel_futures=True)
+            self.db_mgr.catalog.invalidate()
+            self.db_mgr.result_cache.invalidate()
+
+        elapsed = time.perf_counter() - start
+        loaded = sum(r.rows for r in results.values() if r.ok)
+        print(f"🏁 {loaded:,} rows from {sum(r.ok for r in results.values())}/{len(paths)} file(s) in {elapsed:.1f}s "
+              f"({loaded / max(elapsed, 1e-9):,.0f} rows/sec).")
+        return [results[path] for path in paths]
+
+    def _write_chunk(self, cursor, table_state, table_name, columns, affinities, records, if_exists, union):
+        with span("db.bulk_ingest_chunk", rows=len(records)):
+            state = table_state.get(table_name)
+            if state is None:
+                insert_sql = self.db_mgr.create_table_for_columns(cursor, table_name, columns, affinities, 'append' if union else if_exists)
+                state = table_state[table_name] = {"columns": list(columns), "insert_sql": {tuple(columns): insert_sql}}
+            insert_sql = state["insert_sql"].get(tuple(columns))
+            if insert_sql is None:
+                # Union mode: files may disagree on columns, so new ones are added and missing ones stay NULL.
+                for col, affinity in zip(columns, affinities):
+                    if col not in state["columns"]:
+                        cursor.execute(f'ALTER TABLE "{table_name}" ADD COLUMN "{col}" {affinity};')
+                        state["columns"].append(col)
+                insert_sql = state["insert_sql"][tuple(columns)] = self.db_mgr.insert_sql_for(table_name, columns)
+            for batch_start in range(0, len(records), self.batch_size):
+                cursor.executemany(insert_sql, records[batch_start:batch_start + self.batch_size])
+
+    @staticmethod
+    def _reject_name_collisions(tables, results):
+        # Two files mapped to one table would be merged silently, and a failure in either would drop both.
+        by_table = {}
+        for path, table_name in tables.items():
+            by_table.setdefault(table_name, []).append(path)
+        for table_name, clashing in by_table.items():
+            if len(clashing) < 2:
+                continue
+            names = ", ".join(os.path.basename(path) for path in clashing)
+            print(f"⚠️ {names} would all load into '{table_name}'; skipped. Add {{ext}} or {{parent}} to the table template.")
+            for path in clashing:
+                results[path].error = f"table name '{table_name}' is shared with another file ({names})"
+
+    def _discard_file(self, cursor, table_state, table_name, source_label):
+        if table_name not in table_state:
+            return
+        if source_label is not None:
+            cursor.execute(f'DELETE FROM "{table_name}" WHERE "{SOURCE_FILE_COLUMN}" = ?;', (source_label,))
+        else:
+            cursor.execute(f'DROP TABLE IF EXISTS "{table_name}";')
+            table_state.pop(table_name, None)
+
+    @staticmethod
+    def _drain(out_queue, futures):
+        # Workers blocked on a full queue must be able to finish before the pool can shut down.
+        while not all(future.done() for future in futures):
+            try:
+                out_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    @staticmethod
+    def stats_frame(results):
+        import pandas as pd
+
+        return pd.DataFrame([{
+            "file": os.path.basename(r.file_path),
+            "table": r.table_name,
+            "rows": r.rows,
+            "seconds": round(r.seconds, 2),
+            "status": "✅ ok" if r.ok else f"❌ {r.error}",
+        } for r in results])
@@ -0,0 +1,148 @@
+import re
+import warnings
+import numpy as np
+import pandas as pd
+
+# Only text already in the form timestamps are written back in (YYYY-MM-DD HH:MM:SS[.ffffff]) becomes datetime64,
+# so conversion never rewrites what the user stored. Version strings ("1.2.3") and d/m vs m/d dates stay text.
+DATE_LIKE = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(\.\d{6})?$')
+NUMERIC_LIKE = re.compile(r'^[-+]?(\d{1,3}(,\d{3})+|\d+)?(\.\d+)?([eE][-+]?\d+)?$')
+# Zero-padded codes (ZIPs, account numbers) and IDs too long for int64 are identifiers, not numbers.
+IDENTIFIER_LIKE = re.compile(r'^[-+]?(0\d+|\d{19,})(\.\d+)?$')
+INT64_MIN, INT64_MAX = np.iinfo(np.int64).min, np.iinfo(np.int64).max
+
+def sqlite_affinity(dtype):
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+def arrow_affinity(arrow_type):
+    import pyarrow as pa
+
+    if pa.types.is_integer(arrow_type) or pa.types.is_boolean(arrow_type):
+        return "INTEGER"
+    if pa.types.is_floating(arrow_type) or pa.types.is_decimal(arrow_type):
+        return "REAL"
+    if pa.types.is_dictionary(arrow_type):
+        return arrow_affinity(arrow_type.value_type)
+    return "TEXT"
+
+def create_table_ddl(table_name, df):
+    column_defs = ", ".join(f'"{col}" {sqlite_affinity(dtype)}' for col, dtype in df.dtypes.items())
+    return f'CREATE TABLE "{table_name}" ({column_defs});'
+
+def _is_text_column(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return False
+    return pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype)
+
+def _coerce_numeric(text):
+    if not text.map(lambda v: bool(NUMERIC_LIKE.match(v)) and v not in ("", "+", "-", ".")).all():
+        return None
+    if text.map(lambda v: bool(IDENTIFIER_LIKE.match(v.replace(",", "")))).any():
+        return None
+    return pd.to_numeric(text.str.replace(",", "", regex=False), errors="coerce")
+
+def _coerce_datetime(text):
+    if not text.map(lambda v: bool(DATE_LIKE.match(v))).all():
+        return None
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        parsed = pd.to_datetime(text, errors="coerce", format="ISO8601")
+    if parsed.isna().any():
+        return None
+    written = parsed.dt.strftime('%Y-%m-%d %H:%M:%S.%f').str.removesuffix('.000000')
+    return parsed if (written == text).all() else None
+
+def _is_bool_column(values):
+    return values.map(lambda v: isinstance(v, (bool, np.bool_))).all()
+
+def _downcast(series):
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return series
+    if pd.api.types.is_float_dtype(series.dtype):
+        non_null = series.dropna()
+        # 2**63 is exactly representable as a float, so the upper bound must be strict.
+        in_int64_range = not non_null.empty and non_null.min() >= INT64_MIN and non_null.max() < float(2 ** 63)
+        if series.notna().all() and in_int64_range and (non_null == np.floor(non_null)).all():
+            return pd.to_numeric(series.astype("int64"), downcast="integer")
+        as_float32 = series.astype("float32")
+        if ((as_float32.astype("float64") == series) | series.isna()).all():
+            return as_float32
+        return series
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return pd.to_numeric(series, downcast="integer")
+    return series
+
+def _estimate_sqlite_bytes(series):
+    non_null = series.dropna()
+    if non_null.empty:
+        return 0
+    affinity = sqlite_affinity(series.dtype)
+    if affinity == "INTEGER":
+        magnitude = np.abs(non_null.astype("int64").to_numpy())
+        sizes = np.select(
+            [magnitude <= 1, magnitude < 2**7, magnitude < 2**15, magnitude < 2**23, magnitude < 2**31, magnitude < 2**47],
+            [0, 1, 2, 3, 4, 6], default=8)
+        return int(sizes.sum())
+    if affinity == "REAL":
+        return 8 * len(non_null)
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return 19 * len(non_null)
+    return int(non_null.astype(str).str.len().sum())
+
+
+class DtypeReport:
+    def __init__(self):
+        self.columns = []
+        self.memory_before = 0
+        self.memory_after = 0
+        self.disk_before = 0
+        self.disk_after = 0
+
+    def summary(self):
+        lines = [f"🧮 [DTYPE OPTIMIZATION] memory {self.memory_before / 1024 ** 2:,.2f} MB -> {self.memory_after / 1024 ** 2:,.2f} MB, "
+                 f"est. on-disk {self.disk_before / 1024 ** 2:,.2f} MB -> {self.disk_after / 1024 ** 2:,.2f} MB"]
+        for col, before, after, affinity in self.columns:
+            if before != after:
+                lines.append(f"   🔸 {col}: {before} -> {after} ({affinity})")
+        return "\n".join(lines)
+
+
+def optimize_dtypes(df, category_max_ratio=0.5, category_max_unique=1000):
+    report = DtypeReport()
+    report.memory_before = int(df.memory_usage(deep=True).sum())
+    optimized = {}
+    for col in df.columns:
+        series = df[col]
+        report.disk_before += _estimate_sqlite_bytes(series)
+        before = str(series.dtype)
+
+        if _is_text_column(series):
+            non_null = series.dropna()
+            text = non_null.astype(str).str.strip()
+            text = text[text != ""]
+            if not non_null.empty and _is_bool_column(non_null):
+                series = series.astype("bool" if len(non_null) == len(series) else "boolean")
+            elif not text.empty:
+                numeric = _coerce_numeric(text)
+                if numeric is not None and numeric.notna().all():
+                    series = numeric.reindex(series.index)
+                else:
+                    dates = _coerce_datetime(text)
+                    if dates is not None:
+                        series = dates.reindex(series.index)
+                    elif text.nunique() <= min(category_max_unique, category_max_ratio * len(series)):
+                        series = series.where(series.isna(), series.astype(str).str.strip()).astype("category")
+
+        series = _downcast(series)
+        optimized[col] = series
+        report.disk_after += _estimate_sqlite_bytes(series)
+        report.columns.append((col, before, str(series.dtype), sqlite_affinity(series.dtype)))
+
+    result = pd.DataFrame(optimized, index=df.index)
+    result.attrs["dtypes_optimized"] = True
+    report.memory_after = int(result.memory_usage(deep=True).sum())
+    return result, report
@@ -0,0 +1,308 @@
+import concurrent.futures
+import gzip
+import io
+import os
+import sqlite3
+import threading
+import time
+from metrics import span
+
+EXPORT_FORMATS = {
+    ".csv": "csv",
+    ".csv.gz": "csv.gz",
+    ".csv.zst": "csv.zst",
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".xlsx": "xlsx",
+}
+DEFAULT_BATCH_ROWS = 50_000
+SCHEMA_BUFFER_ROWS = 4 * DEFAULT_BATCH_ROWS
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def export_format(path):
+    lower = path.lower()
+    for extension, fmt in sorted(EXPORT_FORMATS.items(), key=lambda item: -len(item[0])):
+        if lower.endswith(extension):
+            return fmt
+    raise ValueError(f"Unsupported export format for '{path}'. Use one of: {', '.join(EXPORT_FORMATS)}")
+
+
+def iter_dataframe_batches(df, batch_rows=DEFAULT_BATCH_ROWS):
+    for start in range(0, len(df), batch_rows):
+        yield df.iloc[start:start + batch_rows]
+
+
+def iter_sqlite_batches(db_path, sql_query, params=None, batch_rows=DEFAULT_BATCH_ROWS):
+    # Opens its own connection so an export can run on a worker thread while the app keeps using its own.
+    import pandas as pd
+
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.execute(sql_query, params or ())
+        columns = [desc[0] for desc in cursor.description]
+        while True:
+            rows = cursor.fetchmany(batch_rows)
+            if not rows:
+                break
+            yield pd.DataFrame.from_records(rows, columns=columns)
+    finally:
+        conn.close()
+
+
+def _open_text_stream(path, fmt):
+    if fmt == "csv":
+        return open(path, "w", newline="", encoding="utf-8")
+    if fmt == "csv.gz":
+        return gzip.open(path, "wt", newline="", encoding="utf-8", compresslevel=6)
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("zstd export needs the optional 'zstandard' package (pip install zstandard).")
+    raw = open(path, "wb")
+    return io.TextIOWrapper(zstandard.ZstdCompressor(level=6).stream_writer(raw), newline="", encoding="utf-8")
+
+
+class _CsvSink:
+    def __init__(self, path, fmt):
+        self.stream = _open_text_stream(path, fmt)
+        self.header = True
+
+    def write(self, batch):
+        batch.to_csv(self.stream, index=False, header=self.header)
+        self.header = False
+
+    def close(self):
+        self.stream.close()
+
+
+class _ArrowSink:
+    # An Arrow/Parquet file has one schema, but SQLite lets a column change type from row to row. The schema is
+    # widened as batches arrive: null takes any type, ints widen to float and any other mix becomes string.
+    # Batches are held back until every column has shown a real type (or the buffer fills); a type change after
+    # that rewrites the rows already written under the wider schema.
+    format_name = "Arrow"
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ValueError(f"{self.format_name} export needs the optional 'pyarrow' package (pip install pyarrow).")
+        self.pa = pa
+        self.path = path
+        self.schema = None
+        self.writer = None
+        self._pending = []
+        self._pending_rows = 0
+
+    def _open_writer(self, schema):
+        return self.pa.ipc.new_file(self.path, schema)
+
+    def _iter_written(self, path):
+        with self.pa.memory_map(path, "r") as source:
+            reader = self.pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+
+    def _to_arrow(self, batch):
+        try:
+            return self.pa.Table.from_pandas(batch, preserve_index=False)
+        except (self.pa.ArrowInvalid, self.pa.ArrowTypeError):
+            pass
+        # An object column holding several Python types (e.g. 1 and 'x') is exported as text.
+        batch = batch.copy()
+        for i, dtype in enumerate(batch.dtypes):
+            if dtype != object:
+                continue
+            column = batch.iloc[:, i]
+            try:
+                self.pa.array(column, from_pandas=True)
+            except (self.pa.ArrowInvalid, self.pa.ArrowTypeError):
+                batch.isetitem(i, [None if value is None or value != value else str(value) for value in column])
+        return self.pa.Table.from_pandas(batch, preserve_index=False)
+
+    def _merge_type(self, current, new):
+        types = self.pa.types
+        if current == new or types.is_null(new):
+            return current
+        if types.is_null(current):
+            return new
+        numeric = [types.is_integer(t) or types.is_floating(t) or types.is_boolean(t) for t in (current, new)]
+        if all(numeric):
+            return self.pa.float64() if types.is_floating(current) or types.is_floating(new) else self.pa.int64()
+        return self.pa.string()
+
+    def _merged_schema(self, schema, table):
+        merged = self.pa.schema([field.with_type(self._merge_type(field.type, other.type))
+                                 for field, other in zip(schema, table.schema)], metadata=schema.metadata)
+        # The pandas metadata records the first batch's dtypes, so it is dropped once a column has changed type.
+        return schema if merged.equals(schema) else merged.remove_metadata()
+
+    def write(self, batch):
+        table = self._to_arrow(batch)
+        if self.writer is None:
+            self.schema = table.schema if self.schema is None else self._merged_schema(self.schema, table)
+            self._pending.append(table)
+            self._pending_rows += table.num_rows
+            if self._pending_rows >= SCHEMA_BUFFER_ROWS or not any(self.pa.types.is_null(field.type) for field in self.schema):
+                self._flush()
+            return
+        schema = self._merged_schema(self.schema, table)
+        if schema is not self.schema:
+            self._rewrite(schema)
+        self.writer.write_table(table.cast(self.schema, safe=False))
+
+    def _flush(self):
+        self.writer = self._open_writer(self.schema)
+        for table in self._pending:
+            self.writer.write_table(table.cast(self.schema, safe=False))
+        self._pending, self._pending_rows = [], 0
+
+    def _rewrite(self, schema):
+        # Each column can only widen a couple of times, so this costs at most a few passes over the output.
+        self.writer.close()
+        self.writer = None
+        old_path = f"{self.path}.old"
+        os.replace(self.path, old_path)
+        try:
+            self.schema = schema
+            self.writer = self._open_writer(schema)
+            for batch in self._iter_written(old_path):
+                self.writer.write_table(self.pa.Table.from_batches([batch]).cast(schema, safe=False))
+        finally:
+            os.remove(old_path)
+
+    def close(self):
+        if self.writer is None and self._pending:
+            self._flush()
+        if self.writer is not None:
+            self.writer.close()
+
+
+class _ParquetSink(_ArrowSink):
+    format_name = "Parquet"
+
+    def _open_writer(self, schema):
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(self.path, schema, compression="zstd")
+
+    def _iter_written(self, path):
+        import pyarrow.parquet as pq
+
+        with pq.ParquetFile(path) as written:
+            yield from written.iter_batches()
+
+
+class _ArrowIpcSink(_ArrowSink):
+    pass
+
+
+class _XlsxSink:
+    def __init__(self, path):
+        from openpyxl import Workbook
+
+        self.path = path
+        # write_only streams rows to disk instead of building the whole sheet in memory.
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet()
+        self.header = True
+
+    def write(self, batch):
+        if self.header:
+            self.sheet.append([str(col) for col in batch.columns])
+            self.header = False
+        for row in batch.astype(object).where(batch.notna(), None).itertuples(index=False, name=None):
+            self.sheet.append(list(row))
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+def _open_sink(path, fmt):
+    if fmt in ("csv", "csv.gz", "csv.zst"):
+        return _CsvSink(path, fmt)
+    if fmt == "parquet":
+        return _ParquetSink(path)
+    if fmt == "arrow":
+        return _ArrowIpcSink(path)
+    return _XlsxSink(path)
+
+
+def export_batches(batches, path, progress_callback=None, cancel_event=None):
+    fmt = export_format(path)
+    tmp_path = f"{path}.part"
+    sink = _open_sink(tmp_path, fmt)
+    total_rows = 0
+    start = time.perf_counter()
+    try:
+        for batch in batches:
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExportCancelled(f"Export to {os.path.basename(path)} cancelled after {total_rows:,} rows.")
+            with span("export.write_batch", rows=len(batch)):
+                sink.write(batch)
+            total_rows += len(batch)
+            if progress_callback:
+                elapsed = time.perf_counter() - start
+                progress_callback(total_rows, total_rows / elapsed if elapsed > 0 else 0.0)
+        sink.close()
+    except BaseException:
+        sink.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    # Readers never see a half-written file under the final name.
+    os.replace(tmp_path, path)
+    return total_rows
+
+
+class BackgroundExporter:
+    def __init__(self, max_workers=1, on_change=None):
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export")
+        # One event per export: a new export must not clear a Cancel already sent to the earlier ones.
+        self._cancel_events = set()
+        self._active = 0
+        self._lock = threading.Lock()
+        self.on_change = on_change
+
+    @property
+    def active(self):
+        return self._active
+
+    def cancel(self):
+        with self._lock:
+            for event in self._cancel_events:
+                event.set()
+
+    def _changed(self, delta):
+        with self._lock:
+            self._active += delta
+        if self.on_change:
+            self.on_change(self._active)
+
+    def submit(self, batches_factory, path, progress_callback=None, done_callback=None):
+        # batches_factory runs on the worker so cursors and file handles are created on the thread that uses them.
+        cancel_event = threading.Event()
+        with self._lock:
+            self._cancel_events.add(cancel_event)
+        self._changed(1)
+
+        def run():
+            try:
+                return export_batches(batches_factory(), path, progress_callback, cancel_event)
+            finally:
+                with self._lock:
+                    self._cancel_events.discard(cancel_event)
+                self._changed(-1)
+
+        future = self._pool.submit(run)
+        if done_callback:
+            future.add_done_callback(done_callback)
+        return future
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
@@ -1,29 +1,159 @@
 import pandas as pd
 import os
 import re
+from metrics import span
+from dtype_inference import optimize_dtypes
 
-def read_data_file(file_path):
+DEFAULT_CHUNK_ROWS = 50_000
+COLUMNAR_EXTENSIONS = ('.parquet', '.arrow', '.feather', '.ipc')
+SUPPORTED_EXTENSIONS = ('.csv', '.xls', '.xlsx') + COLUMNAR_EXTENSIONS
+
+def sanitize_columns(columns):
+    cleaned = [re.sub(r'\W+', '_', str(col)).strip('_') for col in columns]
+    return [col if col else f"unnamed_col_{i}" for i, col in enumerate(cleaned)]
+
+def suggest_table_name(file_path):
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    return re.sub(r'\W+', '_', base_name).strip('_') + "_table"
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ValueError("Parquet/Arrow files need the optional 'pyarrow' package (pip install pyarrow).")
+    return pyarrow
+
+def _open_arrow_ipc(file_path):
+    pa = _require_pyarrow()
+    import pyarrow.ipc
+
+    # Memory-mapped, so record batches point straight into the page cache instead of being read into the heap.
+    source = pa.memory_map(file_path, 'r')
+    try:
+        return pa.ipc.open_file(source)
+    except pa.ArrowInvalid:
+        source.seek(0)
+        return pa.ipc.open_stream(source)
+
+def _read_columnar(file_path, columns=None):
+    if file_path.endswith('.parquet'):
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(file_path, columns=columns, memory_map=True)
+    else:
+        table = _open_arrow_ipc(file_path).read_all()
+        if columns:
+            table = table.select(columns)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+def iter_arrow_batches(file_path, chunk_rows=DEFAULT_CHUNK_ROWS, columns=None):
+    if file_path.endswith('.parquet'):
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+
+        yield from pq.ParquetFile(file_path, memory_map=True).iter_batches(batch_size=chunk_rows, columns=columns)
+        return
+    reader = _open_arrow_ipc(file_path)
+    batches = (reader.get_batch(i) for i in range(reader.num_record_batches)) if hasattr(reader, "get_batch") else reader
+    for batch in batches:
+        if columns:
+            batch = batch.select(columns)
+        for start in range(0, batch.num_rows, chunk_rows):
+            yield batch.slice(start, chunk_rows)
+
+def read_data_file(file_path, optimize=True, columns=None):
     if not os.path.exists(file_path):
         print(f"❌ Error: File not found at {file_path}")
         return None, None
     try:
-        if file_path.endswith('.csv'):
-            df = pd.read_csv(file_path)
-        elif file_path.endswith(('.xls', '.xlsx')):
-            df = pd.read_excel(file_path)
-        else:
-            print("⚠️ Unsupported file type. Please use CSV or Excel.")
+        if not file_path.endswith(SUPPORTED_EXTENSIONS):
+            print("⚠️ Unsupported file type. Please use CSV, Excel, Parquet or Arrow IPC.")
             return None, None
+        with span("file.parse", nbytes=os.path.getsize(file_path)) as parse_span:
+            if file_path.endswith(COLUMNAR_EXTENSIONS):
+                df = _read_columnar(file_path, columns)
+            elif file_path.endswith('.csv'):
+                df = pd.read_csv(file_path, usecols=columns)
+            else:
+                df = pd.read_excel(file_path, usecols=columns)
+            parse_span.rows = len(df)
         print(f"✅ File '{file_path}' read successfully.")
-        df.columns = [re.sub(r'\W+', '_', str(col)).strip('_') for col in df.columns]
-        df.columns = [col if col else f"unnamed_col_{i}" for i, col in enumerate(df.columns)]
-        base_name = os.path.splitext(os.path.basename(file_path))[0]
-        suggested_table_name = re.sub(r'\W+', '_', base_name).strip('_') + "_table"
-        return df, suggested_table_name
+        with span("file.sanitize_columns"):
+            df.columns = sanitize_columns(df.columns)
+        if optimize:
+            with span("file.infer_dtypes", rows=len(df)):
+                df, report = optimize_dtypes(df)
+            print(report.summary())
+        return df, suggest_table_name(file_path)
     except Exception as e:
         print(f"🔥 Error reading or processing file '{file_path}': {e}")
         return None, None
 
+def _iter_xlsx_chunks(file_path, chunk_rows):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunk_rows:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+def _iter_raw_chunks(file_path, chunk_rows, columns=None, as_arrow=False):
+    if file_path.endswith(COLUMNAR_EXTENSIONS):
+        for batch in iter_arrow_batches(file_path, chunk_rows, columns):
+            yield batch if as_arrow else batch.to_pandas()
+    elif file_path.endswith('.csv'):
+        yield from pd.read_csv(file_path, chunksize=chunk_rows)
+    elif file_path.endswith('.xlsx'):
+        yield from _iter_xlsx_chunks(file_path, chunk_rows)
+    else:
+        # Legacy .xls has no row-streaming reader, so it is parsed once and sliced.
+        df = pd.read_excel(file_path)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+
+def iter_data_file_chunks(file_path, chunk_rows=DEFAULT_CHUNK_ROWS, as_arrow=False):
+    columns = None
+    raw_chunks = _iter_raw_chunks(file_path, chunk_rows, as_arrow=as_arrow)
+    while True:
+        with span("file.parse_chunk") as parse_span:
+            chunk = next(raw_chunks, None)
+            parse_span.rows = len(chunk) if chunk is not None else 0
+        if chunk is None:
+            break
+        if columns is None:
+            columns = sanitize_columns(chunk.schema.names if as_arrow else chunk.columns)
+        if as_arrow:
+            chunk = chunk.rename_columns(columns)
+        else:
+            chunk.columns = columns
+        yield chunk
+
+def read_data_file_chunks(file_path, chunk_rows=DEFAULT_CHUNK_ROWS, as_arrow=None):
+    if not os.path.exists(file_path):
+        print(f"❌ Error: File not found at {file_path}")
+        return None, None
+    if not file_path.endswith(SUPPORTED_EXTENSIONS):
+        print("⚠️ Unsupported file type. Please use CSV, Excel, Parquet or Arrow IPC.")
+        return None, None
+    # Columnar files are handed to the loader as Arrow record batches, skipping the pandas conversion.
+    if as_arrow is None:
+        as_arrow = file_path.endswith(COLUMNAR_EXTENSIONS)
+    print(f"📦 Streaming '{file_path}' in chunks of {chunk_rows:,} rows.")
+    return iter_data_file_chunks(file_path, chunk_rows, as_arrow), suggest_table_name(file_path)
+
 if __name__ == "__main__":
     file_path = "test.csv"
     df, table_name = read_data_file(file_path)
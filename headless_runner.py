@@ -0,0 +1,455 @@
+import argparse
+import collections
+import concurrent.futures
+import json
+import os
+import sys
+import threading
+import time
+from dotenv import load_dotenv
+from virtual_table import StreamingRowSource
+
+load_dotenv()
+
+EXIT_OK, EXIT_FAILED, EXIT_INVALID_JOB = 0, 1, 2
+STATUS_INTERVAL_SECONDS = 2.0
+JOB_EXAMPLE = """example job file (JSON, or YAML with PyYAML installed):
+  {"database": "sales.sqlite", "max_parallel": 4,
+   "steps": [
+     {"id": "orders", "type": "ingest", "path": "data/orders.csv", "table": "orders"},
+     {"id": "daily", "type": "ingest", "path": "data/daily/*.parquet", "union_table": "daily", "incremental": true},
+     {"id": "scan", "type": "extract_image", "path": "scans/invoice.png", "table": "invoice"},
+     {"id": "top", "type": "nl", "table": "orders", "question": "top 10 customers by revenue",
+      "export": "out/top.csv", "depends_on": ["orders"]},
+     {"id": "totals", "type": "sql", "sql": "SELECT Region, SUM(Amount) FROM orders GROUP BY Region",
+      "export": "out/totals.parquet", "depends_on": ["orders"]},
+     {"id": "dump", "type": "export", "table": "orders", "path": "out/orders.csv.gz", "depends_on": ["orders"]},
+     {"id": "menu", "type": "interactive", "choice": "7", "answers": ["SELECT COUNT(*) FROM orders"],
+      "depends_on": ["orders"]}]}
+Steps without depends_on run in parallel; a step whose dependency failed is skipped."""
+
+
+class HeadlessGUI:
+    # Same interface as SQLAssistantGUI. Prompts are answered from a scripted list (None once it runs out,
+    # which every flow treats as "cancelled"), and whatever would be shown on screen is logged instead.
+    def __init__(self, answers=None, name="headless"):
+        self.name = name
+        self.answers = collections.deque(answers or [])
+        self.cancel_callback = None
+        self.exporter = None
+        self.current_df_to_download = None
+        self.current_export_source = None
+        self.tables = []
+        self._last_status = 0.0
+
+    def _log(self, text):
+        print(f"[{self.name}] {text}")
+
+    def _next_answer(self, prompt):
+        answer = self.answers.popleft() if self.answers else None
+        self._log(f"❔ {prompt} -> {answer!r}")
+        return answer
+
+    def call(self, fn, *args, **kwargs):
+        future = concurrent.futures.Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+    def display_table(self, df, title: str, export_source=None):
+        self.current_df_to_download = df
+        self.current_export_source = export_source
+        self.tables.append((title, df))
+        self._log(f"📊 {title}: {0 if df is None else len(df):,} rows")
+
+    def display_row_source(self, source, title: str, downloadable=False, export_source=None):
+        self.current_export_source = export_source
+        self._log(f"📊 {title}")
+
+    def stream_table(self, title: str):
+        self._log(f"📡 {title}")
+        return StreamingRowSource()
+
+    def display_message(self, title: str, message: str, symbol="ℹ️"):
+        self._log(f"{symbol} {title}: {message}")
+
+    def prompt_for_menu_choice(self, title, intro_text, options_list):
+        answer = self._next_answer(f"{title}: {intro_text}")
+        if answer is None:
+            return None
+        for option in options_list:
+            if str(answer) in (option["value"], option["text"]):
+                return option["value"]
+        self._log(f"⚠️ '{answer}' is not one of: {', '.join(option['value'] for option in options_list)}")
+        return None
+
+    def prompt_for_text_input(self, prompt_text):
+        answer = self._next_answer(prompt_text)
+        return None if answer is None else str(answer)
+
+    def prompt_for_file(self, purpose):
+        return self._next_answer(f"file for {purpose}")
+
+    def export_in_background(self, batches_factory, file_path):
+        from exporter import export_batches
+
+        # Batch runs export synchronously, so the file is complete when the step reports success.
+        rows = export_batches(batches_factory(), file_path)
+        self._log(f"💾 Saved {rows:,} rows to {file_path}")
+
+    def set_active_jobs(self, count: int):
+        pass
+
+    def update_status(self, text: str):
+        now = time.monotonic()
+        if now - self._last_status >= STATUS_INTERVAL_SECONDS:
+            self._last_status = now
+            self._log(text)
+
+    def shutdown(self):
+        pass
+
+    def run(self):
+        pass
+
+
+class StepResult:
+    def __init__(self, step_id, step_type, status="pending", rows=None, seconds=0.0, output=None, error=None):
+        self.step_id = step_id
+        self.step_type = step_type
+        self.status = status
+        self.rows = rows
+        self.seconds = seconds
+        self.output = output
+        self.error = error
+
+    def as_dict(self):
+        return {"id": self.step_id, "type": self.step_type, "status": self.status, "rows": self.rows,
+                "seconds": round(self.seconds, 3), "output": self.output, "error": self.error}
+
+
+def load_job_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if path.lower().endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("YAML job files need the optional 'PyYAML' package (pip install pyyaml); or use JSON.")
+        job = yaml.safe_load(text)
+    else:
+        job = json.loads(text)
+    if isinstance(job, list):
+        job = {"steps": job}
+    if not isinstance(job, dict) or not isinstance(job.get("steps"), list):
+        raise ValueError("A job file needs a 'steps' list.")
+    return job
+
+
+class HeadlessRunner:
+    def __init__(self, job, db_name=None, max_parallel=None, base_dir="."):
+        self.base_dir = base_dir
+        database = job.get("database", "assistant_db.sqlite")
+        self.db_name = db_name or (database if database == ":memory:" else self._path(database))
+        self.max_parallel = max_parallel or job.get("max_parallel") or 4
+        # Parallel steps each hold their own connection; writers queue on the lock instead of failing at once.
+        self.busy_timeout = float(job.get("busy_timeout_seconds", 300))
+        self.wal = job.get("wal", True)
+        self.steps = self._validate(job["steps"])
+        self.results = {step["id"]: StepResult(step["id"], step["type"]) for step in self.steps}
+        self._lock = threading.Lock()
+
+    def _validate(self, steps):
+        handlers = self.STEP_HANDLERS
+        steps = [dict(step) for step in steps]
+        for index, step in enumerate(steps):
+            step.setdefault("id", f"step_{index + 1}")
+            if step.get("type") not in handlers:
+                raise ValueError(f"Step '{step['id']}' has unknown type {step.get('type')!r}. Use one of: {', '.join(handlers)}")
+            depends_on = step.get("depends_on") or []
+            step["depends_on"] = [depends_on] if isinstance(depends_on, str) else list(depends_on)
+        ids = [step["id"] for step in steps]
+        duplicates = {step_id for step_id in ids if ids.count(step_id) > 1}
+        if duplicates:
+            raise ValueError(f"Duplicate step ids: {', '.join(sorted(duplicates))}")
+        for step in steps:
+            unknown = [dep for dep in step["depends_on"] if dep not in ids]
+            if unknown:
+                raise ValueError(f"Step '{step['id']}' depends on unknown step(s): {', '.join(unknown)}")
+
+        by_id = {step["id"]: step for step in steps}
+        visiting, done = set(), set()
+
+        def visit(step_id):
+            if step_id in done:
+                return
+            if step_id in visiting:
+                raise ValueError(f"Dependency cycle through step '{step_id}'.")
+            visiting.add(step_id)
+            for dep in by_id[step_id]["depends_on"]:
+                visit(dep)
+            visiting.discard(step_id)
+            done.add(step_id)
+
+        for step_id in ids:
+            visit(step_id)
+        return steps
+
+    def _path(self, path):
+        return path if os.path.isabs(path) else os.path.join(self.base_dir, path)
+
+    def run(self):
+        print(f"🤖 [HEADLESS] {len(self.steps)} step(s) against '{self.db_name}', up to {self.max_parallel} in parallel")
+        if self.wal and self.db_name != ":memory:":
+            import sqlite3
+
+            # WAL lets read-only steps run while another step is writing.
+            with sqlite3.connect(self.db_name) as conn:
+                conn.execute("PRAGMA journal_mode=WAL;")
+        start = time.perf_counter()
+        waiting = list(self.steps)
+        running = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix="headless-step") as pool:
+            while waiting or running:
+                for step in list(waiting):
+                    statuses = [self.results[dep].status for dep in step["depends_on"]]
+                    if any(status in ("failed", "skipped") for status in statuses):
+                        waiting.remove(step)
+                        result = self.results[step["id"]]
+                        result.status = "skipped"
+                        result.error = "a dependency did not succeed"
+                        print(f"⏭️ [{step['id']}] skipped: {result.error}")
+                    elif all(status == "ok" for status in statuses):
+                        waiting.remove(step)
+                        running[pool.submit(self._run_step, step)] = step
+                if not running:
+                    break
+                finished, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in finished:
+                    running.pop(future)
+
+        results = [self.results[step["id"]] for step in self.steps]
+        ok = sum(result.status == "ok" for result in results)
+        print(f"🏁 [HEADLESS] {ok}/{len(results)} step(s) succeeded in {time.perf_counter() - start:.1f}s")
+        return results
+
+    def _run_step(self, step):
+        from assistant_cli import SQLAssistant
+
+        result = self.results[step["id"]]
+        assistant = None
+        start = time.perf_counter()
+        print(f"▶️ [{step['id']}] {step['type']}")
+        try:
+            gui = HeadlessGUI(step.get("answers"), name=step["id"])
+            # Every step gets its own assistant and connection: sqlite3 connections stay on the thread that made them.
+            assistant = SQLAssistant(gui=gui, db_name=self.db_name)
+            assistant.db_mgr.busy_timeout = self.busy_timeout
+            if not assistant.db_mgr.connect():
+                raise RuntimeError(f"could not connect to '{self.db_name}'")
+            result.rows, result.output = self.STEP_HANDLERS[step["type"]](self, assistant, step)
+            result.status = "ok"
+        except Exception as e:
+            result.status = "failed"
+            result.error = f"{type(e).__name__}: {e}"
+        finally:
+            result.seconds = time.perf_counter() - start
+            if assistant is not None:
+                assistant.llm.shutdown()
+                assistant.exporter.shutdown(wait=True)
+                assistant.db_mgr.close()
+        icon = "✅" if result.status == "ok" else "❌"
+        print(f"{icon} [{step['id']}] {result.status} in {result.seconds:.1f}s" + (f": {result.error}" if result.error else ""))
+        return result
+
+    def _export_result(self, assistant, step, df, sql_query):
+        if not step.get("export") or df is None:
+            return None
+        from exporter import export_batches
+
+        path = self._path(step["export"])
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        rows = export_batches(assistant.export_source(df, sql_query)(), path)
+        print(f"💾 [{step['id']}] {rows:,} rows saved to {path}")
+        return path
+
+    def _step_ingest(self, assistant, step):
+        from directory_ingest import SOURCE_FILE_COLUMN, DirectoryIngestor
+        from file_handler import read_data_file_chunks
+
+        pattern = self._path(step["path"])
+        paths = DirectoryIngestor.resolve_paths(pattern)
+        if not paths:
+            raise FileNotFoundError(f"no CSV/Excel/Parquet/Arrow files match '{step['path']}'")
+        template = step.get("table_template", "{stem}_table")
+        if_exists = step.get("if_exists", "replace")
+        single_table = step.get("table") if len(paths) == 1 else None
+
+        if step.get("incremental"):
+            from incremental_loader import IncrementalLoader
+
+            key = step.get("key") or []
+            key_columns = [col.strip() for col in key.split(",")] if isinstance(key, str) else list(key)
+            union_table = step.get("union_table")
+            loader = IncrementalLoader(assistant.db_mgr)
+            root = DirectoryIngestor.source_root(pattern)
+            # Files synced into one union table are tagged with source_file, so each sync only replaces its own rows.
+            results = [loader.sync_file(path, union_table or single_table or DirectoryIngestor.table_name_for(path, template), key_columns,
+                                        source_column=SOURCE_FILE_COLUMN if union_table else None,
+                                        source_label=DirectoryIngestor.source_label(path, root)) for path in paths]
+            failed = [r for r in results if r is None or not r.ok]
+            if failed:
+                raise RuntimeError(f"{len(failed)} file(s) failed: " + "; ".join(
+                    f"{os.path.basename(r.file_path)}: {r.error}" if r is not None else "no database connection" for r in failed))
+            return sum(r.written for r in results), {"written": sum(r.written for r in results), "deleted": sum(r.deleted for r in results)}
+
+        if len(paths) == 1 and not step.get("union_table"):
+            chunks, suggested_name = read_data_file_chunks(paths[0])
+            if chunks is None:
+                raise ValueError(f"could not read '{paths[0]}'")
+            table_name = single_table or suggested_name
+            loaded = []
+            if not assistant.db_mgr.load_chunks_to_table(chunks, table_name, if_exists,
+                                                         progress_callback=lambda rows, rate: loaded.append(rows)):
+                raise RuntimeError(f"failed to load '{paths[0]}' into '{table_name}'")
+            return (loaded[-1] if loaded else 0), table_name
+
+        ingestor = DirectoryIngestor(assistant.db_mgr, max_workers=step.get("workers"))
+        results = ingestor.ingest(paths, template, step.get("union_table"), if_exists, source_root=DirectoryIngestor.source_root(pattern))
+        failed = [r for r in results if not r.ok]
+        if failed or not results:
+            raise RuntimeError(f"{len(failed)} of {len(paths)} file(s) failed: " + "; ".join(f"{os.path.basename(r.file_path)}: {r.error}" for r in failed))
+        return sum(r.rows for r in results), sorted({r.table_name for r in results})
+
+    def _step_extract_image(self, assistant, step):
+        from batch_image_extractor import BatchImageExtractor
+
+        if assistant.image_handler is None:
+            raise RuntimeError("Image Handler is not ready. Set IMAGE_GOOGLE_API_KEY (or LLM_BACKEND=replay).")
+        image_paths = BatchImageExtractor.resolve_paths(self._path(step["path"]))
+        if not image_paths:
+            raise FileNotFoundError(f"no images match '{step['path']}'")
+        shared_table = step.get("table") if len(image_paths) > 1 else None
+        total_rows, tables = 0, []
+        for index, image_path in enumerate(image_paths):
+            job = assistant.llm.submit(f"Image: {os.path.basename(image_path)}", assistant.image_handler.image_to_dataframe, image_path,
+                                       retry_if=lambda result: result[0] is None)
+            try:
+                df, suggested_name = job.result()
+            finally:
+                assistant.llm.forget(job)
+            if df is None or df.empty:
+                raise RuntimeError(f"Gemini Vision found no table in '{os.path.basename(image_path)}'")
+            if shared_table:
+                df.insert(0, "source_image", os.path.basename(image_path))
+                table_name, if_exists = shared_table, ("replace" if index == 0 else "append")
+            else:
+                table_name = step.get("table") or assistant._sanitize_table_name(suggested_name, "image_table")
+                if_exists = step.get("if_exists", "replace")
+            if not assistant.db_mgr.load_df_to_table(df, table_name, if_exists=if_exists):
+                raise RuntimeError(f"failed to save '{os.path.basename(image_path)}' to '{table_name}'")
+            total_rows += len(df)
+            tables.append(table_name)
+        return total_rows, sorted(set(tables))
+
+    def _step_extract_paragraph(self, assistant, step):
+        if assistant.paragraph_handler is None:
+            raise RuntimeError("Paragraph Handler is not ready. Set GOOGLE_API_KEY (or LLM_BACKEND=replay).")
+        paragraph = step.get("text")
+        if paragraph is None:
+            with open(self._path(step["file"]), "r", encoding="utf-8") as f:
+                paragraph = f.read()
+        job = assistant.llm.submit(f"Paragraph: {paragraph[:40]}", assistant.paragraph_handler.paragraph_to_table, paragraph,
+                                   retry_if=lambda result: result is None)
+        try:
+            df = job.result()
+        finally:
+            assistant.llm.forget(job)
+        if df is None or df.empty:
+            raise RuntimeError("Gemini found no table in the paragraph")
+        table_name = assistant._sanitize_table_name(step.get("table") or "", "paragraph_data")
+        if not assistant.db_mgr.load_df_to_table(df, table_name, if_exists=step.get("if_exists", "replace")):
+            raise RuntimeError(f"failed to save the paragraph table to '{table_name}'")
+        return len(df), table_name
+
+    def _step_nl(self, assistant, step):
+        table_name, question = step["table"], step["question"]
+        generated_sql, from_cache = assistant.generate_sql(table_name, question)
+        df = assistant.db_mgr.execute_query(generated_sql, fetch_all=True)
+        if df is None:
+            raise RuntimeError(f"generated SQL failed: {generated_sql}")
+        if not from_cache:
+            assistant.nl_cache.put(table_name, question, generated_sql)
+        return len(df), {"sql": generated_sql, "from_cache": from_cache, "export": self._export_result(assistant, step, df, generated_sql)}
+
+    def _step_sql(self, assistant, step):
+        from query_result_cache import QueryResultCache
+
+        sql_query = step["sql"]
+        if not QueryResultCache.is_read(sql_query):
+            if not assistant.db_mgr.execute_query(sql_query, is_ddl_dml=True):
+                raise RuntimeError("statement failed")
+            return None, None
+        df = assistant.db_mgr.execute_query(sql_query, fetch_all=True, timeout=step.get("timeout"), max_rows=step.get("max_rows"))
+        if df is None:
+            abort = assistant.db_mgr.last_abort
+            raise RuntimeError(f"query aborted: {abort['reason']}" if abort else "query failed")
+        return len(df), self._export_result(assistant, step, df, sql_query)
+
+    def _step_export(self, assistant, step):
+        from exporter import export_batches, iter_sqlite_batches
+
+        if self.db_name == ":memory:":
+            raise ValueError("export steps need a file database")
+        sql_query = step.get("sql") or f'SELECT * FROM "{step["table"]}"'
+        path = self._path(step["path"])
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        rows = export_batches(iter_sqlite_batches(self.db_name, sql_query), path)
+        print(f"💾 [{step['id']}] {rows:,} rows saved to {path}")
+        return rows, path
+
+    def _step_interactive(self, assistant, step):
+        # Replays one main-menu flow with scripted dialog answers, for anything the other step types do not cover.
+        assistant._process_choice(str(step["choice"]))
+        return None, [title for title, _ in assistant.gui.tables]
+
+    STEP_HANDLERS = {
+        "ingest": _step_ingest,
+        "extract_image": _step_extract_image,
+        "extract_paragraph": _step_extract_paragraph,
+        "nl": _step_nl,
+        "sql": _step_sql,
+        "export": _step_export,
+        "interactive": _step_interactive,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run SQL Assistant steps from a job file without a display.",
+                                     epilog=JOB_EXAMPLE, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("job_file", help="JSON or YAML job file.")
+    parser.add_argument("--db", default=None, help="SQLite database (default: the job's 'database' or assistant_db.sqlite).")
+    parser.add_argument("--max-parallel", type=int, default=None, help="Steps run at once (default: the job's 'max_parallel' or 4).")
+    parser.add_argument("--report", default=None, help="Write per-step results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    try:
+        job = load_job_file(args.job_file)
+        runner = HeadlessRunner(job, args.db, args.max_parallel, base_dir=os.path.dirname(os.path.abspath(args.job_file)))
+    except (OSError, ValueError) as e:
+        print(f"❌ Invalid job file '{args.job_file}': {e}")
+        return EXIT_INVALID_JOB
+
+    results = runner.run()
+    for result in results:
+        icon = {"ok": "✅", "failed": "❌", "skipped": "⏭️"}.get(result.status, "❔")
+        rows = f"{result.rows:,} rows" if result.rows is not None else ""
+        print(f"{icon} {result.step_id:<20} {result.step_type:<18} {result.seconds:>7.1f}s {rows} {result.error or ''}")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"database": runner.db_name, "steps": [result.as_dict() for result in results]}, f, indent=2, default=str)
+        print(f"💾 Step report saved to {args.report}")
+    return EXIT_OK if all(result.status == "ok" for result in results) else EXIT_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,24 +1,139 @@
 import os
+import io
+import hashlib
 import pandas as pd
 import json
-from PIL import Image
-import google.generativeai as genai
+import time
+from PIL import Image, ImageOps, ImageStat
 from dotenv import load_dotenv
+from llm_backends import create_model_backend, is_offline_backend
+from metrics import METRICS, span
+from stream_parsers import JsonArrayStream
 load_dotenv()
 
+LOSSLESS_SOURCE_FORMATS = ("PNG", "GIF", "BMP", "TIFF")
+
 class ImageHandler:
-    def __init__(self, api_key=os.getenv("IMAGE_GOOGLE_API_KEY")):
+    def __init__(self, api_key=os.getenv("IMAGE_GOOGLE_API_KEY"), max_dimension=2048, jpeg_quality=85,
+                 cache_dir=os.getenv("IMAGE_TABLE_CACHE_DIR", ".image_table_cache"), model=None):
         self.api_key=api_key
-        if not self.api_key:
+        self.max_dimension = max_dimension
+        self.jpeg_quality = jpeg_quality
+        self.cache_dir = cache_dir
+        if not self.api_key and model is None and not is_offline_backend():
             raise ValueError("❌ Gemini API key not provided. Set it in the constructor or as environment variable 'GEMINI_API_KEY'.")
-        genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-pro-vision')
+        self.model = model or create_model_backend('gemini-pro-vision', self.api_key)
         print("✅ GeminiTableExtractor initialized successfully.")
 
     def is_gemini_available(self):
-        return self.api_key is not None
+        return self.model is not None
+
+    @staticmethod
+    def _is_effectively_grayscale(img, saturation_threshold=12):
+        sample = img.convert("RGB").resize((64, 64)).convert("HSV")
+        return ImageStat.Stat(sample.getchannel("S")).mean[0] < saturation_threshold
+
+    def _preprocess_image(self, image_bytes):
+        with Image.open(io.BytesIO(image_bytes)) as original:
+            source_format = original.format or "JPEG"
+            img = ImageOps.exif_transpose(original)
+            resized = max(img.size) > self.max_dimension
+            if resized:
+                img.thumbnail((self.max_dimension, self.max_dimension), Image.LANCZOS)
+
+            if img.mode in ("RGBA", "LA", "P"):
+                rgba = img.convert("RGBA")
+                img = Image.new("RGB", rgba.size, "white")
+                img.paste(rgba, mask=rgba.getchannel("A"))
+            if self._is_effectively_grayscale(img):
+                img = img.convert("L")
+            elif img.mode != "RGB":
+                img = img.convert("RGB")
+
+            buffer = io.BytesIO()
+            if source_format in LOSSLESS_SOURCE_FORMATS:
+                img.save(buffer, format="PNG", optimize=True)
+                mime_type = "image/png"
+            else:
+                img.save(buffer, format="JPEG", quality=self.jpeg_quality, optimize=True)
+                mime_type = "image/jpeg"
+
+        processed = buffer.getvalue()
+        if not resized and len(processed) >= len(image_bytes):
+            original_mime = Image.MIME.get(source_format, "image/jpeg")
+            return image_bytes, original_mime
+        return processed, mime_type
+
+    def _cache_path(self, image_bytes):
+        if not self.cache_dir:
+            return None
+        settings = f"{self.max_dimension}:{self.jpeg_quality}".encode("utf-8")
+        content_hash = hashlib.sha256(settings + image_bytes).hexdigest()
+        return os.path.join(self.cache_dir, f"{content_hash}.json")
+
+    def _load_cached_dataframe(self, cache_path):
+        if not cache_path or not os.path.exists(cache_path):
+            return None
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                return pd.read_json(io.StringIO(f.read()), orient="split", dtype=False, convert_dates=False)
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable image cache entry {cache_path}: {e}")
+            return None
+
+    def _store_cached_dataframe(self, cache_path, df):
+        if not cache_path:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = cache_path + ".tmp"
+            df.to_json(tmp_path, orient="split", index=False)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            print(f"⚠️ Could not write image cache entry {cache_path}: {e}")
+
+    @staticmethod
+    def _parse_table_json(text_output):
+        data = json.loads(text_output)
+        if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+            raise ValueError("⚠️ Invalid table format received from Gemini.")
+        return pd.DataFrame(data)
+
+    @staticmethod
+    def _suggest_table_name(image_path):
+        base_name = os.path.splitext(os.path.basename(image_path))[0]
+        return base_name.strip().replace(' ', '_') + "_gemini_table"
 
-    def image_to_dataframe(self, image_path):
+    def _stream_json_rows(self, contents, row_sink):
+        # Array elements are shown as they close; the final DataFrame still comes from a full json.loads.
+        parser = JsonArrayStream()
+        pieces, columns = [], []
+        streamed = 0
+        start = time.perf_counter()
+        row_sink.reset()
+        for text in self.model.generate_content_stream(contents):
+            pieces.append(text)
+            if parser is None:
+                continue
+            try:
+                elements = [row for row in parser.feed(text) if isinstance(row, dict)]
+            except ValueError:
+                parser = None
+                continue
+            if not elements:
+                continue
+            if not streamed:
+                METRICS.record("image.time_to_first_row", time.perf_counter() - start)
+            for row in elements:
+                columns.extend(key for key in row if key not in columns)
+            row_sink.extend(columns, [tuple(row.get(col, "") for col in columns) for row in elements])
+            streamed += len(elements)
+        row_sink.finish()
+        return "".join(pieces)
+
+    def image_to_dataframe(self, image_path, row_sink=None):
+        if row_sink is not None:
+            row_sink = row_sink.attempt()
         if not self.is_gemini_available():
             print("❌ Gemini API key is missing. Cannot process image.")
             return None, None
@@ -28,40 +143,52 @@ class ImageHandler:
             return None, None
 
         try:
-            print("📌 Processing image with Gemini Vision model...")
-
             with open(image_path, "rb") as f:
                 image_bytes = f.read()
 
+            cache_path = self._cache_path(image_bytes)
+            cached_df = self._load_cached_dataframe(cache_path)
+            if cached_df is not None:
+                print(f"⚡ Cache hit for '{os.path.basename(image_path)}'; skipping Gemini Vision.")
+                if row_sink is not None:
+                    row_sink.reset()
+                    row_sink.extend(list(cached_df.columns), cached_df.itertuples(index=False, name=None))
+                    row_sink.finish()
+                return cached_df, self._suggest_table_name(image_path)
+
+            with span("image.preprocess", nbytes=len(image_bytes)):
+                upload_bytes, mime_type = self._preprocess_image(image_bytes)
+            print(f"🗜️ Image prepared for upload: {len(image_bytes) / 1024:,.0f} KB -> {len(upload_bytes) / 1024:,.0f} KB ({mime_type})")
+            print("📌 Processing image with Gemini Vision model...")
+
             prompt = (
                 "Extract the table from this image and return it in JSON array format. "
                 "Preserve all headers and rows. Do not include commentary or description. "
                 "Only return valid JSON."
             )
 
-            response = self.model.generate_content([
-                prompt,
-                {"mime_type": "image/jpeg", "data": image_bytes}
-            ])
-
-            text_output = response.text.strip()
+            contents = [prompt, {"mime_type": mime_type, "data": upload_bytes}]
+            if row_sink is not None:
+                with span("image.gemini_stream", nbytes=len(upload_bytes)):
+                    text_output = self._stream_json_rows(contents, row_sink).strip()
+            else:
+                with span("image.gemini_round_trip", nbytes=len(upload_bytes)):
+                    response = self.model.generate_content(contents)
+                    text_output = response.text.strip()
             print("\n🔍 [RAW GEMINI OUTPUT PREVIEW (first 500 chars)]")
             print(text_output[:500] + "..." if len(text_output) > 500 else text_output)
 
             try:
-                data = json.loads(text_output)
-                if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
-                    raise ValueError("⚠️ Invalid table format received from Gemini.")
-                df = pd.DataFrame(data)
+                with span("image.json_parse", nbytes=len(text_output)) as parse_span:
+                    df = self._parse_table_json(text_output)
+                    parse_span.rows = len(df)
                 print("✅ Table parsed successfully into DataFrame.")
             except Exception as e:
                 print(f"❌ Error parsing Gemini response: {e}")
                 return None, None
 
-            base_name = os.path.splitext(os.path.basename(image_path))[0]
-            suggested_table_name = base_name.strip().replace(' ', '_') + "_gemini_table"
-
-            return df, suggested_table_name
+            self._store_cached_dataframe(cache_path, df)
+            return df, self._suggest_table_name(image_path)
 
         except Exception as e:
             print(f"❌ Error processing image with Gemini: {e}")
@@ -0,0 +1,284 @@
+import hashlib
+import json
+import math
+import os
+import time
+from collections import Counter
+from file_handler import iter_data_file_chunks
+from metrics import span
+
+ROW_HASH_COLUMN = "_row_hash"
+SEEN_TABLE = "temp._assistant_ingest_seen"
+
+
+def _quoted(columns):
+    return ", ".join(f'"{col}"' for col in columns)
+
+
+def _canonical(value):
+    # The same number may parse as 1 from one file version and 1.0 from the next (e.g. once a NULL
+    # appears in the column); SQLite compares them equal, so the hash must as well.
+    if isinstance(value, float) and math.isfinite(value) and value.is_integer():
+        return int(value)
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
+
+
+def row_digest(row):
+    # Hashes the values exactly as they are bound for SQLite, in an encoding that does not depend on Python's repr.
+    encoded = json.dumps([_canonical(value) for value in row], ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.blake2b(encoded.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class SyncResult:
+    def __init__(self, file_path, table_name, status, rows=0, written=0, deleted=0, skipped_null_keys=0, seconds=0.0, error=None):
+        self.file_path = file_path
+        self.table_name = table_name
+        self.status = status
+        self.rows = rows
+        self.written = written
+        self.deleted = deleted
+        self.skipped_null_keys = skipped_null_keys
+        self.seconds = seconds
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def unchanged(self):
+        return self.rows - self.written
+
+
+class IncrementalLoader:
+    MANIFEST_TABLE = "_assistant_ingest_manifest"
+
+    def __init__(self, db_mgr, chunk_rows=50_000, batch_size=5000):
+        self.db_mgr = db_mgr
+        self.chunk_rows = chunk_rows
+        self.batch_size = batch_size
+        self._table_ready = False
+
+    def _connection(self):
+        if not self.db_mgr.conn and not self.db_mgr.connect():
+            return None
+        conn = self.db_mgr.conn
+        if not self._table_ready:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.MANIFEST_TABLE} (
+                    path TEXT PRIMARY KEY,
+                    table_name TEXT NOT NULL,
+                    key_columns TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    rows INTEGER NOT NULL,
+                    loaded_at REAL NOT NULL
+                );""")
+            conn.commit()
+            self._table_ready = True
+        return conn
+
+    @staticmethod
+    def content_hash(file_path, block_size=1 << 20):
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def manifest_entry(self, file_path):
+        conn = self._connection()
+        if conn is None:
+            return None
+        return conn.execute(f"SELECT * FROM {self.MANIFEST_TABLE} WHERE path = ?;", (os.path.abspath(file_path),)).fetchone()
+
+    def forget(self, file_path):
+        conn = self._connection()
+        conn.execute(f"DELETE FROM {self.MANIFEST_TABLE} WHERE path = ?;", (os.path.abspath(file_path),))
+        conn.commit()
+
+    def _unchanged(self, entry, stat, table_name, key_spec):
+        if entry is None or entry["table_name"] != table_name or entry["key_columns"] != key_spec:
+            return False, None
+        if not self.db_mgr.table_exists(table_name):
+            return False, None
+        if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return True, entry["content_hash"]
+        # Size or mtime moved (e.g. the file was re-exported); only a content change forces a sync.
+        if entry["size"] != stat.st_size:
+            return False, None
+        digest = self.content_hash(entry["path"])
+        return digest == entry["content_hash"], digest
+
+    def sync_file(self, file_path, table_name, key_columns=None, force=False, progress_callback=None, source_column=None,
+                  source_label=None):
+        # source_column: several files share table_name, each row tagged in that column with source_label
+        # (default: the file's absolute path).
+        # Keys are then unique per file and a sync only ever deletes rows that came from this file.
+        conn = self._connection()
+        if conn is None:
+            return None
+        path = os.path.abspath(file_path)
+        key_columns = list(key_columns or [])
+        if source_column and key_columns:
+            key_columns = [source_column] + [col for col in key_columns if col != source_column]
+        key_spec = ",".join(key_columns) or (f"{source_column}:{ROW_HASH_COLUMN}" if source_column else "")
+        start = time.perf_counter()
+        stat = os.stat(path)
+        entry = self.manifest_entry(path)
+        unchanged, digest = (False, None) if force else self._unchanged(entry, stat, table_name, key_spec)
+        if unchanged:
+            if entry["mtime_ns"] != stat.st_mtime_ns:
+                conn.execute(f"UPDATE {self.MANIFEST_TABLE} SET mtime_ns = ? WHERE path = ?;", (stat.st_mtime_ns, path))
+                conn.commit()
+            print(f"⏭️ {os.path.basename(path)} unchanged since last load; skipped.")
+            return SyncResult(path, table_name, "unchanged", rows=entry["rows"],
+                              seconds=time.perf_counter() - start)
+
+        digest = digest or self.content_hash(path)
+        mode = f"key ({key_spec})" if key_columns else "row hash"
+        print(f"\n🔄 [INCREMENTAL LOAD] {os.path.basename(path)} -> '{table_name}' matched by {mode}")
+        if conn.in_transaction:
+            conn.commit()
+        cursor = conn.cursor()
+        result = SyncResult(path, table_name, "synced")
+        try:
+            with span("db.incremental_sync") as sync_span:
+                cursor.execute("BEGIN")
+                self._sync_rows(cursor, path, table_name, key_columns, result, progress_callback, start, source_column,
+                                source_label or path)
+                cursor.execute(f"""INSERT OR REPLACE INTO {self.MANIFEST_TABLE}
+                    (path, table_name, key_columns, size, mtime_ns, content_hash, rows, loaded_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?);""",
+                    (path, table_name, key_spec, stat.st_size, stat.st_mtime_ns, digest, result.rows, time.time()))
+                # Data and manifest commit together, so a crash mid-file simply re-syncs it next time.
+                conn.commit()
+                sync_span.rows = result.written + result.deleted
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            result.status, result.error = "failed", f"{type(e).__name__}: {e}"
+            print(f"🚨 Incremental load of {os.path.basename(path)} failed: {e}")
+        finally:
+            cursor.execute(f"DROP TABLE IF EXISTS {SEEN_TABLE};")
+            self.db_mgr.catalog.invalidate()
+            self.db_mgr.result_cache.invalidate()
+
+        result.seconds = time.perf_counter() - start
+        if result.ok:
+            print(f"✅ {result.rows:,} rows read: {result.written:,} inserted/updated, {result.unchanged:,} unchanged, "
+                  f"{result.deleted:,} deleted in {result.seconds:.1f}s.")
+            if result.skipped_null_keys:
+                print(f"⚠️ {result.skipped_null_keys:,} rows had an empty key and were skipped.")
+        return result
+
+    def _sync_rows(self, cursor, path, table_name, key_columns, result, progress_callback, start, source_column=None,
+                   source_label=None):
+        existed = self.db_mgr.table_exists(table_name)
+        table_columns = None
+        upsert_sql = None
+        key_positions = None
+        occurrences = Counter()
+        source = (source_label,) if source_column else ()
+        for chunk in iter_data_file_chunks(path, self.chunk_rows):
+            if table_columns is None:
+                columns = self.db_mgr.chunk_columns(chunk)
+                affinities = self.db_mgr.chunk_affinities(chunk, columns)
+                if source_column:
+                    if source_column in columns:
+                        raise ValueError(f"The file already has a '{source_column}' column.")
+                    columns, affinities = columns + [source_column], list(affinities) + ["TEXT"]
+                missing = [col for col in key_columns if col not in columns]
+                if missing:
+                    raise ValueError(f"Key column(s) {', '.join(missing)} not found in file columns: {', '.join(columns)}")
+                table_columns = self._prepare_table(cursor, table_name, columns, affinities, key_columns, existed)
+                key_positions = [columns.index(col) for col in key_columns]
+                upsert_sql = self._upsert_sql(table_name, columns, key_columns)
+                seen_columns = key_columns or [ROW_HASH_COLUMN]
+                cursor.execute(f"DROP TABLE IF EXISTS {SEEN_TABLE};")
+                # Keys seen in this file; whatever the table holds beyond them was removed from the source.
+                # Declared with the table's own types: mismatched affinities would stop the final NOT EXISTS from using the key.
+                seen_defs = ", ".join(f'"{col}" {table_columns[col]}' for col in seen_columns)
+                cursor.execute(f"CREATE TABLE {SEEN_TABLE} ({seen_defs}, PRIMARY KEY ({_quoted(seen_columns)})) WITHOUT ROWID;")
+                seen_sql = f"INSERT OR IGNORE INTO {SEEN_TABLE} VALUES ({', '.join('?' for _ in seen_columns)});"
+
+            records, seen = [], []
+            for row in self.db_mgr.rows_for_sqlite(chunk):
+                row = row + source
+                if key_positions and any(row[i] is None for i in key_positions):
+                    result.skipped_null_keys += 1
+                    continue
+                digest = row_digest(row)
+                if not key_positions:
+                    # Identical rows are kept apart by their occurrence number, so duplicates survive a re-sync.
+                    occurrences[digest] += 1
+                    if occurrences[digest] > 1:
+                        digest = f"{digest}:{occurrences[digest]}"
+                    seen.append((digest,))
+                else:
+                    seen.append(tuple(row[i] for i in key_positions))
+                records.append(row + (digest,))
+            for batch_start in range(0, len(records), self.batch_size):
+                cursor.executemany(upsert_sql, records[batch_start:batch_start + self.batch_size])
+                # rowcount only counts rows that were inserted or actually changed; identical rows are left alone.
+                result.written += max(cursor.rowcount, 0)
+                cursor.executemany(seen_sql, seen[batch_start:batch_start + self.batch_size])
+            result.rows += len(chunk)
+            if progress_callback:
+                elapsed = time.perf_counter() - start
+                progress_callback(result.rows, result.written, result.rows / elapsed if elapsed > 0 else 0.0)
+
+        if table_columns is None:
+            raise ValueError("The file contains no rows.")
+        match = " AND ".join(f's."{c}" = "{table_name}"."{c}"' for c in (key_columns or [ROW_HASH_COLUMN]))
+        scope, params = (f'"{source_column}" = ? AND ', source) if source_column else ("", ())
+        result.deleted = cursor.execute(f'DELETE FROM "{table_name}" WHERE {scope}NOT EXISTS (SELECT 1 FROM {SEEN_TABLE} AS s WHERE {match});',
+                                        params).rowcount
+
+    def _prepare_table(self, cursor, table_name, columns, affinities, key_columns, existed):
+        if not existed:
+            self.db_mgr.create_table_for_columns(cursor, table_name, list(columns) + [ROW_HASH_COLUMN],
+                                                 list(affinities) + ["TEXT"], if_exists='append')
+        table_columns = {row[1]: row[2] for row in cursor.execute(f'PRAGMA table_info("{table_name}");')}
+        # A table first loaded in full (or from an older file layout) gains the missing columns in place.
+        for col, affinity in zip(list(columns) + [ROW_HASH_COLUMN], list(affinities) + ["TEXT"]):
+            if col not in table_columns:
+                cursor.execute(f'ALTER TABLE "{table_name}" ADD COLUMN "{col}" {affinity};')
+                table_columns[col] = affinity
+        conflict_columns = key_columns or [ROW_HASH_COLUMN]
+        index_name = f"uq_{table_name}_{'_'.join(conflict_columns)}"
+        # ON CONFLICT needs a unique index on exactly the conflict target.
+        cursor.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS "{index_name}" ON "{table_name}" ({_quoted(conflict_columns)});')
+        return table_columns
+
+    @staticmethod
+    def _upsert_sql(table_name, columns, key_columns):
+        all_columns = list(columns) + [ROW_HASH_COLUMN]
+        quoted = _quoted(all_columns)
+        placeholders = ", ".join("?" for _ in all_columns)
+        if not key_columns:
+            return f'INSERT INTO "{table_name}" ({quoted}) VALUES ({placeholders}) ON CONFLICT("{ROW_HASH_COLUMN}") DO NOTHING;'
+        updates = ", ".join(f'"{c}" = excluded."{c}"' for c in all_columns if c not in key_columns)
+        target = _quoted(key_columns)
+        # The WHERE clause skips rows whose content hash did not change, so they cost no page writes.
+        return (f'INSERT INTO "{table_name}" ({quoted}) VALUES ({placeholders}) ON CONFLICT({target}) DO UPDATE SET {updates} '
+                f'WHERE "{table_name}"."{ROW_HASH_COLUMN}" IS NOT excluded."{ROW_HASH_COLUMN}";')
+
+    @staticmethod
+    def report_frame(results):
+        import pandas as pd
+
+        return pd.DataFrame([{
+            "file": os.path.basename(r.file_path),
+            "table": r.table_name,
+            "status": r.status if r.error is None else f"❌ {r.error}",
+            "rows": r.rows,
+            "written": r.written,
+            "deleted": r.deleted,
+            "seconds": round(r.seconds, 2),
+        } for r in results])
@@ -0,0 +1,197 @@
+import re
+import sqlite3
+import pandas as pd
+
+SCAN_PATTERN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?$')
+AUTOMATIC_INDEX_PATTERN = re.compile(r'^SEARCH (?:TABLE )?(\w+)(?: AS (\w+))? USING AUTOMATIC (?:COVERING |PARTIAL )*INDEX \(([^)]*)\)')
+TABLE_REF_PATTERN = re.compile(
+    r'\b(?:FROM|JOIN)\s+"?(\w+)"?(?:\s+(?:AS\s+)?(?!WHERE\b|JOIN\b|ON\b|LEFT\b|INNER\b|CROSS\b|GROUP\b|ORDER\b|LIMIT\b|USING\b)(\w+))?',
+    re.IGNORECASE)
+PREDICATE_PATTERN = re.compile(
+    r'(?:"?(\w+)"?\.)?"?(\w+)"?\s*(=|==|IN\b|IS\b|<=|>=|<|>|BETWEEN\b)', re.IGNORECASE)
+CLAUSE_PATTERN = re.compile(
+    r'\b(?:WHERE|ON)\b(.*?)(?=\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|\bJOIN\b|\bLEFT\b|\bINNER\b|\bCROSS\b|\bUNION\b|$)',
+    re.IGNORECASE | re.DOTALL)
+SELECT_LIST_PATTERN = re.compile(r'^\s*SELECT\s+(?:DISTINCT\s+)?(.*?)\bFROM\b', re.IGNORECASE | re.DOTALL)
+EQUALITY_OPERATORS = ("=", "==", "IN", "IS")
+MAX_INDEX_COLUMNS = 6
+
+
+class IndexAdvisor:
+    AUTO_INDEX_PREFIX = "idx_auto_"
+
+    def __init__(self, db_mgr, auto_create=False, min_occurrences=3, min_total_seconds=0.5, min_query_seconds=0.01):
+        self.db_mgr = db_mgr
+        self.auto_create = auto_create
+        self.min_occurrences = min_occurrences
+        self.min_total_seconds = min_total_seconds
+        self.min_query_seconds = min_query_seconds
+        self.candidates = {}
+        self.created = []
+        # Created indexes whose sample query has not run since; its next observed run gives the "after" time.
+        self._awaiting_after = {}
+
+    @staticmethod
+    def _table_aliases(sql):
+        aliases = {}
+        for table, alias in TABLE_REF_PATTERN.findall(sql):
+            aliases[table] = table
+            if alias:
+                aliases[alias] = table
+        return aliases
+
+    def _predicate_columns(self, sql, table, alias, columns):
+        equality, ranges = [], []
+        qualifiers = {table.lower(), (alias or table).lower()}
+        for clause in CLAUSE_PATTERN.findall(sql):
+            for qualifier, column, operator in PREDICATE_PATTERN.findall(clause):
+                if column not in columns or (qualifier and qualifier.lower() not in qualifiers):
+                    continue
+                target = equality if operator.upper() in EQUALITY_OPERATORS else ranges
+                if column not in equality and column not in ranges:
+                    target.append(column)
+        # Equality columns lead the index; only the first range column can still use it.
+        return equality + ranges[:1]
+
+    @staticmethod
+    def _selected_columns(sql, columns):
+        match = SELECT_LIST_PATTERN.match(sql)
+        if not match or '*' in match.group(1):
+            return None
+        tokens = re.findall(r'(?:\w+\.)?"?(\w+)"?', match.group(1))
+        return [tok for tok in dict.fromkeys(tokens) if tok in columns]
+
+    def _candidates_from_plan(self, sql, params):
+        conn = self.db_mgr.conn
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params or ()).fetchall()
+        aliases = self._table_aliases(sql)
+        found = []
+        for row in plan:
+            detail = row[3]
+            scan = SCAN_PATTERN.match(detail)
+            auto = AUTOMATIC_INDEX_PATTERN.match(detail)
+            if scan:
+                name, alias = scan.group(1), scan.group(2)
+                table = aliases.get(name, name)
+                alias = alias or (name if name != table else None)
+                schema = self.db_mgr.catalog.table(table)
+                if schema is None:
+                    continue
+                predicate_cols = self._predicate_columns(sql, table, alias, schema.column_names)
+            elif auto:
+                name = auto.group(1)
+                table = aliases.get(name, name)
+                schema = self.db_mgr.catalog.table(table)
+                if schema is None:
+                    continue
+                predicate_cols = [c.split('=')[0].strip() for c in auto.group(3).split(' AND ')]
+                predicate_cols = [c for c in predicate_cols if c in schema.column_names]
+            else:
+                continue
+            if not predicate_cols:
+                continue
+
+            index_cols = list(predicate_cols)
+            selected = self._selected_columns(sql, schema.column_names)
+            if selected and len(set(index_cols) | set(selected)) <= MAX_INDEX_COLUMNS:
+                index_cols += [c for c in selected if c not in index_cols]
+            found.append((table, tuple(index_cols)))
+        return found
+
+    def observe(self, sql, params, elapsed):
+        entry = self._awaiting_after.pop(sql, None)
+        if entry is not None:
+            self._record_after(entry, elapsed)
+        if elapsed < self.min_query_seconds or not re.match(r'^\s*(SELECT|WITH)\b', sql, re.IGNORECASE):
+            return
+        try:
+            found = self._candidates_from_plan(sql.strip().rstrip(';'), params)
+        except sqlite3.Error:
+            return
+        for key in found:
+            stats = self.candidates.setdefault(key, {"occurrences": 0, "total_seconds": 0.0, "sample_sql": sql, "sample_params": params})
+            stats["occurrences"] += 1
+            stats["total_seconds"] += elapsed
+            if self.auto_create and self._is_worth_creating(key, stats):
+                self.create_index(*key)
+
+    def _is_worth_creating(self, key, stats):
+        if any(entry["table"] == key[0] and tuple(entry["columns"]) == key[1] for entry in self.created):
+            return False
+        return stats["occurrences"] >= self.min_occurrences and stats["total_seconds"] >= self.min_total_seconds
+
+    @classmethod
+    def index_name(cls, table, columns):
+        return f"{cls.AUTO_INDEX_PREFIX}{table}_{'_'.join(columns)}"[:120]
+
+    @classmethod
+    def index_ddl(cls, table, columns):
+        quoted = ", ".join(f'"{c}"' for c in columns)
+        return f'CREATE INDEX IF NOT EXISTS "{cls.index_name(table, columns)}" ON "{table}" ({quoted});'
+
+    def _plan_uses_index(self, sql, params, name):
+        plan = self.db_mgr.conn.execute(f"EXPLAIN QUERY PLAN {sql.strip().rstrip(';')}", params or ()).fetchall()
+        return any(name in row[3] for row in plan)
+
+    @staticmethod
+    def _record_after(entry, elapsed):
+        entry["after_ms"] = round(elapsed * 1000, 2)
+        entry["speedup"] = round(entry["before_ms"] / entry["after_ms"], 1) if entry["before_ms"] and entry["after_ms"] else None
+
+    def create_index(self, table, columns):
+        # The sample query is never re-run here: this can be called from execute_query's observe path, outside the
+        # query guard. "before" is the observed average, and "after" is taken from the query's next real run.
+        stats = self.candidates.get((table, tuple(columns)), {})
+        sample_sql, sample_params = stats.get("sample_sql"), stats.get("sample_params")
+        name = self.index_name(table, columns)
+        ddl = self.index_ddl(table, columns)
+        conn = self.db_mgr.conn
+        try:
+            if conn.in_transaction:
+                conn.commit()
+            print(f"🧭 [INDEX ADVISOR] {ddl}")
+            conn.execute(ddl)
+            conn.commit()
+            self.db_mgr.catalog.invalidate()
+            used = self._plan_uses_index(sample_sql, sample_params, name) if sample_sql else None
+        except sqlite3.Error as e:
+            print(f"⚠️ Index advisor could not create {name}: {e}")
+            return None
+
+        before = stats["total_seconds"] / stats["occurrences"] if stats.get("occurrences") else None
+        entry = {
+            "index": name, "table": table, "columns": list(columns), "plan_uses_index": used,
+            "before_ms": round(before * 1000, 2) if before is not None else None, "after_ms": None, "speedup": None,
+        }
+        self.created.append(entry)
+        if sample_sql:
+            self._awaiting_after[sample_sql] = entry
+        plan_note = {True: "the query plan now uses it", False: "the query plan does not use it", None: "no sample query"}[used]
+        print(f"✅ Created {name} ({plan_note}; {entry['before_ms']} ms per run before)")
+        return entry
+
+    def recommendations(self):
+        created = {(e["table"], tuple(e["columns"])) for e in self.created}
+        ranked = sorted(self.candidates.items(), key=lambda item: item[1]["total_seconds"], reverse=True)
+        return [{
+            "table": table, "columns": list(columns), "occurrences": stats["occurrences"],
+            "total_seconds": round(stats["total_seconds"], 3), "created": (table, columns) in created,
+            "ddl": self.index_ddl(table, columns),
+        } for (table, columns), stats in ranked]
+
+    def create_recommended(self):
+        return [self.create_index(rec["table"], rec["columns"]) for rec in self.recommendations() if not rec["created"]]
+
+    def report_frame(self):
+        rows = []
+        for entry in self.created:
+            rows.append({"status": "created", "table": entry["table"], "columns": ", ".join(entry["columns"]),
+                         "occurrences": self.candidates.get((entry["table"], tuple(entry["columns"])), {}).get("occurrences", 0),
+                         "plan_uses_index": entry["plan_uses_index"],
+                         "before_ms": entry["before_ms"], "after_ms": entry["after_ms"], "speedup": entry["speedup"]})
+        for rec in self.recommendations():
+            if not rec["created"]:
+                rows.append({"status": "recommended", "table": rec["table"], "columns": ", ".join(rec["columns"]),
+                             "occurrences": rec["occurrences"], "plan_uses_index": None,
+                             "before_ms": None, "after_ms": None, "speedup": None})
+        return pd.DataFrame(rows)
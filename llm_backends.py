@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import time
+
+DEFAULT_RECORD_DIR = "llm_recordings"
+REPLAY_STREAM_CHUNK_CHARS = 120
+
+class ReplayMissError(LookupError):
+    pass
+
+
+class LLMResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+def _describe_part(part):
+    if isinstance(part, (bytes, bytearray)):
+        return {"sha256": hashlib.sha256(part).hexdigest(), "size": len(part)}
+    if isinstance(part, dict):
+        return {key: _describe_part(value) for key, value in sorted(part.items())}
+    if isinstance(part, (list, tuple)):
+        return [_describe_part(value) for value in part]
+    return part if isinstance(part, (str, int, float, bool, type(None))) else repr(part)
+
+
+def request_key(model_name, contents):
+    canonical = json.dumps({"model": model_name, "contents": _describe_part(contents)}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class GeminiBackend:
+    def __init__(self, model_name, api_key=None):
+        import google.generativeai as genai
+
+        if api_key:
+            genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self._model = genai.GenerativeModel(model_name)
+
+    def generate_content(self, contents, **kwargs):
+        return self._model.generate_content(contents, **kwargs)
+
+    def generate_content_stream(self, contents, **kwargs):
+        for chunk in self._model.generate_content(contents, stream=True, **kwargs):
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks carrying only safety ratings or finish metadata have no text part.
+                continue
+            if text:
+                yield text
+
+
+class RecordingBackend:
+    def __init__(self, inner, record_dir=DEFAULT_RECORD_DIR):
+        self.inner = inner
+        self.model_name = inner.model_name
+        self.record_dir = record_dir
+        os.makedirs(record_dir, exist_ok=True)
+
+    def generate_content(self, contents, **kwargs):
+        start = time.perf_counter()
+        response = self.inner.generate_content(contents, **kwargs)
+        self._save(contents, response.text, time.perf_counter() - start)
+        return response
+
+    def generate_content_stream(self, contents, **kwargs):
+        start = time.perf_counter()
+        first_chunk_latency = None
+        pieces = []
+        for text in self.inner.generate_content_stream(contents, **kwargs):
+            if first_chunk_latency is None:
+                first_chunk_latency = time.perf_counter() - start
+            pieces.append(text)
+            yield text
+        # Streamed and one-shot calls share a recording, so either mode can replay it.
+        self._save(contents, "".join(pieces), time.perf_counter() - start, first_chunk_latency)
+
+    def _save(self, contents, response_text, latency, first_chunk_latency=None):
+        key = request_key(self.model_name, contents)
+        record = {
+            "model": self.model_name,
+            "request": _describe_part(contents),
+            "response_text": response_text,
+            "latency": latency,
+            "recorded_at": time.time(),
+        }
+        if first_chunk_latency is not None:
+            record["first_chunk_latency"] = first_chunk_latency
+        tmp_path = os.path.join(self.record_dir, f"{key}.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, os.path.join(self.record_dir, f"{key}.json"))
+
+
+class ReplayBackend:
+    def __init__(self, model_name, record_dir=DEFAULT_RECORD_DIR, latency=0.0):
+        self.model_name = model_name
+        self.record_dir = record_dir
+        # A number simulates a fixed round trip; "recorded" replays the latency captured at record time.
+        self.latency = latency
+
+    def _load(self, contents):
+        key = request_key(self.model_name, contents)
+        path = os.path.join(self.record_dir, f"{key}.json")
+        if not os.path.exists(path):
+            raise ReplayMissError(f"No recorded response for request {key[:12]} in '{self.record_dir}'.")
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _delay(self, record):
+        return record.get("latency", 0.0) if self.latency == "recorded" else float(self.latency)
+
+    def _simulate_latency(self, record):
+        delay = self._delay(record)
+        if delay > 0:
+            time.sleep(delay)
+
+    def generate_content(self, contents, **kwargs):
+        record = self._load(contents)
+        self._simulate_latency(record)
+        return LLMResponse(record["response_text"])
+
+    def generate_content_stream(self, contents, **kwargs):
+        record = self._load(contents)
+        text = record["response_text"]
+        pieces = [text[i:i + REPLAY_STREAM_CHUNK_CHARS] for i in range(0, len(text), REPLAY_STREAM_CHUNK_CHARS)] or [""]
+        delay = self._delay(record)
+        # The first chunk waits for the (recorded) time to first token; the rest of the latency is spread evenly.
+        first = min(delay, record.get("first_chunk_latency", delay / len(pieces))) if self.latency == "recorded" else delay / len(pieces)
+        rest = (delay - first) / max(len(pieces) - 1, 1)
+        for index, piece in enumerate(pieces):
+            pause = first if index == 0 else rest
+            if pause > 0:
+                time.sleep(pause)
+            yield piece
+
+
+def backend_mode():
+    return os.getenv("LLM_BACKEND", "gemini").strip().lower()
+
+
+def is_offline_backend():
+    return backend_mode() == "replay"
+
+
+def create_model_backend(model_name, api_key=None):
+    mode = backend_mode()
+    record_dir = os.getenv("LLM_RECORD_DIR", DEFAULT_RECORD_DIR)
+    if mode == "replay":
+        latency = os.getenv("LLM_REPLAY_LATENCY", "0")
+        return ReplayBackend(model_name, record_dir, latency if latency == "recorded" else float(latency))
+    backend = GeminiBackend(model_name, api_key)
+    if mode == "record":
+        return RecordingBackend(backend, record_dir)
+    return backend
@@ -0,0 +1,200 @@
+import concurrent.futures
+import threading
+import time
+
+class LLMJobCancelled(Exception):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate_per_sec, capacity=None):
+        self.rate_per_sec = rate_per_sec
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_sec)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1, cancel_event=None):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_sec)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate_per_sec
+            if cancel_event is not None:
+                if cancel_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+
+class LLMJob:
+    def __init__(self, description):
+        self.description = description
+        self.submitted_at = time.time()
+        self.attempts = 0
+        self.future = None
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def done(self):
+        return self.cancelled or self.future.done()
+
+    @property
+    def status(self):
+        if self.cancelled:
+            return "cancelled"
+        if not self.future.done():
+            return "running"
+        return "failed" if self.future.exception() else "done"
+
+    def result(self, poll_interval=0.1):
+        while True:
+            if self.cancelled:
+                raise LLMJobCancelled(f"'{self.description}' was cancelled.")
+            concurrent.futures.wait([self.future], timeout=poll_interval)
+            if self.future.done():
+                if self.future.cancelled():
+                    raise LLMJobCancelled(f"'{self.description}' was cancelled.")
+                return self.future.result()
+
+
+class LLMExecutor:
+    # Each job is orchestrated on a worker thread; the blocking SDK call itself runs in a
+    # separate pool so a timed-out or cancelled call can be abandoned without stalling the job.
+    def __init__(self, max_workers=4, timeout=90, retries=2, backoff=2.0, on_change=None):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.on_change = on_change
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-job")
+        self._call_workers = max_workers * 2
+        self._call_pool = self._new_call_pool()
+        # Calls given up on that are still running; each one holds a _call_pool thread until the SDK returns.
+        self._abandoned = set()
+        self._jobs = []
+        self._lock = threading.Lock()
+
+    def _new_call_pool(self):
+        return concurrent.futures.ThreadPoolExecutor(max_workers=self._call_workers, thread_name_prefix="llm-call")
+
+    @staticmethod
+    def _timed_call(started, fn, args, kwargs):
+        started.append(time.monotonic())
+        return fn(*args, **kwargs)
+
+    def _abandon(self, call):
+        if call.cancel():
+            return
+        with self._lock:
+            self._abandoned.add(call)
+            stuck = len(self._abandoned)
+            if stuck >= self._call_workers // 2:
+                # Too many threads are stuck in hung calls: start a fresh pool so new calls are not queued
+                # behind them. The old threads exit on their own whenever their calls return.
+                print(f"⚠️ {stuck} LLM calls are still hanging after their timeout; starting a fresh call pool.")
+                old_pool, self._call_pool = self._call_pool, self._new_call_pool()
+                self._abandoned = set()
+                old_pool.shutdown(wait=False)
+        call.add_done_callback(self._release)
+
+    def _release(self, call):
+        with self._lock:
+            self._abandoned.discard(call)
+
+    def submit(self, description, fn, *args, timeout=None, retries=None, retry_if=None, **kwargs):
+        job = LLMJob(description)
+        job.future = self._pool.submit(
+            self._run, job, fn, args, kwargs,
+            self.timeout if timeout is None else timeout,
+            self.retries if retries is None else retries,
+            retry_if,
+        )
+        with self._lock:
+            self._jobs.append(job)
+        job.future.add_done_callback(lambda _: self._notify())
+        self._notify()
+        return job
+
+    def _run(self, job, fn, args, kwargs, timeout, retries, retry_if):
+        last_error = None
+        last_result = None
+        for attempt in range(retries + 1):
+            if job.cancelled:
+                raise LLMJobCancelled(f"'{job.description}' was cancelled.")
+            job.attempts = attempt + 1
+            started = []
+            call = self._call_pool.submit(self._timed_call, started, fn, args, kwargs)
+            # The timeout runs from when the call starts executing, not from time spent queued for a thread.
+            while not call.done():
+                if job.cancelled:
+                    self._abandon(call)
+                    raise LLMJobCancelled(f"'{job.description}' was cancelled.")
+                if started and time.monotonic() >= started[0] + timeout:
+                    break
+                concurrent.futures.wait([call], timeout=0.1)
+
+            if not call.done():
+                self._abandon(call)
+                last_error = TimeoutError(f"'{job.description}' timed out after {timeout}s.")
+            else:
+                try:
+                    last_result = call.result()
+                    last_error = None
+                except Exception as e:
+                    last_error = e
+                else:
+                    if retry_if is None or not retry_if(last_result):
+                        return last_result
+
+            if attempt < retries:
+                delay = self.backoff * (2 ** attempt)
+                reason = last_error or "unusable response"
+                print(f"🔁 {job.description}: attempt {attempt + 1} failed ({reason}); retrying in {delay:.1f}s...")
+                if job._cancel_event.wait(delay):
+                    raise LLMJobCancelled(f"'{job.description}' was cancelled.")
+
+        if last_error is not None:
+            raise last_error
+        return last_result
+
+    def _notify(self):
+        if self.on_change:
+            try:
+                self.on_change(len(self.active_jobs()))
+            except Exception as e:
+                print(f"⚠️ LLM job listener failed: {e}")
+
+    def active_jobs(self):
+        with self._lock:
+            return [job for job in self._jobs if not job.done()]
+
+    def finished_jobs(self):
+        with self._lock:
+            return [job for job in self._jobs if job.done()]
+
+    def forget(self, job):
+        with self._lock:
+            if job in self._jobs:
+                self._jobs.remove(job)
+
+    def cancel_all(self):
+        for job in self.active_jobs():
+            job.cancel()
+        self._notify()
+
+    def shutdown(self):
+        self.cancel_all()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._call_pool.shutdown(wait=False, cancel_futures=True)
@@ -1,15 +1,32 @@
+import sys
 import threading
-from sql_assistant_gui import SQLAssistantGUI
-from assistant_cli import SQLAssistant
+
+def run_assistant(gui):
+    # pandas, pyarrow and the rest of the app load here, after the window is already on screen.
+    try:
+        from assistant_cli import SQLAssistant
+    except Exception as e:
+        print(f"🔥 Could not start the assistant: {e}")
+        gui.shutdown()
+        raise
+
+    SQLAssistant(gui=gui).run()
 
 def main_sql_assistant():
+    from sql_assistant_gui import SQLAssistantGUI
+
     gui = SQLAssistantGUI()
-    assistant = SQLAssistant(gui=gui)
+    gui.update_status("⏳ Loading...")
 
-    logic_thread = threading.Thread(target=assistant.run, daemon=True)
+    logic_thread = threading.Thread(target=run_assistant, args=(gui,), daemon=True)
     logic_thread.start()
 
     gui.run()
 
 if __name__ == "__main__":
-    main_sql_assistant()
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == "--headless":
+        # python main_sql_assistant.py --headless job.yaml [--db ...] runs a job file with no window (no Tk needed).
+        from headless_runner import main
+
+        sys.exit(main(sys.argv[2:]))
+    main_sql_assistant()
@@ -0,0 +1,106 @@
+import collections
+import contextlib
+import csv
+import json
+import threading
+import time
+
+class StageStats:
+    def __init__(self, window):
+        self.durations = collections.deque(maxlen=window)
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.total_rows = 0
+        self.total_bytes = 0
+
+    @staticmethod
+    def _percentile(sorted_values, pct):
+        if not sorted_values:
+            return 0.0
+        idx = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+        return sorted_values[idx]
+
+    def summary(self, stage):
+        ordered = sorted(self.durations)
+        return {
+            "stage": stage,
+            "count": self.count,
+            "errors": self.errors,
+            "p50_ms": round(self._percentile(ordered, 50) * 1000, 2),
+            "p95_ms": round(self._percentile(ordered, 95) * 1000, 2),
+            "mean_ms": round(self.total_seconds / self.count * 1000, 2) if self.count else 0.0,
+            "last_ms": round(self.durations[-1] * 1000, 2) if self.durations else 0.0,
+            "total_s": round(self.total_seconds, 3),
+            "rows": self.total_rows,
+            "bytes": self.total_bytes,
+        }
+
+
+class Span:
+    def __init__(self, stage, rows=None, nbytes=None):
+        self.stage = stage
+        self.rows = rows
+        self.nbytes = nbytes
+        self.seconds = None
+
+
+class Metrics:
+    def __init__(self, window=500):
+        self.window = window
+        self._stages = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, stage, rows=None, nbytes=None):
+        current = Span(stage, rows, nbytes)
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield current
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            current.seconds = time.perf_counter() - start
+            self.record(stage, current.seconds, current.rows, current.nbytes, failed)
+
+    def record(self, stage, seconds, rows=None, nbytes=None, failed=False):
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = StageStats(self.window)
+            stats.durations.append(seconds)
+            stats.count += 1
+            stats.errors += int(failed)
+            stats.total_seconds += seconds
+            stats.total_rows += rows or 0
+            stats.total_bytes += nbytes or 0
+
+    def snapshot(self):
+        with self._lock:
+            return [stats.summary(stage) for stage, stats in self._stages.items()]
+
+    def to_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame(self.snapshot())
+
+    def export(self, path):
+        rows = self.snapshot()
+        if path.endswith(".csv"):
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=list(StageStats(1).summary("").keys()))
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"exported_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "stages": rows}, f, indent=2)
+        return path
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+METRICS = Metrics()
+span = METRICS.span
@@ -0,0 +1,105 @@
+import hashlib
+import re
+import sqlite3
+import time
+
+class NLQueryCache:
+    TABLE_NAME = "_assistant_nl_sql_cache"
+
+    def __init__(self, db_mgr, max_entries=500, ttl_seconds=7 * 24 * 3600):
+        self.db_mgr = db_mgr
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._table_ready = False
+
+    @staticmethod
+    def normalize_question(question):
+        normalized = re.sub(r'\s+', ' ', question.strip().lower())
+        return normalized.rstrip('?.!; ')
+
+    def schema_hash(self, table_name):
+        # Declared types count as well as names: SQL written for a TEXT column may be wrong once it is INTEGER.
+        table = self.db_mgr.catalog.table(table_name)
+        columns = [f"{name} {col_type}" for name, col_type in table.columns] if table else []
+        return hashlib.sha256("\n".join([table_name, *columns]).encode("utf-8")).hexdigest()
+
+    def _cache_key(self, table_name, question, schema_hash):
+        raw = "\0".join([table_name, self.normalize_question(question), schema_hash])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _connection(self):
+        if not self.db_mgr.conn and not self.db_mgr.connect():
+            return None
+        conn = self.db_mgr.conn
+        if not self._table_ready:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.TABLE_NAME} (
+                    cache_key TEXT PRIMARY KEY,
+                    table_name TEXT NOT NULL,
+                    schema_hash TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    generated_sql TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                );""")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self.TABLE_NAME}_lru ON {self.TABLE_NAME} (last_used);")
+            conn.commit()
+            self._table_ready = True
+        return conn
+
+    def get(self, table_name, question):
+        try:
+            conn = self._connection()
+            if conn is None:
+                return None
+            now = time.time()
+            # The key includes the schema hash, so entries for an older shape of the table never match. Expired and
+            # stale rows are only deleted in put(): a miss writes nothing, and only a hit updates its LRU stamp.
+            key = self._cache_key(table_name, question, self.schema_hash(table_name))
+            row = conn.execute(f"SELECT generated_sql FROM {self.TABLE_NAME} WHERE cache_key = ? AND created_at >= ?;",
+                               (key, now - self.ttl_seconds)).fetchone()
+            if row is None:
+                return None
+            conn.execute(f"UPDATE {self.TABLE_NAME} SET last_used = ?, hits = hits + 1 WHERE cache_key = ?;", (now, key))
+            conn.commit()
+            return row[0]
+        except sqlite3.Error as e:
+            print(f"⚠️ NL query cache lookup failed: {e}")
+            return None
+
+    def put(self, table_name, question, generated_sql):
+        try:
+            conn = self._connection()
+            if conn is None:
+                return
+            now = time.time()
+            schema_hash = self.schema_hash(table_name)
+            key = self._cache_key(table_name, question, schema_hash)
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.TABLE_NAME} "
+                "(cache_key, table_name, schema_hash, question, generated_sql, created_at, last_used, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 0);",
+                (key, table_name, schema_hash, self.normalize_question(question), generated_sql, now, now),
+            )
+            # Entries built against an older shape of this table can never be valid again.
+            conn.execute(f"DELETE FROM {self.TABLE_NAME} WHERE table_name = ? AND schema_hash != ?;", (table_name, schema_hash))
+            conn.execute(f"DELETE FROM {self.TABLE_NAME} WHERE created_at < ?;", (now - self.ttl_seconds,))
+            conn.execute(
+                f"DELETE FROM {self.TABLE_NAME} WHERE cache_key IN ("
+                f"SELECT cache_key FROM {self.TABLE_NAME} ORDER BY last_used DESC LIMIT -1 OFFSET ?);",
+                (self.max_entries,),
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ NL query cache store failed: {e}")
+
+    def clear(self, table_name=None):
+        conn = self._connection()
+        if conn is None:
+            return
+        if table_name:
+            conn.execute(f"DELETE FROM {self.TABLE_NAME} WHERE table_name = ?;", (table_name,))
+        else:
+            conn.execute(f"DELETE FROM {self.TABLE_NAME};")
+        conn.commit()
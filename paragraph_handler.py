@@ -1,16 +1,135 @@
 import pandas as pd
-import google.generativeai as genai
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
+import time
+from llm_backends import create_model_backend
+from metrics import METRICS, span
+from stream_parsers import MarkdownTableStream
 load_dotenv()
 
+CHARS_PER_TOKEN = 4
+
 class ParagraphHandler:
-    def __init__(self,api_key = os.getenv("GOOGLE_API_KEY")):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel("gemini-1.5-flash")
+    def __init__(self,api_key = os.getenv("GOOGLE_API_KEY"), chunk_token_budget=1500, max_parallel_chunks=4, model=None):
+        self.model = model or create_model_backend("gemini-1.5-flash", api_key)
+        self.chunk_token_budget = chunk_token_budget
+        self.max_parallel_chunks = max_parallel_chunks
+
+    @staticmethod
+    def _estimate_tokens(text):
+        return len(text) // CHARS_PER_TOKEN + 1
+
+    def paragraph_to_table(self, paragraph, chunked=None, row_sink=None):
+        if row_sink is not None:
+            row_sink = row_sink.attempt()
+        if chunked is None:
+            chunked = self._estimate_tokens(paragraph) > self.chunk_token_budget
+        if chunked:
+            return self._chunked_paragraph_to_table(paragraph, row_sink)
+        return self._extract_table(paragraph, row_sink)
+
+    def _split_into_chunks(self, text):
+        budget_chars = self.chunk_token_budget * CHARS_PER_TOKEN
+        pieces = []
+        for block in re.split(r'\n\s*\n', text):
+            block = block.strip()
+            if not block:
+                continue
+            if len(block) <= budget_chars:
+                pieces.append(block)
+                continue
+            for sentence in re.split(r'(?<=[.!?])\s+', block):
+                while len(sentence) > budget_chars:
+                    cut = sentence.rfind(' ', 0, budget_chars)
+                    cut = cut if cut > 0 else budget_chars
+                    pieces.append(sentence[:cut])
+                    sentence = sentence[cut:].strip()
+                if sentence:
+                    pieces.append(sentence)
+
+        chunks, current = [], ""
+        for piece in pieces:
+            if current and len(current) + len(piece) + 2 > budget_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current}\n\n{piece}" if current else piece
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _chunked_paragraph_to_table(self, paragraph, row_sink=None):
+        chunks = self._split_into_chunks(paragraph)
+        if len(chunks) <= 1:
+            return self._extract_table(paragraph, row_sink)
+
+        print(f"\n--- Splitting text into {len(chunks)} chunks of <= {self.chunk_token_budget} tokens ---")
+        if row_sink is not None:
+            row_sink.reset()
+        partials = [None] * len(chunks)
+        canonical = {}
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(self.max_parallel_chunks, len(chunks)), thread_name_prefix="paragraph-chunk") as pool:
+            futures = {pool.submit(self._extract_table, chunk): index for index, chunk in enumerate(chunks)}
+            # Each chunk's rows are shown as soon as it finishes; the merged, de-duplicated table replaces them at the end.
+            for future in as_completed(futures):
+                df = partials[futures[future]] = future.result()
+                if row_sink is not None and df is not None and not df.empty:
+                    if not canonical:
+                        METRICS.record("paragraph.time_to_first_row", time.perf_counter() - start)
+                    row_sink.extend(*self._align_rows(canonical, df))
+
+        frames = [df for df in partials if df is not None and not df.empty]
+        print(f"--- {len(frames)}/{len(chunks)} chunks produced a table ---")
+        merged = self._merge_tables(frames) if frames else None
+        if row_sink is not None:
+            row_sink.reset()
+            if merged is not None:
+                row_sink.extend(list(merged.columns), merged.fillna("").itertuples(index=False, name=None))
+            row_sink.finish()
+        return merged
+
+    def _align_rows(self, canonical, df):
+        # New headers are appended to canonical, so rows sent earlier keep their column positions.
+        positions = []
+        for col in df.columns:
+            key = self._normalize_header(col)
+            canonical.setdefault(key, col)
+            positions.append(list(canonical).index(key))
+        rows = []
+        for values in df.itertuples(index=False, name=None):
+            row = [""] * len(canonical)
+            for position, value in zip(positions, values):
+                row[position] = value
+            rows.append(tuple(row))
+        return list(canonical.values()), rows
 
-    def paragraph_to_table(self, paragraph):
+    @staticmethod
+    def _normalize_header(header):
+        return re.sub(r'\W+', '_', str(header).strip().lower()).strip('_')
+
+    def _merge_tables(self, frames):
+        canonical = {}
+        aligned = []
+        for df in frames:
+            df = df.loc[:, ~pd.Index([self._normalize_header(c) for c in df.columns]).duplicated()]
+            renamed = {}
+            for col in df.columns:
+                key = self._normalize_header(col)
+                canonical.setdefault(key, col)
+                renamed[col] = canonical[key]
+            aligned.append(df.rename(columns=renamed))
+
+        merged = pd.concat(aligned, ignore_index=True, sort=False)
+        merged = merged[list(canonical.values())]
+        before = len(merged)
+        merged = merged.drop_duplicates().reset_index(drop=True)
+        print(f"--- Merged {before} rows into {len(merged)} after de-duplication ---")
+        return merged
+
+    def _extract_table(self, paragraph, row_sink=None):
         prompt = f"""
 You are an expert data extractor.
 Extract a structured table from the paragraph below. Return ONLY the table in valid Markdown format (starting and ending with a table).
@@ -22,32 +141,62 @@ Paragraph:
 """
         print("\n--- Sending request to Gemini Pro ---")
         try:
-            response = self.model.generate_content(prompt)
-            response_text = response.text.strip()
+            if row_sink is not None:
+                return self._stream_table(prompt, row_sink)
+            with span("paragraph.gemini_round_trip", nbytes=len(prompt.encode("utf-8"))):
+                response = self.model.generate_content(prompt)
+                response_text = response.text.strip()
 
             print("\n--- Gemini Response ---")
             print(response_text)
 
-            df = self._markdown_to_dataframe(response_text)
+            with span("paragraph.markdown_parse", nbytes=len(response_text)) as parse_span:
+                df = self._markdown_to_dataframe(response_text)
+                parse_span.rows = len(df) if df is not None else 0
             return df
         except Exception as e:
             print(f"Error using Gemini Pro: {e}")
+            if row_sink is not None:
+                row_sink.finish()
             return None
 
-    def _markdown_to_dataframe(self, markdown_table):
-        lines = [line.strip() for line in markdown_table.split("\n") if line.strip()]
-        if len(lines) < 2 or '|' not in lines[0]:
+    def _stream_table(self, prompt, row_sink):
+        # Rows are pushed to the sink as soon as their line is complete; the DataFrame is built from the same rows.
+        parser = MarkdownTableStream()
+        pieces, rows = [], []
+        row_sink.reset()
+        start = time.perf_counter()
+        with span("paragraph.gemini_stream", nbytes=len(prompt.encode("utf-8"))) as stream_span:
+            for text in self.model.generate_content_stream(prompt):
+                pieces.append(text)
+                new_rows = parser.feed(text)
+                if new_rows:
+                    if not rows:
+                        METRICS.record("paragraph.time_to_first_row", time.perf_counter() - start)
+                    rows.extend(new_rows)
+                    row_sink.extend(parser.headers, new_rows)
+            tail = parser.finish()
+            rows.extend(tail)
+            if tail:
+                row_sink.extend(parser.headers, tail)
+            stream_span.rows = len(rows)
+        row_sink.finish()
+
+        print("\n--- Gemini Response (streamed) ---")
+        print("".join(pieces).strip())
+        if not parser.valid:
             print("Markdown parsing failed. Not a valid table.")
             return None
+        return pd.DataFrame(rows, columns=parser.headers)
 
-        headers = [h.strip() for h in lines[0].strip('|').split('|')]
-        data_rows = []
-        for line in lines[2:]:
-            cells = [cell.strip() for cell in line.strip('|').split('|')]
-            if len(cells) == len(headers):
-                data_rows.append(cells)
+    def _markdown_to_dataframe(self, markdown_table):
+        parser = MarkdownTableStream()
+        data_rows = parser.feed(markdown_table) + parser.finish()
+        if not parser.valid:
+            print("Markdown parsing failed. Not a valid table.")
+            return None
 
-        df = pd.DataFrame(data_rows, columns=headers)
+        df = pd.DataFrame(data_rows, columns=parser.headers)
         return df
     
 
@@ -0,0 +1,103 @@
+import collections
+import re
+
+# Literals, quoted identifiers and comments, blanked out before looking for keywords.
+LEXICAL_NOISE_PATTERN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\]|--[^\n]*|/\*.*?(?:\*/|$)", re.DOTALL)
+QUOTED_PATTERN = re.compile(f"({LEXICAL_NOISE_PATTERN.pattern})", re.DOTALL)
+TOKEN_PATTERN = re.compile(r"[()]|\w+")
+STATEMENT_VERBS = {"SELECT", "VALUES", "INSERT", "REPLACE", "UPDATE", "DELETE"}
+READ_VERBS = {"SELECT", "VALUES"}
+VOLATILE_PATTERN = re.compile(r"\b(random|randomblob|changes|total_changes|last_insert_rowid)\s*\(|'now'|\bCURRENT_(DATE|TIME|TIMESTAMP)\b", re.IGNORECASE)
+
+
+class QueryResultCache:
+    def __init__(self, max_entries=64, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize_sql(sql):
+        # Only text outside quotes is case- and whitespace-insensitive: literals and quoted identifiers are kept
+        # verbatim ("A  B" and "A B" are different columns, and SQLite may read "Bob" as a string). Comments are dropped.
+        normalized, plain = [], []
+        for i, part in enumerate(QUOTED_PATTERN.split(sql.strip().rstrip(';'))):
+            if i % 2 and not part.startswith(("--", "/*")):
+                normalized += [re.sub(r'\s+', ' ', "".join(plain)).lower(), part]
+                plain = []
+            else:
+                plain.append(" " if i % 2 else part)
+        normalized.append(re.sub(r'\s+', ' ', "".join(plain)).lower())
+        return "".join(normalized).strip()
+
+    @staticmethod
+    def statement_verb(sql):
+        # WITH only introduces CTEs: the statement is whatever verb follows them at the top level,
+        # so "WITH x AS (...) DELETE ..." is a DELETE.
+        tokens = TOKEN_PATTERN.findall(LEXICAL_NOISE_PATTERN.sub(" ", sql).upper())
+        if not tokens or tokens[0] != "WITH":
+            return tokens[0] if tokens else ""
+        depth = 0
+        for token in tokens[1:]:
+            if token == "(":
+                depth += 1
+            elif token == ")":
+                depth -= 1
+            elif depth == 0 and token in STATEMENT_VERBS:
+                return token
+        return "WITH"
+
+    @classmethod
+    def is_read(cls, sql):
+        return cls.statement_verb(sql) in READ_VERBS or sql.lstrip().upper().startswith(("EXPLAIN", "PRAGMA TABLE_INFO", "PRAGMA INDEX_LIST"))
+
+    @classmethod
+    def is_cacheable(cls, sql):
+        return cls.statement_verb(sql) in READ_VERBS and not VOLATILE_PATTERN.search(sql)
+
+    def key(self, sql, params, max_rows=None):
+        # A capped call must not be answered with a larger result cached by an uncapped one.
+        return (self.normalize_sql(sql), repr(tuple(params) if isinstance(params, list) else params), max_rows)
+
+    def sync(self, version):
+        # data_version only moves for commits made by other connections; our own writes call invalidate().
+        if version != self._version:
+            if self._entries:
+                print("♻️ Result cache cleared: database changed since results were cached.")
+            self.invalidate()
+            self._version = version
+
+    def get(self, sql, params, max_rows=None):
+        key = self.key(sql, params, max_rows)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0].copy()
+
+    def put(self, sql, params, df, max_rows=None):
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return False
+        key = self.key(sql, params, max_rows)
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (df.copy(), size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+        return True
+
+    def invalidate(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,42 @@
+import threading
+import pandas as pd
+from metrics import span
+
+KEY_ALIAS = "__page_key__"
+
+
+class KeysetPager:
+    # Every page is its own short statement ("key > last seen key ... LIMIT n"), so no cursor or
+    # read lock stays open between pages and a page costs the same at row 10 and row 10 million.
+    def __init__(self, conn, table_name, columns=None, key_column="rowid", page_size=500, lock=None):
+        self.conn = conn
+        self.table_name = table_name
+        self.key_column = key_column
+        self.page_size = page_size
+        self.lock = lock or threading.Lock()
+        select_list = ", ".join(f'"{c}"' for c in columns) if columns else "*"
+        self._sql = (f'SELECT {key_column} AS {KEY_ALIAS}, {select_list} FROM "{table_name}" '
+                     f'WHERE {key_column} > ? ORDER BY {key_column} LIMIT ?;')
+        with self.lock:
+            cursor = self.conn.execute(f'SELECT {select_list} FROM "{table_name}" LIMIT 0;')
+            self.columns = [desc[0] for desc in cursor.description]
+        self.last_key = None
+        self.exhausted = False
+
+    def fetch_page(self, after_key=None):
+        with self.lock, span("db.page_fetch") as page_span:
+            rows = self.conn.execute(self._sql, (after_key if after_key is not None else -2**63, self.page_size)).fetchall()
+            page_span.rows = len(rows)
+        keys = [row[0] for row in rows]
+        page = pd.DataFrame.from_records([tuple(row)[1:] for row in rows], columns=self.columns)
+        return page, (keys[-1] if keys else None)
+
+    def __iter__(self):
+        while not self.exhausted:
+            page, last_key = self.fetch_page(self.last_key)
+            if last_key is not None:
+                self.last_key = last_key
+            if len(page) < self.page_size:
+                self.exhausted = True
+            if not page.empty:
+                yield page
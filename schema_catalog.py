@@ -0,0 +1,76 @@
+import sqlite3
+
+class TableSchema:
+    def __init__(self, name, columns, row_estimate, indexes):
+        self.name = name
+        self.columns = columns
+        self.row_estimate = row_estimate
+        self.indexes = indexes
+
+    @property
+    def column_names(self):
+        return [name for name, _ in self.columns]
+
+    def describe(self):
+        cols = ", ".join(f"{name} {col_type}".strip() for name, col_type in self.columns)
+        return f"Table '{self.name}' columns: {cols}"
+
+
+class SchemaCatalog:
+    def __init__(self, db_mgr):
+        self.db_mgr = db_mgr
+        self._tables = {}
+        self._schema_version = None
+
+    def invalidate(self):
+        self._schema_version = None
+
+    def _refresh_if_stale(self):
+        conn = self.db_mgr.conn
+        if conn is None:
+            return False
+        version = conn.execute("PRAGMA schema_version;").fetchone()[0]
+        if version == self._schema_version:
+            return True
+        self._tables = self._load(conn)
+        self._schema_version = version
+        return True
+
+    def _load(self, conn):
+        names = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY rowid;")]
+        stats = {}
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name='sqlite_stat1';").fetchone():
+            for tbl, stat in conn.execute("SELECT tbl, stat FROM sqlite_stat1;"):
+                if stat:
+                    stats.setdefault(tbl, int(stat.split()[0]))
+
+        tables = {}
+        for name in names:
+            columns = [(col[1], col[2]) for col in conn.execute(f'PRAGMA table_info("{name}");')]
+            indexes = []
+            for idx in conn.execute(f'PRAGMA index_list("{name}");'):
+                idx_cols = [col[2] for col in conn.execute(f'PRAGMA index_info("{idx[1]}");')]
+                indexes.append((idx[1], idx_cols, bool(idx[2])))
+            # SQLite identifiers are case-insensitive, so lookups are too; TableSchema keeps the declared spelling.
+            tables[name.lower()] = TableSchema(name, columns, stats.get(name, self._estimate_rows(conn, name)), indexes)
+        return tables
+
+    @staticmethod
+    def _estimate_rows(conn, name):
+        # max(rowid) is an O(log n) upper bound; good enough where ANALYZE has not been run.
+        try:
+            return conn.execute(f'SELECT max(rowid) FROM "{name}";').fetchone()[0] or 0
+        except sqlite3.Error:
+            return None
+
+    def table_names(self, include_internal=False):
+        if not self._refresh_if_stale():
+            return []
+        prefix = self.db_mgr.INTERNAL_TABLE_PREFIX.lower()
+        return [table.name for key, table in self._tables.items() if include_internal or not key.startswith(prefix)]
+
+    def table(self, name):
+        if not self._refresh_if_stale():
+            return None
+        return self._tables.get(name.lower())
@@ -1,8 +1,12 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, filedialog
-import pandas as pd
 import os
 import queue
+import threading
+import concurrent.futures
+from virtual_table import DataFrameRowSource, StreamingRowSource, VirtualTreeview
+from metrics import span
+from exporter import BackgroundExporter, iter_dataframe_batches
 
 class Colors:
     BACKGROUND = "#0a0a1f"
@@ -16,16 +20,99 @@ class Colors:
     BUTTON_FG = "#00f0ff"
 
 class SQLAssistantGUI:
+    POLL_INTERVAL_MS = 15
+    STREAM_REFRESH_MS = 100
+
     def __init__(self):
         self.root = tk.Tk()
         self.root.title("SQL Assistant")
         self.root.configure(bg=Colors.BACKGROUND)
         self.root.geometry("1200x800")
         
-        self.response_queue = queue.Queue()
         self.current_df_to_download = None
+        self.current_export_source = None
+        self.cancel_callback = None
+        self.exporter = BackgroundExporter()
+
+        # Widgets are only touched on the Tk thread. Other threads post commands here and
+        # get a Future back; prompts resolve their Future when the user answers.
+        self._ui_thread = threading.current_thread()
+        self._commands = queue.Queue()
+        self._pending_dialogs = set()
+        self._closed = False
+        self._stream_refresh_pending = False
+        self._stream_columns_changed = False
 
         self._build_ui()
+        self.root.after(self.POLL_INTERVAL_MS, self._drain_commands)
+
+    def call(self, fn, *args, **kwargs):
+        future = concurrent.futures.Future()
+        if self._closed:
+            future.set_result(None)
+        elif threading.current_thread() is self._ui_thread:
+            self._run_command(future, fn, args, kwargs)
+        else:
+            self._commands.put((future, fn, args, kwargs))
+        return future
+
+    def _request(self, fn, *args, **kwargs):
+        future = self.call(fn, *args, **kwargs)
+        if threading.current_thread() is self._ui_thread:
+            while not future.done() and not self._closed:
+                self.root.update()
+                self.root.after(self.POLL_INTERVAL_MS)
+        return future.result()
+
+    def _run_command(self, future, fn, args, kwargs):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            return
+        if isinstance(result, concurrent.futures.Future):
+            result.add_done_callback(lambda done: future.set_result(done.result()))
+        else:
+            future.set_result(result)
+
+    def _drain_commands(self):
+        while True:
+            try:
+                future, fn, args, kwargs = self._commands.get_nowait()
+            except queue.Empty:
+                break
+            self._run_command(future, fn, args, kwargs)
+        if not self._closed:
+            self.root.after(self.POLL_INTERVAL_MS, self._drain_commands)
+
+    def _close_bus(self):
+        self._closed = True
+        for future in list(self._pending_dialogs):
+            if not future.done():
+                future.set_result(None)
+        while True:
+            try:
+                future, *_ = self._commands.get_nowait()
+            except queue.Empty:
+                break
+            if not future.done():
+                future.set_result(None)
+
+    def _new_dialog_future(self, dialog):
+        future = concurrent.futures.Future()
+        self._pending_dialogs.add(future)
+        future.add_done_callback(self._pending_dialogs.discard)
+
+        def resolve(value):
+            if not future.done():
+                future.set_result(value)
+            if dialog.winfo_exists():
+                dialog.destroy()
+
+        dialog.protocol("WM_DELETE_WINDOW", lambda: resolve(None))
+        return future, resolve
 
     def _build_ui(self):
         main_frame = tk.Frame(self.root, bg=Colors.BACKGROUND, padx=10, pady=10)
@@ -42,15 +129,25 @@ class SQLAssistantGUI:
 
         self.download_button = tk.Button(title_bar, text="💾 Download", font=("Consolas", 10, "bold"),
                                          bg=Colors.INPUT_BG, fg=Colors.BUTTON_FG, relief="flat", command=self._download_current_df)
+        self.row_range_label = tk.Label(title_bar, font=("Consolas", 10), bg=Colors.FRAME, fg=Colors.TEXT_SECONDARY)
         
         self.content_frame = tk.Frame(self.display_frame, bg=Colors.FRAME)
         self.content_frame.pack(expand=True, fill="both", padx=10, pady=10)
 
-        self.tree = ttk.Treeview(self.content_frame, style="Custom.Treeview")
+        self.table_frame = tk.Frame(self.content_frame, bg=Colors.FRAME)
+        self.tree = ttk.Treeview(self.table_frame, style="Custom.Treeview")
+        self.tree_scrollbar = ttk.Scrollbar(self.table_frame, orient="vertical")
+        self.tree_scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", expand=True, fill="both")
+        self.virtual_table = VirtualTreeview(self.tree, self.tree_scrollbar, on_window_change=self._update_row_range)
         self.message_area = scrolledtext.ScrolledText(self.content_frame, wrap=tk.WORD, font=("Consolas", 11), bg=Colors.INPUT_BG, fg=Colors.TEXT_PRIMARY, relief="flat", bd=0)
 
-        self.status_label = tk.Label(main_frame, text="Initializing...", font=("Consolas", 11), bg=Colors.BACKGROUND, fg=Colors.TEXT_SECONDARY, anchor="w")
-        self.status_label.pack(fill="x")
+        status_bar = tk.Frame(main_frame, bg=Colors.BACKGROUND)
+        status_bar.pack(fill="x")
+        self.cancel_button = tk.Button(status_bar, text="⛔ Cancel", font=("Consolas", 10, "bold"),
+                                       bg=Colors.INPUT_BG, fg=Colors.HEADER, relief="flat", command=self._request_cancel)
+        self.status_label = tk.Label(status_bar, text="Initializing...", font=("Consolas", 11), bg=Colors.BACKGROUND, fg=Colors.TEXT_SECONDARY, anchor="w")
+        self.status_label.pack(side="left", fill="x", expand=True)
         
         style = ttk.Style()
         style.theme_use("clam")
@@ -60,58 +157,122 @@ class SQLAssistantGUI:
 
     def _clear_content_frame(self):
         self.download_button.pack_forget()
+        self.row_range_label.pack_forget()
         for widget in self.content_frame.winfo_children():
             widget.pack_forget()
 
     def _download_current_df(self):
-        if self.current_df_to_download is None or self.current_df_to_download.empty:
+        df = self.current_df_to_download
+        if self.current_export_source is None and (df is None or df.empty):
             self.update_status("No data available to download.")
             return
         
         file_path = filedialog.asksaveasfilename(
             defaultextension=".csv",
-            filetypes=[("CSV files", "*.csv"), ("Excel files", "*.xlsx"), ("All files", "*.*")],
+            filetypes=[("CSV files", "*.csv"), ("Gzip CSV", "*.csv.gz"), ("Zstandard CSV", "*.csv.zst"),
+                       ("Parquet files", "*.parquet"), ("Arrow IPC files", "*.arrow"), ("Excel files", "*.xlsx"), ("All files", "*.*")],
             title="Save Table Data"
         )
         if not file_path: return
 
-        try:
-            if file_path.endswith('.csv'):
-                self.current_df_to_download.to_csv(file_path, index=False)
-            elif file_path.endswith('.xlsx'):
-                self.current_df_to_download.to_excel(file_path, index=False)
-            self.update_status(f"Table successfully saved to {os.path.basename(file_path)}")
-        except Exception as e:
-            self.update_status(f"Error saving file: {e}")
-
-    def display_table(self, df: pd.DataFrame, title: str):
-        self.title_label.config(text=f"📊 {title}")
-        self._clear_content_frame()
-        self.tree.pack(expand=True, fill="both")
-        
-        self.current_df_to_download = df 
-        self.download_button.pack(side="right")
+        batches = self.current_export_source or (lambda: iter_dataframe_batches(df))
+        self.export_in_background(batches, file_path)
 
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        
+    def export_in_background(self, batches_factory, file_path):
+        name = os.path.basename(file_path)
+
+        def progress(rows, rows_per_sec):
+            self.update_status(f"💾 Saving {name}: {rows:,} rows ({rows_per_sec:,.0f} rows/sec)...")
+
+        def done(future):
+            if future.cancelled() or future.exception() is not None:
+                self.update_status(f"Error saving file: {future.exception() if not future.cancelled() else 'cancelled'}")
+            else:
+                self.update_status(f"Table successfully saved to {name} ({future.result():,} rows)")
+
+        return self.exporter.submit(batches_factory, file_path, progress, done)
+
+    def _update_row_range(self, first, last, total, exhausted):
+        total_text = f"{total:,}" if exhausted else f"{total:,}+"
+        self.row_range_label.config(text=f"rows {first:,}–{last:,} of {total_text}")
+
+    def display_table(self, df, title: str, export_source=None):
+        return self._request(self._display_table, df, title, export_source)
+
+    def display_row_source(self, source, title: str, downloadable=False, export_source=None):
+        return self._request(self._display_row_source, source, title, downloadable, export_source)
+
+    def _display_table(self, df, title, export_source=None):
+        self.current_df_to_download = df
+        self.current_export_source = export_source
         if df is None or df.empty:
+            self._show_table_frame(title)
+            self.virtual_table.set_source(None)
             self.tree["columns"] = ("1",)
             self.tree.heading("1", text="Result")
             self.tree.insert("", "end", values=("No data to display.",))
             return
-            
-        self.tree["columns"] = list(df.columns)
+        self._display_row_source(DataFrameRowSource(df), title, downloadable=True, export_source=export_source)
+
+    def _display_row_source(self, source, title, downloadable=False, export_source=None):
+        self.current_export_source = export_source
+        self._show_table_frame(title)
+        if downloadable or export_source is not None:
+            self.download_button.pack(side="right")
+        self.row_range_label.pack(side="right", padx=10)
+
+        self.virtual_table.set_source(None)
+        self._configure_columns(source.columns)
+
+        with span("gui.treeview_fill") as fill_span:
+            self.virtual_table.set_source(source)
+            fill_span.rows = len(self.tree.get_children())
+
+    def _configure_columns(self, columns):
+        self.tree["columns"] = list(columns)
         self.tree["show"] = "headings"
-        
-        for col in df.columns:
+        for col in columns:
             self.tree.heading(col, text=col)
             self.tree.column(col, anchor="w", width=120)
 
-        for index, row in df.iterrows():
-            self.tree.insert("", "end", values=list(row))
+    def stream_table(self, title: str):
+        # Returns at once; the worker fills the source and the table re-renders as rows arrive.
+        source = StreamingRowSource(on_change=lambda src, columns_changed: self.call(self._schedule_stream_refresh, src, columns_changed))
+        self.call(self._stream_table, source, title)
+        return source
+
+    def _stream_table(self, source, title):
+        self.current_df_to_download = None
+        self._display_row_source(source, title)
+
+    def _schedule_stream_refresh(self, source, columns_changed):
+        # Rows can arrive many times a second; renders are coalesced to one per STREAM_REFRESH_MS.
+        if self.virtual_table.source is not source:
+            return
+        self._stream_columns_changed |= columns_changed
+        if self._stream_refresh_pending:
+            return
+        self._stream_refresh_pending = True
+        self.root.after(self.STREAM_REFRESH_MS, self._refresh_stream, source)
+
+    def _refresh_stream(self, source):
+        self._stream_refresh_pending = False
+        if self.virtual_table.source is not source:
+            return
+        if self._stream_columns_changed:
+            self._stream_columns_changed = False
+            self._configure_columns(source.columns)
+        self.virtual_table.refresh()
+
+    def _show_table_frame(self, title):
+        self.title_label.config(text=f"📊 {title}")
+        self._clear_content_frame()
+        self.table_frame.pack(expand=True, fill="both")
 
     def display_message(self, title: str, message: str, symbol="ℹ️"):
+        return self._request(self._display_message, title, message, symbol)
+
+    def _display_message(self, title, message, symbol):
         self.title_label.config(text=f"{symbol} {title}")
         self._clear_content_frame()
         self.current_df_to_download = None # No DF to download
@@ -122,38 +283,38 @@ class SQLAssistantGUI:
         self.message_area.config(state=tk.DISABLED)
 
     def prompt_for_menu_choice(self, title, intro_text, options_list):
-        self.display_message(title, intro_text, symbol="✨")
+        return self._request(self._open_menu_dialog, title, intro_text, options_list)
+
+    def _open_menu_dialog(self, title, intro_text, options_list):
+        self._display_message(title, intro_text, symbol="✨")
         
         dialog = tk.Toplevel(self.root)
         dialog.title(title)
         dialog.configure(bg=Colors.BACKGROUND)
         dialog.transient(self.root)
+        future, resolve = self._new_dialog_future(dialog)
         
         tk.Label(dialog, text=intro_text, font=("Consolas", 12), bg=Colors.BACKGROUND, fg=Colors.TEXT_PRIMARY).pack(pady=20, padx=20)
         
         button_frame = tk.Frame(dialog, bg=Colors.BACKGROUND)
         button_frame.pack(pady=10, padx=20, fill="x")
 
-        def on_choice(value):
-            self.response_queue.put(value)
-            dialog.destroy()
-
         for option in options_list:
             btn = tk.Button(button_frame, text=option["text"], font=("Consolas", 11, "bold"),
                             bg=Colors.INPUT_BG, fg=Colors.BUTTON_FG, relief="flat",
-                            command=lambda v=option["value"]: on_choice(v))
+                            command=lambda v=option["value"]: resolve(v))
             btn.pack(fill="x", pady=5)
             
-        self.root.wait_window(dialog)
-        try:
-            return self.response_queue.get_nowait()
-        except queue.Empty:
-            return None
+        return future
 
     def prompt_for_text_input(self, prompt_text):
+        return self._request(self._open_text_dialog, prompt_text)
+
+    def _open_text_dialog(self, prompt_text):
         dialog = tk.Toplevel(self.root)
         dialog.title(prompt_text)
         dialog.configure(bg=Colors.BACKGROUND)
+        future, resolve = self._new_dialog_future(dialog)
         
         tk.Label(dialog, text=prompt_text, font=("Consolas", 12), bg=Colors.BACKGROUND, fg=Colors.TEXT_PRIMARY).pack(pady=20, padx=20)
         
@@ -161,27 +322,47 @@ class SQLAssistantGUI:
         text_widget.pack(padx=20, pady=10, fill="both", expand=True)
         text_widget.focus_set()
 
-        def on_submit():
-            self.response_queue.put(text_widget.get("1.0", tk.END).strip())
-            dialog.destroy()
-
-        submit_btn = tk.Button(dialog, text="Submit", command=on_submit, font=("Consolas", 11, "bold"), bg=Colors.INPUT_BG, fg=Colors.BUTTON_FG, relief="flat")
+        submit_btn = tk.Button(dialog, text="Submit", command=lambda: resolve(text_widget.get("1.0", tk.END).strip()),
+                               font=("Consolas", 11, "bold"), bg=Colors.INPUT_BG, fg=Colors.BUTTON_FG, relief="flat")
         submit_btn.pack(pady=20)
         
-        self.root.wait_window(dialog)
-        try:
-            return self.response_queue.get_nowait()
-        except queue.Empty:
-            return None
+        return future
 
     def prompt_for_file(self, purpose):
-        self.update_status(f"Waiting for user to select a file for: {purpose}")
+        return self._request(self._ask_open_file, purpose)
+
+    def _ask_open_file(self, purpose):
+        self._update_status(f"Waiting for user to select a file for: {purpose}")
         filepath = filedialog.askopenfilename(title=f"Select file for {purpose}")
-        self.update_status("File selected.")
+        self._update_status("File selected.")
         return filepath
 
+    def _request_cancel(self):
+        if self.cancel_callback:
+            self.cancel_callback()
+        self._update_status("🛑 Cancellation requested.")
+
+    def set_active_jobs(self, count: int):
+        self.call(self._set_active_jobs, count)
+
+    def _set_active_jobs(self, count):
+        if count:
+            self.cancel_button.config(text=f"⛔ Cancel ({count} running)")
+            self.cancel_button.pack(side="right")
+        else:
+            self.cancel_button.pack_forget()
+
     def update_status(self, text: str):
+        self.call(self._update_status, text)
+
+    def _update_status(self, text):
         self.status_label.config(text=text)
 
+    def shutdown(self):
+        self.call(self.root.quit)
+
     def run(self):
-        self.root.mainloop()
\ No newline at end of file
+        try:
+            self.root.mainloop()
+        finally:
+            self._close_bus()
\ No newline at end of file
@@ -0,0 +1,102 @@
+import json
+
+
+class MarkdownTableStream:
+    # Same rules as a one-shot parse: the first non-empty line is the header, the second is the
+    # |---| separator, and later lines count as rows only when their cell count matches the header.
+    def __init__(self):
+        self.headers = None
+        self.invalid = False
+        self._pending = ""
+        self._lines_seen = 0
+
+    @staticmethod
+    def _cells(line):
+        return [cell.strip() for cell in line.strip('|').split('|')]
+
+    def _parse_line(self, line):
+        line = line.strip()
+        if not line or self.invalid:
+            return None
+        self._lines_seen += 1
+        if self._lines_seen == 1:
+            if '|' not in line:
+                self.invalid = True
+                return None
+            self.headers = self._cells(line)
+            return None
+        if self._lines_seen == 2:
+            return None
+        cells = self._cells(line)
+        return cells if len(cells) == len(self.headers) else None
+
+    @property
+    def valid(self):
+        return not self.invalid and self.headers is not None and self._lines_seen >= 2
+
+    def feed(self, text):
+        # Only complete lines are parsed; a row cut mid-way by a chunk boundary waits for its newline.
+        self._pending += text
+        *lines, self._pending = self._pending.split("\n")
+        return [row for row in map(self._parse_line, lines) if row is not None]
+
+    def finish(self):
+        line, self._pending = self._pending, ""
+        row = self._parse_line(line)
+        return [row] if row is not None else []
+
+
+class JsonArrayStream:
+    # Tracks string/escape state and bracket depth across chunks, so each top-level array element
+    # is decoded as soon as its closing bracket arrives instead of after the whole response.
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._element_start = None
+
+    def feed(self, text):
+        self._buffer += text
+        elements = []
+        buffer = self._buffer
+        for i in range(self._pos, len(buffer)):
+            char = buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._element_start is None:
+                    self._element_start = i
+            elif char in "[{":
+                self._depth += 1
+                if self._depth == 2 and self._element_start is None:
+                    self._element_start = i
+            elif char in "]}":
+                self._depth -= 1
+                if self._depth == 1 and self._element_start is not None:
+                    elements.append(json.loads(buffer[self._element_start:i + 1]))
+                    self._element_start = None
+                elif self._depth == 0 and self._element_start is not None:
+                    elements.append(json.loads(buffer[self._element_start:i]))
+                    self._element_start = None
+            elif char == "," and self._depth == 1 and self._element_start is not None:
+                # Scalar elements (numbers, literals, strings) end at the next comma.
+                elements.append(json.loads(buffer[self._element_start:i]))
+                self._element_start = None
+            elif self._depth == 1 and self._element_start is None and not char.isspace() and char != ",":
+                self._element_start = i
+        # Everything before the element in progress has been consumed and can be dropped.
+        keep_from = self._element_start if self._element_start is not None else len(buffer)
+        self._buffer = buffer[keep_from:]
+        self._pos = len(buffer) - keep_from
+        if self._element_start is not None:
+            self._element_start = 0
+        return elements
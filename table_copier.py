@@ -0,0 +1,184 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from metrics import span
+
+ATTACH_ALIAS = "copy_dest"
+
+
+class CopyJob:
+    def __init__(self, row):
+        self.job_id = row["job_id"]
+        self.source_table = row["source_table"]
+        self.dest_table = row["dest_table"]
+        self.dest_db = row["dest_db"]
+        self.columns = row["columns"]
+        self.where_clause = row["where_clause"]
+        self.move = bool(row["move"])
+        self.last_rowid = row["last_rowid"]
+        self.max_rowid = row["max_rowid"]
+        self.rows_copied = row["rows_copied"]
+        self.status = row["status"]
+
+    @property
+    def description(self):
+        target = f"{os.path.basename(self.dest_db)}:{self.dest_table}" if self.dest_db else self.dest_table
+        verb = "Move" if self.move else "Copy"
+        return f"{verb} {self.source_table} -> {target} ({self.rows_copied:,} rows done)"
+
+
+class BatchedTableCopier:
+    JOBS_TABLE = "_assistant_copy_jobs"
+
+    def __init__(self, db_mgr, batch_size=50_000):
+        self.db_mgr = db_mgr
+        self.batch_size = batch_size
+        self._cancel_event = threading.Event()
+        self._table_ready = False
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def _connection(self):
+        if not self.db_mgr.conn and not self.db_mgr.connect():
+            return None
+        conn = self.db_mgr.conn
+        if not self._table_ready:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.JOBS_TABLE} (
+                    job_id TEXT PRIMARY KEY,
+                    source_table TEXT NOT NULL,
+                    dest_table TEXT NOT NULL,
+                    dest_db TEXT,
+                    columns TEXT NOT NULL,
+                    where_clause TEXT,
+                    move INTEGER NOT NULL DEFAULT 0,
+                    last_rowid INTEGER NOT NULL,
+                    max_rowid INTEGER NOT NULL,
+                    rows_copied INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                );""")
+            conn.commit()
+            self._table_ready = True
+        return conn
+
+    @staticmethod
+    def _job_id(source_table, dest_table, dest_db, columns, where_clause, move):
+        raw = "\0".join([source_table, dest_table, dest_db or "", columns, where_clause or "", str(int(move))])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+    def pending_jobs(self):
+        conn = self._connection()
+        if conn is None:
+            return []
+        rows = conn.execute(f"SELECT * FROM {self.JOBS_TABLE} WHERE status != 'done' ORDER BY updated_at;").fetchall()
+        return [CopyJob(row) for row in rows]
+
+    def discard(self, job_id):
+        conn = self._connection()
+        conn.execute(f"DELETE FROM {self.JOBS_TABLE} WHERE job_id = ?;", (job_id,))
+        conn.commit()
+
+    def start(self, source_table, dest_table, columns="*", where_clause=None, dest_db=None, move=False, progress_callback=None):
+        conn = self._connection()
+        if conn is None:
+            return None
+        dest_db = os.path.abspath(dest_db) if dest_db else None
+        job_id = self._job_id(source_table, dest_table, dest_db, columns, where_clause, move)
+        existing = conn.execute(f"SELECT * FROM {self.JOBS_TABLE} WHERE job_id = ?;", (job_id,)).fetchone()
+        if existing is None or existing["status"] == "done":
+            # Rows appended to the source after this point are not part of the job.
+            max_rowid = conn.execute(f'SELECT COALESCE(MAX(rowid), 0) FROM "{source_table}";').fetchone()[0]
+            conn.execute(f"""INSERT OR REPLACE INTO {self.JOBS_TABLE}
+                (job_id, source_table, dest_table, dest_db, columns, where_clause, move, last_rowid, max_rowid, rows_copied, status, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, 'pending', ?);""",
+                (job_id, source_table, dest_table, dest_db, columns, where_clause, int(move), -2**63, max_rowid, time.time()))
+            conn.commit()
+        else:
+            print(f"↩️ Resuming copy job {job_id} from rowid {existing['last_rowid']:,} ({existing['rows_copied']:,} rows already copied).")
+        return self.resume(job_id, progress_callback)
+
+    def resume(self, job_id, progress_callback=None):
+        conn = self._connection()
+        row = conn.execute(f"SELECT * FROM {self.JOBS_TABLE} WHERE job_id = ?;", (job_id,)).fetchone()
+        if row is None:
+            print(f"❌ No copy job with id {job_id}.")
+            return None
+        job = CopyJob(row)
+        self._cancel_event.clear()
+        if conn.in_transaction:
+            conn.commit()
+
+        dest = f'"{job.dest_table}"'
+        if job.dest_db:
+            conn.execute(f"ATTACH DATABASE ? AS {ATTACH_ALIAS};", (job.dest_db,))
+            dest = f'{ATTACH_ALIAS}."{job.dest_table}"'
+        source = f'"{job.source_table}"'
+        filter_sql = f" AND ({job.where_clause})" if job.where_clause else ""
+        select_sql = f"SELECT {job.columns} FROM {source} WHERE rowid > ? AND rowid <= ?{filter_sql}"
+        start = time.perf_counter()
+        copied_this_run = 0
+        try:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {dest} AS SELECT {job.columns} FROM {source} WHERE 0;")
+            conn.commit()
+            total = self._estimate_total(conn, job, source, filter_sql)
+            print(f"\n🚚 [BATCHED COPY] {select_sql} -> {dest} (batch_size={self.batch_size:,})")
+            while job.last_rowid < job.max_rowid:
+                if self._cancel_event.is_set():
+                    self._set_status(conn, job, "paused")
+                    print(f"⏸️ Copy paused at rowid {job.last_rowid:,}; it can be resumed later.")
+                    return job
+                # Bound each batch by the rowid of its last source row, so sparse rowids still give full batches.
+                boundary = conn.execute(f"SELECT rowid FROM {source} WHERE rowid > ? ORDER BY rowid LIMIT 1 OFFSET ?;",
+                                        (job.last_rowid, self.batch_size - 1)).fetchone()
+                upper = min(boundary[0], job.max_rowid) if boundary else job.max_rowid
+                with span("db.copy_batch") as batch_span:
+                    conn.execute("BEGIN")
+                    inserted = conn.execute(f"INSERT INTO {dest} {select_sql};", (job.last_rowid, upper)).rowcount
+                    if job.move:
+                        conn.execute(f"DELETE FROM {source} WHERE rowid > ? AND rowid <= ?{filter_sql};", (job.last_rowid, upper))
+                    job.last_rowid = upper
+                    job.rows_copied += inserted
+                    # The checkpoint commits with the batch, so a crash can never copy a range twice.
+                    self._set_status(conn, job, "running", commit=False)
+                    conn.commit()
+                    batch_span.rows = inserted
+                copied_this_run += inserted
+                elapsed = time.perf_counter() - start
+                rows_per_sec = copied_this_run / elapsed if elapsed > 0 else 0.0
+                print(f"⏳ {job.rows_copied:,}{f' / {total:,}' if total else ''} rows copied ({rows_per_sec:,.0f} rows/sec)")
+                if progress_callback:
+                    progress_callback(job.rows_copied, total, rows_per_sec)
+            self._set_status(conn, job, "done")
+            elapsed = time.perf_counter() - start
+            print(f"✅ {job.rows_copied:,} rows {'moved' if job.move else 'copied'} to {dest} in {elapsed:.1f}s.")
+            return job
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.rollback()
+            self._set_status(conn, job, "failed")
+            print(f"🚨 Copy job {job.job_id} failed at rowid {job.last_rowid:,}: {e}")
+            return None
+        finally:
+            if job.dest_db:
+                conn.execute(f"DETACH DATABASE {ATTACH_ALIAS};")
+            self.db_mgr.catalog.invalidate()
+            self.db_mgr.result_cache.invalidate()
+
+    @staticmethod
+    def _estimate_total(conn, job, source, filter_sql):
+        if filter_sql:
+            return None
+        remaining = conn.execute(f"SELECT COUNT(*) FROM {source} WHERE rowid > ? AND rowid <= ?;",
+                                 (job.last_rowid, job.max_rowid)).fetchone()[0]
+        return job.rows_copied + remaining
+
+    def _set_status(self, conn, job, status, commit=True):
+        job.status = status
+        conn.execute(f"UPDATE {self.JOBS_TABLE} SET last_rowid = ?, rows_copied = ?, status = ?, updated_at = ? WHERE job_id = ?;",
+                     (job.last_rowid, job.rows_copied, status, time.time(), job.job_id))
+        if commit:
+            conn.commit()
@@ -1,34 +1,33 @@
 import pandas as pd
+from exporter import export_batches, iter_dataframe_batches
 
-def offer_download_df(dataframe, default_filename="output_table"):
-    if dataframe is None or dataframe.empty:
+DOWNLOAD_FORMATS = {"c": ".csv", "g": ".csv.gz", "z": ".csv.zst", "p": ".parquet", "a": ".arrow", "e": ".xlsx"}
+
+def offer_download_df(dataframe, default_filename="output_table", batches_factory=None):
+    if batches_factory is None and (dataframe is None or dataframe.empty):
         print("⚠️ No data to download.")
         return
 
     while True:
         choice = input("💬 Do you want to download this table? (yes/no): ").strip().lower()
         if choice == 'yes':
-            format_choice = input("📂 Download as (c)sv or (e)xcel? ").strip().lower()
+            format_choice = input("📂 Download as (c)sv, (g)zip csv, (z)std csv, (p)arquet, (a)rrow or (e)xcel? ").strip().lower()
             filename_base = input(f"📝 Enter filename (without extension, default: {default_filename}): ").strip()
             if not filename_base:
                 filename_base = default_filename
 
+            extension = DOWNLOAD_FORMATS.get(format_choice[:1])
+            if extension is None:
+                print("❌ Invalid format choice. Please choose 'c', 'g', 'z', 'p', 'a' or 'e'.")
+                continue
+            filename = f"{filename_base}{extension}"
             try:
-                if format_choice.startswith('c'):
-                    filename = f"{filename_base}.csv"
-                    dataframe.to_csv(filename, index=False)
-                    print(f"✅ Table saved as {filename}")
-                elif format_choice.startswith('e'):
-                    filename = f"{filename_base}.xlsx"
-                    dataframe.to_excel(filename, index=False)
-                    print(f"✅ Table saved as {filename}")
-                else:
-                    print("❌ Invalid format choice. Please choose 'c' or 'e'.")
-                    continue
-                break
+                batches = batches_factory() if batches_factory else iter_dataframe_batches(dataframe)
+                rows = export_batches(batches, filename)
+                print(f"✅ Table saved as {filename} ({rows:,} rows)")
             except Exception as e:
                 print(f"🔥 Error saving file: {e}")
-                break
+            break
         elif choice == 'no':
             break
         else:
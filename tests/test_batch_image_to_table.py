@@ -0,0 +1,62 @@
+import pandas as pd
+
+from assistant_cli import SQLAssistant
+
+TABLES = {
+    "a.png": pd.DataFrame({"Item": ["pen"], "Price": [1.5]}),
+    "b.png": pd.DataFrame({"Item": ["ink"], "Price": [3.0], "Qty": [2]}),
+}
+
+
+class FakeImageHandler:
+    def image_to_dataframe(self, image_path, row_sink=None):
+        import os
+
+        return TABLES[os.path.basename(image_path)].copy(), "receipt"
+
+
+class RecordingGUI:
+    # Answers prompts in order and records every active-job count the assistant reports.
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.active_counts = []
+
+    def prompt_for_text_input(self, prompt_text):
+        return self.answers.pop(0)
+
+    def prompt_for_menu_choice(self, title, intro_text, options_list):
+        return self.answers.pop(0)
+
+    def display_message(self, title, message, symbol=None):
+        pass
+
+    def display_table(self, df, title, export_source=None):
+        pass
+
+    def update_status(self, text):
+        pass
+
+    def set_active_jobs(self, count):
+        self.active_counts.append(count)
+
+
+def test_shared_table_gains_columns_and_keeps_other_work_counted(tmp_path):
+    for name in TABLES:
+        (tmp_path / name).write_bytes(b"")
+    gui = RecordingGUI([str(tmp_path / "*.png"), "shared", "receipts"])
+    assistant = SQLAssistant(gui, db_name=str(tmp_path / "t.sqlite"))
+    assistant._image_handler = FakeImageHandler()
+    assert assistant.db_mgr.connect()
+    # Another job (say an ingest) is running the whole time and must stay in the count.
+    assistant._active_ingest = True
+    try:
+        assistant._handle_batch_image_to_table()
+        rows = sorted(tuple(row) for row in assistant.db_mgr.conn.execute('SELECT source_image, Item, Price, Qty FROM receipts'))
+    finally:
+        assistant.llm.shutdown()
+        assistant.exporter.shutdown()
+        assistant.db_mgr.close()
+
+    assert rows == [("a.png", "pen", 1.5, None), ("b.png", "ink", 3.0, 2)]
+    assert gui.active_counts[-1] == 1
+    assert min(gui.active_counts) >= 1
@@ -0,0 +1,76 @@
+import sqlite3
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from database_manager import DatabaseManager
+from file_handler import read_data_file_chunks
+
+STAMPS = ["2024-01-01 10:00:00.123", "2024-01-01 10:00:00", None]
+STORED = ["2024-01-01 10:00:00.123000", "2024-01-01 10:00:00", None]
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "t.sqlite"))
+    assert db.connect()
+    yield db
+    db.close()
+
+
+def _column(db, sql):
+    return [row[0] for row in db.conn.execute(sql)]
+
+
+def test_pandas_rows_match_to_sql_timestamps(db):
+    df = pd.DataFrame({"id": [1, 2, 3], "ts": pd.to_datetime(STAMPS, format="ISO8601")})
+    assert [row[1] for row in DatabaseManager.rows_for_sqlite(df)] == STORED
+    assert db.load_df_to_table(df, "events")
+    assert _column(db, "SELECT ts FROM events ORDER BY id") == STORED
+
+
+@pytest.mark.parametrize("unit", ["ms", "us", "ns"])
+def test_arrow_load_keeps_fractional_seconds(tmp_path, db, unit):
+    path = tmp_path / "events.parquet"
+    stamps = pd.to_datetime(STAMPS, format="ISO8601")
+    pq.write_table(pa.table({"id": [1, 2, 3], "ts": pa.array(stamps, pa.timestamp(unit))}), path)
+    chunks, _ = read_data_file_chunks(str(path))
+    assert db.load_chunks_to_table(chunks, "events")
+    assert _column(db, "SELECT ts FROM events ORDER BY id") == STORED
+
+
+def test_csv_chunks_round_trip(tmp_path, db):
+    path = tmp_path / "data.csv"
+    path.write_text("id,name,score\n1,a,1.5\n2,,2.5\n3,c,\n")
+    chunks, _ = read_data_file_chunks(str(path), chunk_rows=2)
+    assert db.load_chunks_to_table(chunks, "data")
+    rows = [tuple(row) for row in db.conn.execute("SELECT id, name, score FROM data ORDER BY id")]
+    assert rows == [(1, "a", 1.5), (2, None, 2.5), (3, "c", None)]
+    types = {row[1]: row[2] for row in db.conn.execute("PRAGMA table_info(data)")}
+    assert types == {"id": "INTEGER", "name": "TEXT", "score": "REAL"}
+
+
+def test_streamed_query_error_is_raised_after_partial_batches(db):
+    def check(value):
+        if value == 5:
+            raise ValueError("bad row")
+        return value
+
+    db.conn.create_function("check_value", 1, check)
+    batches = db.iter_query_batches("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 9) "
+                                    "SELECT check_value(i) AS i FROM n", batch_size=2, as_dataframe=False)
+    seen = []
+    with pytest.raises(sqlite3.Error):
+        for batch in batches:
+            seen.extend(batch)
+    # sqlite3 steps one row ahead, so the error may surface a batch early; what matters is that it surfaces.
+    assert seen[:2] == [(1,), (2,)] and len(seen) < 5
+
+
+def test_streamed_query_times_out(db):
+    endless = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT COUNT(*) FROM n"
+    with pytest.raises(sqlite3.OperationalError, match="interrupt"):
+        list(db.iter_query_batches(endless, timeout=0.2))
+    assert db.last_abort["reason"] == "timed out" and not db.query_running
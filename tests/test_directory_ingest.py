@@ -0,0 +1,92 @@
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+import pytest
+
+from database_manager import DatabaseManager
+from directory_ingest import DirectoryIngestor
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "t.sqlite"))
+    assert db.connect()
+    yield db
+    db.close()
+
+
+def _rows(db, sql):
+    return [tuple(row) for row in db.conn.execute(sql)]
+
+
+def _write_inputs(folder):
+    folder.mkdir()
+    (folder / "a.csv").write_text("id,name\n1,x\n2,y\n")
+    pq.write_table(pa.table({"id": [3], "name": ["z"], "extra": [1.5]}), folder / "b.parquet")
+    with pa.ipc.new_file(str(folder / "c.arrow"), pa.schema([("id", pa.int64())])) as writer:
+        writer.write_table(pa.table({"id": [4, 5]}))
+    (folder / "notes.txt").write_text("ignored")
+
+
+def test_one_table_per_file(tmp_path, db):
+    _write_inputs(tmp_path / "in")
+    ingestor = DirectoryIngestor(db, max_workers=1, chunk_rows=1)
+    paths = ingestor.resolve_paths(str(tmp_path / "in"))
+    assert [p.rsplit("/", 1)[1] for p in paths] == ["a.csv", "b.parquet", "c.arrow"]
+
+    results = ingestor.ingest(paths)
+    assert all(r.ok for r in results) and [r.rows for r in results] == [2, 1, 2]
+    assert _rows(db, "SELECT id, name FROM a_table ORDER BY id") == [(1, "x"), (2, "y")]
+    assert _rows(db, "SELECT id, name, extra FROM b_table") == [(3, "z", 1.5)]
+    assert _rows(db, "SELECT id FROM c_table ORDER BY id") == [(4,), (5,)]
+
+
+def test_union_table_adds_columns_and_drops_a_failed_file(tmp_path, db):
+    _write_inputs(tmp_path / "in")
+    (tmp_path / "in" / "broken.parquet").write_bytes(b"not parquet")
+    ingestor = DirectoryIngestor(db, max_workers=1)
+    results = ingestor.ingest(ingestor.resolve_paths(str(tmp_path / "in")), union_table="everything")
+
+    assert {r.file_path.rsplit("/", 1)[1]: r.ok for r in results} == {
+        "a.csv": True, "b.parquet": True, "broken.parquet": False, "c.arrow": True}
+    assert _rows(db, "SELECT source_file, id, name, extra FROM everything ORDER BY id") == [
+        ("a.csv", 1, "x", None), ("a.csv", 2, "y", None), ("b.parquet", 3, "z", 1.5),
+        ("c.arrow", 4, None, None), ("c.arrow", 5, None, None)]
+
+
+def test_table_name_template():
+    assert DirectoryIngestor.table_name_for("/data/2024/sales-q1.csv", "{parent}_{stem}_{ext}") == "2024_sales_q1_csv"
+
+
+def test_union_tags_rows_with_the_path_below_the_glob_root(tmp_path, db):
+    for year, ids in (("2024", [1, 2]), ("2025", [3])):
+        (tmp_path / "exports" / year).mkdir(parents=True)
+        pq.write_table(pa.table({"id": ids}), tmp_path / "exports" / year / "orders.parquet")
+    (tmp_path / "exports" / "2026").mkdir()
+    (tmp_path / "exports" / "2026" / "orders.parquet").write_bytes(b"not parquet")
+    pattern = str(tmp_path / "exports" / "**" / "*.parquet")
+    ingestor = DirectoryIngestor(db, max_workers=1)
+    results = ingestor.ingest(ingestor.resolve_paths(pattern), union_table="orders", source_root=DirectoryIngestor.source_root(pattern))
+
+    assert [r.ok for r in results] == [True, True, False]
+    # The failed 2026/orders.parquet only takes its own rows with it.
+    assert _rows(db, "SELECT source_file, id FROM orders ORDER BY id") == [
+        ("2024/orders.parquet", 1), ("2024/orders.parquet", 2), ("2025/orders.parquet", 3)]
+
+
+def test_files_mapped_to_one_table_are_rejected(tmp_path, db):
+    (tmp_path / "a.csv").write_text("id\n1\n")
+    pq.write_table(pa.table({"id": [2]}), tmp_path / "a.parquet")
+    (tmp_path / "b.csv").write_text("id\n3\n")
+    ingestor = DirectoryIngestor(db, max_workers=1)
+    results = ingestor.ingest(ingestor.resolve_paths(str(tmp_path)))
+
+    assert {r.file_path.rsplit("/", 1)[1]: r.ok for r in results} == {"a.csv": False, "a.parquet": False, "b.csv": True}
+    assert "a_table" in results[0].error and not db.table_exists("a_table")
+    assert _rows(db, "SELECT id FROM b_table") == [(3,)]
+
+
+def test_source_root():
+    assert DirectoryIngestor.source_root("/data/exports/**/*.csv") == "/data/exports"
+    assert DirectoryIngestor.source_root("/data/exports/2024/orders.csv") == "/data/exports/2024"
+    assert DirectoryIngestor.source_label("/data/exports/2024/orders.csv", "/data/exports") == "2024/orders.csv"
@@ -0,0 +1,98 @@
+import sqlite3
+
+import pandas as pd
+
+from database_manager import DatabaseManager
+from dtype_inference import optimize_dtypes, sqlite_affinity
+
+
+def _optimized(values):
+    df, _ = optimize_dtypes(pd.DataFrame({"col": values}))
+    return df["col"]
+
+
+def test_floats_outside_int64_stay_floats():
+    col = _optimized([1e20, 2.0])
+    assert pd.api.types.is_float_dtype(col.dtype)
+    assert col.tolist() == [1e20, 2.0]
+
+
+def test_integral_floats_in_range_are_downcast():
+    col = _optimized([1.0, 300.0])
+    assert pd.api.types.is_integer_dtype(col.dtype)
+    assert col.tolist() == [1, 300]
+
+
+def test_long_digit_strings_stay_text():
+    col = _optimized(["1234567890123456789012", "1234567890123456789013"])
+    assert sqlite_affinity(col.dtype) == "TEXT"
+    assert col.astype(str).tolist() == ["1234567890123456789012", "1234567890123456789013"]
+
+
+def test_zero_padded_codes_keep_leading_zeros():
+    col = _optimized(["02134", "10001", "00501"])
+    assert sqlite_affinity(col.dtype) == "TEXT"
+    assert col.astype(str).tolist() == ["02134", "10001", "00501"]
+
+
+def test_plain_numeric_strings_are_converted():
+    col = _optimized(["0", "12", "1,234", "-0.5"])
+    assert pd.api.types.is_float_dtype(col.dtype)
+    assert col.tolist() == [0.0, 12.0, 1234.0, -0.5]
+
+
+def test_boolean_objects_map_to_integer():
+    col = _optimized(pd.Series([True, False, None], dtype=object))
+    assert sqlite_affinity(col.dtype) == "INTEGER"
+    assert col.tolist()[:2] == [True, False] and pd.isna(col.iloc[2])
+
+
+def test_version_strings_stay_text():
+    col = _optimized(["1.2.3", "10.1.2", "1.10.1", "2024.1.2"])
+    assert not pd.api.types.is_datetime64_any_dtype(col.dtype)
+    assert col.astype(str).tolist() == ["1.2.3", "10.1.2", "1.10.1", "2024.1.2"]
+
+
+def test_only_timestamps_in_stored_form_become_datetimes():
+    assert pd.api.types.is_datetime64_any_dtype(_optimized(["2023-01-02 03:04:05", "2023-01-03 00:00:00.250000"]).dtype)
+    # Converting these would change the text written back: a time would be appended, or d/m read as m/d.
+    for values in (["2023-01-02", "2023-01-03"], ["01/02/2023", "03/04/2023"], ["2023-01-02T03:04:05", "2023-01-03T00:00:00"]):
+        col = _optimized(values)
+        assert not pd.api.types.is_datetime64_any_dtype(col.dtype)
+        assert col.astype(str).tolist() == values
+
+
+def test_loaded_values_round_trip(tmp_path):
+    db = DatabaseManager(str(tmp_path / "t.sqlite"))
+    assert db.connect()
+    df = pd.DataFrame({"zip": ["02134", "10001"], "big": [1e20, 2.0], "flag": pd.Series([True, None], dtype=object),
+                       "day": ["01/02/2023", "2023-01-03"], "at": ["2023-01-02 03:04:05", "2023-01-03 00:00:00.250000"]})
+    assert db.load_df_to_table(df, "t")
+    db.close()
+    with sqlite3.connect(tmp_path / "t.sqlite") as conn:
+        assert conn.execute("SELECT zip, big, flag FROM t").fetchall() == [("02134", 1e20, 1), ("10001", 2.0, None)]
+        assert conn.execute("SELECT day, at FROM t").fetchall() == [("01/02/2023", "2023-01-02 03:04:05"),
+                                                                    ("2023-01-03", "2023-01-03 00:00:00.250000")]
+        types = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(t)")}
+    assert types == {"zip": "TEXT", "big": "REAL", "flag": "INTEGER", "day": "TEXT", "at": "TEXT"}
+
+
+def test_read_then_load_infers_once(tmp_path, monkeypatch):
+    import file_handler
+    import database_manager
+
+    path = tmp_path / "data.csv"
+    path.write_text("id,v\n1,a\n2,b\n")
+    calls = []
+
+    def counting(df, *args, **kwargs):
+        calls.append(len(df))
+        return optimize_dtypes(df, *args, **kwargs)
+
+    monkeypatch.setattr(file_handler, "optimize_dtypes", counting)
+    monkeypatch.setattr(database_manager, "optimize_dtypes", counting)
+    df, _ = file_handler.read_data_file(str(path))
+    db = DatabaseManager(str(tmp_path / "t.sqlite"))
+    assert db.load_df_to_table(df, "data")
+    db.close()
+    assert calls == [2]
@@ -0,0 +1,98 @@
+import sqlite3
+import threading
+
+import pandas as pd
+import pyarrow.ipc
+import pyarrow.parquet as pq
+import pytest
+
+import exporter
+from exporter import BackgroundExporter, ExportCancelled, export_batches, iter_sqlite_batches
+
+
+def _read(path):
+    if path.endswith(".parquet"):
+        return pq.read_table(path).to_pandas()
+    with pyarrow.ipc.open_file(path) as reader:
+        return reader.read_all().to_pandas()
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+def test_null_only_first_batch(tmp_path, suffix):
+    batches = [pd.DataFrame({"id": [1, 2], "note": [None, None]}),
+               pd.DataFrame({"id": [3, 4], "note": ["x", None]})]
+    path = str(tmp_path / f"out{suffix}")
+    assert export_batches(iter(batches), path) == 4
+    df = _read(path)
+    assert df["id"].tolist() == [1, 2, 3, 4]
+    assert df["note"].tolist()[2] == "x"
+    assert df["note"].isna().tolist() == [True, True, False, True]
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+@pytest.mark.parametrize("late, expected", [(["late"], ["late"]), ([5, 6], [5, 6])])
+def test_null_column_is_typed_by_values_after_the_buffer_fills(tmp_path, monkeypatch, suffix, late, expected):
+    monkeypatch.setattr(exporter, "SCHEMA_BUFFER_ROWS", 2)
+    batches = [pd.DataFrame({"note": [None, None]}), pd.DataFrame({"note": late})]
+    path = str(tmp_path / f"out{suffix}")
+    assert export_batches(iter(batches), path) == 2 + len(late)
+    assert _read(path)["note"].tolist()[2:] == expected
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+def test_int_column_widens_to_float(tmp_path, suffix):
+    batches = [pd.DataFrame({"v": [1, 2]}), pd.DataFrame({"v": [3.5]})]
+    path = str(tmp_path / f"out{suffix}")
+    assert export_batches(iter(batches), path) == 3
+    assert _read(path)["v"].tolist() == [1.0, 2.0, 3.5]
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+def test_mixed_type_columns_become_text(tmp_path, suffix):
+    batches = [pd.DataFrame({"v": [1, 2], "w": pd.Series([1, "x"], dtype=object)}),
+               pd.DataFrame({"v": pd.Series(["x", 3], dtype=object), "w": pd.Series([2.5, None], dtype=object)})]
+    path = str(tmp_path / f"out{suffix}")
+    assert export_batches(iter(batches), path) == 4
+    df = _read(path)
+    assert df["v"].tolist() == ["1", "2", "x", "3"]
+    assert df["w"].tolist()[:3] == ["1", "x", "2.5"] and df["w"].isna().tolist()[3]
+
+
+def test_sqlite_export_round_trip(tmp_path):
+    db = tmp_path / "t.sqlite"
+    with sqlite3.connect(db) as conn:
+        conn.execute("CREATE TABLE t (id INTEGER, note TEXT)")
+        conn.executemany("INSERT INTO t VALUES (?, ?)", [(i, None if i < 5 else f"n{i}") for i in range(10)])
+    path = str(tmp_path / "out.parquet")
+    assert export_batches(iter_sqlite_batches(str(db), "SELECT * FROM t ORDER BY id", batch_rows=3), path) == 10
+    assert _read(path)["note"].tolist()[5:] == [f"n{i}" for i in range(5, 10)]
+
+
+def test_csv_export_and_cancel_leaves_no_file(tmp_path):
+    path = tmp_path / "out.csv"
+    export_batches(iter([pd.DataFrame({"a": [1, 2]})]), str(path))
+    assert path.read_text().splitlines() == ["a", "1", "2"]
+
+    cancelled = threading.Event()
+    cancelled.set()
+    with pytest.raises(ExportCancelled):
+        export_batches(iter([pd.DataFrame({"a": [1]})]), str(tmp_path / "gone.csv"), cancel_event=cancelled)
+    assert not (tmp_path / "gone.csv").exists() and not (tmp_path / "gone.csv.part").exists()
+
+
+def test_new_export_does_not_undo_cancel(tmp_path):
+    background = BackgroundExporter(max_workers=2)
+    release = threading.Event()
+
+    def slow_batches():
+        release.wait(5)
+        yield pd.DataFrame({"a": [1]})
+
+    first = background.submit(slow_batches, str(tmp_path / "first.csv"))
+    background.cancel()
+    second = background.submit(lambda: iter([pd.DataFrame({"a": [2]})]), str(tmp_path / "second.csv"))
+    release.set()
+    with pytest.raises(ExportCancelled):
+        first.result(5)
+    assert second.result(5) == 1
+    background.shutdown()
@@ -0,0 +1,52 @@
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+
+from file_handler import read_data_file, read_data_file_chunks, suggest_table_name
+
+TABLE = pa.table({"Order ID": [1, 2, 3, 4, 5], "unit-price": [1.5, 2.0, None, 4.25, 5.0]})
+
+
+def _write(tmp_path, name):
+    path = tmp_path / name
+    if name.endswith(".parquet"):
+        pq.write_table(TABLE, path, row_group_size=2)
+    elif name.endswith(".csv"):
+        TABLE.to_pandas().to_csv(path, index=False)
+    else:
+        with pa.ipc.new_file(str(path), TABLE.schema) as writer:
+            writer.write_table(TABLE, max_chunksize=3)
+    return str(path)
+
+
+def test_columnar_files_stream_as_sanitized_arrow_batches(tmp_path):
+    for name in ("sales data.parquet", "sales data.arrow"):
+        chunks, table_name = read_data_file_chunks(_write(tmp_path, name), chunk_rows=2)
+        batches = list(chunks)
+        assert table_name == "sales_data_table"
+        assert all(isinstance(batch, pa.RecordBatch) and batch.num_rows <= 2 for batch in batches)
+        assert all(batch.schema.names == ["Order_ID", "unit_price"] for batch in batches)
+        merged = pa.Table.from_batches(batches)
+        assert merged.column("Order_ID").to_pylist() == [1, 2, 3, 4, 5]
+        assert merged.column("unit_price").to_pylist() == [1.5, 2.0, None, 4.25, 5.0]
+
+
+def test_csv_streams_as_dataframes(tmp_path):
+    chunks, _ = read_data_file_chunks(_write(tmp_path, "sales.csv"), chunk_rows=2)
+    frames = list(chunks)
+    assert [len(frame) for frame in frames] == [2, 2, 1]
+    assert list(frames[0].columns) == ["Order_ID", "unit_price"]
+
+
+def test_read_whole_columnar_file(tmp_path):
+    df, table_name = read_data_file(_write(tmp_path, "sales.arrow"))
+    assert table_name == "sales_table"
+    assert list(df.columns) == ["Order_ID", "unit_price"]
+    assert df["Order_ID"].tolist() == [1, 2, 3, 4, 5]
+
+
+def test_unsupported_and_missing_files(tmp_path):
+    (tmp_path / "notes.txt").write_text("x")
+    assert read_data_file_chunks(str(tmp_path / "notes.txt")) == (None, None)
+    assert read_data_file(str(tmp_path / "missing.csv")) == (None, None)
+    assert suggest_table_name("/x/2024 Q1-report.xlsx") == "2024_Q1_report_table"
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from headless_runner import HeadlessRunner, main
+
+
+def _write_csv(path, rows):
+    path.write_text("id,v\n" + "".join(f"{i},{v}\n" for i, v in rows))
+
+
+def _run(tmp_path, steps):
+    job = tmp_path / "job.json"
+    job.write_text(json.dumps({"database": "job.sqlite", "steps": steps}))
+    return main([str(job)])
+
+
+def _rows(tmp_path, sql):
+    import sqlite3
+
+    with sqlite3.connect(tmp_path / "job.sqlite") as conn:
+        return conn.execute(sql).fetchall()
+
+
+@pytest.mark.parametrize("key", [None, "id"])
+def test_incremental_union_keeps_rows_from_every_file(tmp_path, key):
+    # Same file name in two folders: each needs its own source_file tag.
+    for year in ("2024", "2025"):
+        (tmp_path / "daily" / year).mkdir(parents=True)
+    _write_csv(tmp_path / "daily" / "2024" / "orders.csv", [(1, "a"), (2, "b")])
+    _write_csv(tmp_path / "daily" / "2025" / "orders.csv", [(3, "c"), (4, "d")])
+    step = {"id": "daily", "type": "ingest", "path": "daily/**/*.csv", "union_table": "daily", "incremental": True}
+    if key:
+        step["key"] = key
+
+    assert _run(tmp_path, [step]) == 0
+    assert _rows(tmp_path, "SELECT id, v, source_file FROM daily ORDER BY id") == [
+        (1, "a", "2024/orders.csv"), (2, "b", "2024/orders.csv"), (3, "c", "2025/orders.csv"), (4, "d", "2025/orders.csv")]
+
+    # A row removed from one file is deleted; the other file's rows are untouched.
+    _write_csv(tmp_path / "daily" / "2025" / "orders.csv", [(3, "c")])
+    assert _run(tmp_path, [step]) == 0
+    assert _rows(tmp_path, "SELECT id FROM daily ORDER BY id") == [(1,), (2,), (3,)]
+
+
+def test_failed_dependency_skips_dependents(tmp_path):
+    _write_csv(tmp_path / "a.csv", [(1, "a")])
+    runner = HeadlessRunner({"database": str(tmp_path / "job.sqlite"), "steps": [
+        {"id": "load", "type": "ingest", "path": "a.csv", "table": "a"},
+        {"id": "bad", "type": "sql", "sql": "SELECT * FROM missing_table", "depends_on": ["load"]},
+        {"id": "after", "type": "sql", "sql": "SELECT 1", "depends_on": ["bad"]},
+        {"id": "dump", "type": "export", "table": "a", "path": "out/a.csv", "depends_on": ["load"]},
+    ]}, base_dir=str(tmp_path))
+    statuses = {result.step_id: result.status for result in runner.run()}
+    assert statuses == {"load": "ok", "bad": "failed", "after": "skipped", "dump": "ok"}
+    assert (tmp_path / "out" / "a.csv").read_text().splitlines() == ["id,v", "1,a"]
+
+
+@pytest.mark.parametrize("steps", [
+    [{"id": "a", "type": "sql", "sql": "SELECT 1", "depends_on": ["b"]},
+     {"id": "b", "type": "sql", "sql": "SELECT 1", "depends_on": ["a"]}],
+    [{"id": "a", "type": "sql", "sql": "SELECT 1"}, {"id": "a", "type": "sql", "sql": "SELECT 2"}],
+    [{"id": "a", "type": "sql", "sql": "SELECT 1", "depends_on": ["nope"]}],
+    [{"id": "a", "type": "teleport"}],
+])
+def test_invalid_jobs_are_rejected(tmp_path, steps):
+    assert _run(tmp_path, steps) == 2
+
+
+def test_step_fails_cleanly_when_the_assistant_cannot_be_built(tmp_path, monkeypatch):
+    import assistant_cli
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("no model configured")
+
+    monkeypatch.setattr(assistant_cli, "SQLAssistant", broken)
+    runner = HeadlessRunner({"database": str(tmp_path / "job.sqlite"), "steps": [{"id": "q", "type": "sql", "sql": "SELECT 1"}]})
+    [result] = runner.run()
+    assert (result.status, result.error) == ("failed", "RuntimeError: no model configured")
+
+
+def test_incremental_failure_names_the_file(tmp_path):
+    _write_csv(tmp_path / "a.csv", [(1, "a")])
+    runner = HeadlessRunner({"database": str(tmp_path / "job.sqlite"), "steps": [
+        {"id": "sync", "type": "ingest", "path": "a.csv", "incremental": True, "key": "missing"}]}, base_dir=str(tmp_path))
+    [result] = runner.run()
+    assert result.status == "failed" and "a.csv: " in result.error and "missing" in result.error
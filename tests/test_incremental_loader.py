@@ -0,0 +1,83 @@
+import os
+import sqlite3
+
+import pytest
+
+from database_manager import DatabaseManager
+from incremental_loader import IncrementalLoader
+
+
+@pytest.fixture
+def loader(tmp_path):
+    db = DatabaseManager(str(tmp_path / "t.sqlite"))
+    assert db.connect()
+    yield IncrementalLoader(db)
+    db.close()
+
+
+def _rows(loader, sql):
+    return [tuple(row) for row in loader.db_mgr.conn.execute(sql)]
+
+
+def _touch_later(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_keyed_sync_updates_inserts_and_deletes(tmp_path, loader):
+    path = tmp_path / "data.csv"
+    path.write_text("id,v\n1,a\n2,b\n3,c\n")
+    first = loader.sync_file(str(path), "data", ["id"])
+    assert (first.rows, first.written, first.deleted) == (3, 3, 0)
+
+    path.write_text("id,v\n1,a\n2,B\n4,d\n")
+    _touch_later(path)
+    second = loader.sync_file(str(path), "data", ["id"])
+    assert (second.rows, second.written, second.deleted) == (3, 2, 1)
+    assert _rows(loader, "SELECT id, v FROM data ORDER BY id") == [(1, "a"), (2, "B"), (4, "d")]
+
+
+def test_unchanged_file_is_skipped(tmp_path, loader):
+    path = tmp_path / "data.csv"
+    path.write_text("id,v\n1,a\n")
+    loader.sync_file(str(path), "data", ["id"])
+    assert loader.sync_file(str(path), "data", ["id"]).status == "unchanged"
+    _touch_later(path)
+    assert loader.sync_file(str(path), "data", ["id"]).status == "unchanged"
+
+
+def test_int_reparsed_as_float_is_not_a_change(tmp_path, loader):
+    path = tmp_path / "data.csv"
+    path.write_text("id,v\n1,10\n2,20\n")
+    loader.sync_file(str(path), "data", ["id"])
+
+    # The new NULL makes pandas read v as float64, so 10 comes back as 10.0.
+    path.write_text("id,v\n1,10\n2,20\n3,\n")
+    result = loader.sync_file(str(path), "data", ["id"])
+    assert (result.written, result.deleted) == (1, 0)
+
+
+def test_hash_mode_keeps_duplicate_rows(tmp_path, loader):
+    path = tmp_path / "data.csv"
+    path.write_text("a,b\nx,1\nx,1\ny,2\n")
+    loader.sync_file(str(path), "data")
+    path.write_text("a,b\nx,1\nx,1\nz,3\n")
+    result = loader.sync_file(str(path), "data", force=True)
+    assert (result.written, result.deleted) == (1, 1)
+    assert _rows(loader, "SELECT a, b FROM data ORDER BY a") == [("x", 1), ("x", 1), ("z", 3)]
+
+
+def test_source_column_scopes_deletes_to_one_file(tmp_path, loader):
+    for folder, value in (("one", "a"), ("two", "b")):
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / "orders.csv").write_text(f"id,v\n1,{value}\n")
+        assert loader.sync_file(str(tmp_path / folder / "orders.csv"), "daily", ["id"], source_column="source_file",
+                                source_label=f"{folder}/orders.csv").ok
+    assert _rows(loader, "SELECT source_file, id, v FROM daily ORDER BY source_file") == [
+        ("one/orders.csv", 1, "a"), ("two/orders.csv", 1, "b")]
+
+    # Without a label, rows are tagged with the absolute path, which is unique too.
+    (tmp_path / "orders.csv").write_text("id,v\n1,c\n")
+    assert loader.sync_file(str(tmp_path / "orders.csv"), "daily", ["id"], source_column="source_file").ok
+    assert _rows(loader, "SELECT COUNT(*) FROM daily") == [(3,)]
+    assert _rows(loader, "SELECT source_file FROM daily WHERE v = 'c'") == [(str(tmp_path / "orders.csv"),)]
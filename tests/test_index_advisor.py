@@ -0,0 +1,43 @@
+import pytest
+
+from database_manager import DatabaseManager
+from index_advisor import IndexAdvisor
+
+QUERY = "SELECT b FROM t WHERE a = 5"
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "t.sqlite"))
+    assert db.connect()
+    db.conn.execute("CREATE TABLE t (a INTEGER, b TEXT)")
+    db.conn.executemany("INSERT INTO t VALUES (?, ?)", [(i % 50, f"v{i}") for i in range(2000)])
+    db.conn.commit()
+    yield db
+    db.close()
+
+
+def test_auto_create_does_not_rerun_the_query(db):
+    advisor = IndexAdvisor(db, auto_create=True, min_occurrences=2, min_total_seconds=0, min_query_seconds=0)
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    advisor.observe(QUERY, None, 0.04)
+    advisor.observe(QUERY, None, 0.06)
+    db.conn.set_trace_callback(None)
+
+    assert QUERY not in statements
+    [entry] = advisor.created
+    assert entry["columns"] == ["a", "b"] and entry["plan_uses_index"] is True
+    assert (entry["before_ms"], entry["after_ms"]) == (50.0, None)
+
+    # The next real run of the sample query supplies the "after" time.
+    advisor.observe(QUERY, None, 0.002)
+    assert (entry["after_ms"], entry["speedup"]) == (2.0, 25.0)
+
+
+def test_recommended_ddl_quotes_identifiers(db):
+    advisor = IndexAdvisor(db, min_query_seconds=0)
+    advisor.observe(QUERY, None, 0.01)
+    [rec] = advisor.recommendations()
+    assert rec["ddl"] == 'CREATE INDEX IF NOT EXISTS "idx_auto_t_a_b" ON "t" ("a", "b");'
+    db.conn.execute(rec["ddl"])
@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+
+from llm_executor import LLMExecutor, LLMJobCancelled
+
+
+@pytest.fixture
+def release():
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def test_hung_calls_do_not_starve_new_calls(release):
+    executor = LLMExecutor(max_workers=2, timeout=0.2, retries=0)
+    hung = [executor.submit(f"hung {i}", release.wait, 10) for i in range(4)]
+    for job in hung:
+        with pytest.raises(TimeoutError):
+            job.result()
+    assert executor.submit("fast", lambda: 42).result() == 42
+    executor.shutdown()
+
+
+def test_timeout_starts_when_the_call_starts(release):
+    executor = LLMExecutor(max_workers=1, timeout=0.5, retries=0)
+    executor._call_workers = 1
+    executor._call_pool = executor._new_call_pool()
+    # Occupy the only call thread outside the executor for longer than the timeout.
+    blocker = executor._call_pool.submit(time.sleep, 0.7)
+    assert executor.submit("queued", lambda: "ran").result() == "ran"
+    blocker.result()
+    executor.shutdown()
+
+
+def test_retry_if_retries_then_returns_last_result():
+    executor = LLMExecutor(max_workers=1, timeout=1, retries=2, backoff=0.01)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        return None if len(calls) < 2 else "ok"
+
+    assert executor.submit("flaky", flaky, retry_if=lambda result: result is None).result() == "ok"
+    assert len(calls) == 2
+    executor.shutdown()
+
+
+def test_cancel_stops_waiting(release):
+    executor = LLMExecutor(max_workers=1, timeout=10, retries=0)
+    job = executor.submit("slow", release.wait, 10)
+    time.sleep(0.05)
+    job.cancel()
+    with pytest.raises(LLMJobCancelled):
+        job.result()
+    executor.shutdown()
@@ -0,0 +1,58 @@
+import pytest
+
+from database_manager import DatabaseManager
+from nl_query_cache import NLQueryCache
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "t.sqlite"))
+    assert db.connect()
+    db.conn.execute("CREATE TABLE sales (region TEXT, amount REAL)")
+    db.conn.commit()
+    yield db
+    db.close()
+
+
+def test_hit_ignores_case_whitespace_and_punctuation(db):
+    cache = NLQueryCache(db)
+    cache.put("sales", "Total by region?", "SELECT region, SUM(amount) FROM sales GROUP BY region")
+    assert cache.get("sales", "  total   BY region ") == "SELECT region, SUM(amount) FROM sales GROUP BY region"
+    assert cache.get("sales", "total by month") is None
+
+
+def test_schema_change_invalidates(db):
+    cache = NLQueryCache(db)
+    cache.put("sales", "total", "SELECT SUM(amount) FROM sales")
+    db.execute_query("ALTER TABLE sales ADD COLUMN month TEXT", is_ddl_dml=True, show_code=False)
+    assert cache.get("sales", "total") is None
+
+
+def test_least_recently_used_entries_are_evicted(db):
+    cache = NLQueryCache(db, max_entries=2)
+    cache.put("sales", "q1", "SELECT 1")
+    cache.put("sales", "q2", "SELECT 2")
+    cache.get("sales", "q1")
+    cache.put("sales", "q3", "SELECT 3")
+    assert [cache.get("sales", q) for q in ("q1", "q2", "q3")] == ["SELECT 1", None, "SELECT 3"]
+
+
+def test_column_type_change_invalidates(db):
+    cache = NLQueryCache(db)
+    cache.put("sales", "big sales", "SELECT * FROM sales WHERE amount > '100'")
+    db.conn.executescript("DROP TABLE sales; CREATE TABLE sales (region TEXT, amount INTEGER);")
+    assert cache.get("sales", "big sales") is None
+
+
+def test_misses_write_nothing_and_put_cleans_up(db):
+    cache = NLQueryCache(db, ttl_seconds=60)
+    cache.put("sales", "old", "SELECT 1")
+    db.conn.execute(f"UPDATE {NLQueryCache.TABLE_NAME} SET created_at = created_at - 120")
+    db.conn.commit()
+
+    changes = db.conn.total_changes
+    assert cache.get("sales", "old") is None and cache.get("sales", "other") is None
+    assert db.conn.total_changes == changes
+
+    cache.put("sales", "new", "SELECT 2")
+    assert [row[0] for row in db.conn.execute(f"SELECT question FROM {NLQueryCache.TABLE_NAME}")] == ["new"]
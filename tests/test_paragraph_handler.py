@@ -0,0 +1,42 @@
+from paragraph_handler import ParagraphHandler
+from virtual_table import StreamingRowSource
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    # Answers each chunk with a one-row table for the name the chunk mentions.
+    def generate_content(self, prompt):
+        name = "Ada" if "Ada" in prompt else "Bob"
+        header = "| Name | Age |" if name == "Ada" else "| name | Age | City |"
+        row = "| Ada | 36 |" if name == "Ada" else "| Bob | 41 | Oslo |"
+        return FakeResponse(f"{header}\n|---|---|\n{row}\n")
+
+    def generate_content_stream(self, prompt):
+        yield self.generate_content(prompt).text
+
+
+def test_chunked_paragraph_streams_into_sink_and_finishes():
+    handler = ParagraphHandler(model=FakeModel(), chunk_token_budget=12)
+    paragraph = "Ada is 36 years old and writes programs.\n\nBob is 41 years old and lives in Oslo."
+    sink = StreamingRowSource()
+    df = handler.paragraph_to_table(paragraph, chunked=True, row_sink=sink)
+
+    assert sink.exhausted
+    assert sink.columns == ["Name", "Age", "City"]
+    assert sorted(sink.rows(0, len(sink))) == sorted(df.fillna("").itertuples(index=False, name=None))
+    assert sorted(df["Name"]) == ["Ada", "Bob"]
+
+
+def test_failed_stream_still_finishes_sink():
+    class BrokenModel(FakeModel):
+        def generate_content_stream(self, prompt):
+            raise ConnectionError("network down")
+            yield
+
+    sink = StreamingRowSource()
+    assert ParagraphHandler(model=BrokenModel()).paragraph_to_table("Ada is 36.", row_sink=sink) is None
+    assert sink.exhausted
@@ -0,0 +1,68 @@
+import pytest
+
+from database_manager import DatabaseManager
+from query_result_cache import QueryResultCache
+
+
+@pytest.mark.parametrize("sql, verb", [
+    ("SELECT * FROM t", "SELECT"),
+    ("with x as (select 1) delete from t where a in (select * from x)", "DELETE"),
+    ("WITH x AS (SELECT 1) UPDATE t SET a = 2", "UPDATE"),
+    ("WITH a AS (SELECT 1), b AS (SELECT 2) INSERT INTO t SELECT * FROM a", "INSERT"),
+    ("WITH RECURSIVE c(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM c WHERE n < 3) SELECT n FROM c", "SELECT"),
+    ("WITH x AS (SELECT 'delete' AS \"update\") SELECT * FROM x", "SELECT"),
+    ("-- report\nSELECT 1", "SELECT"),
+])
+def test_statement_verb_looks_past_ctes(sql, verb):
+    assert QueryResultCache.statement_verb(sql) == verb
+    assert QueryResultCache.is_read(sql) == (verb == "SELECT")
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "t.sqlite"))
+    assert db.connect()
+    db.execute_query("CREATE TABLE t (a INTEGER)", is_ddl_dml=True, show_code=False)
+    db.execute_query("INSERT INTO t VALUES (1), (2), (3)", is_ddl_dml=True, show_code=False)
+    yield db
+    db.close()
+
+
+def test_cte_write_invalidates_cached_results(db):
+    assert len(db.execute_query("SELECT a FROM t", fetch_all=True, show_code=False)) == 3
+    db.execute_query("WITH doomed AS (SELECT 1 AS a) DELETE FROM t WHERE a IN (SELECT a FROM doomed)", is_ddl_dml=True, show_code=False)
+    assert db.execute_query("SELECT a FROM t", fetch_all=True, show_code=False)["a"].tolist() == [2, 3]
+
+
+def test_smaller_max_rows_is_not_served_a_larger_cached_result(db):
+    assert len(db.execute_query("SELECT a FROM t", fetch_all=True, show_code=False)) == 3
+    capped = db.execute_query("SELECT a FROM t", fetch_all=True, show_code=False, max_rows=2)
+    assert len(capped) == 2 and capped.attrs.get("truncated")
+
+
+def test_repeated_read_is_a_cache_hit(db):
+    db.execute_query("SELECT a FROM t", fetch_all=True, show_code=False)
+    db.execute_query("select  a from t;", fetch_all=True, show_code=False)
+    assert db.result_cache.hits == 1
+
+
+@pytest.mark.parametrize("one, other", [
+    ('SELECT "A  B" FROM t', 'SELECT "A B" FROM t'),
+    ("SELECT * FROM t WHERE name = 'Bob'", "SELECT * FROM t WHERE name = 'bob'"),
+    ('SELECT * FROM t WHERE name = "Bob"', 'SELECT * FROM t WHERE name = "bob"'),
+    ("SELECT [Col  X] FROM t", "SELECT [Col X] FROM t"),
+])
+def test_quoted_text_is_not_normalized(one, other):
+    assert QueryResultCache.normalize_sql(one) != QueryResultCache.normalize_sql(other)
+
+
+def test_text_outside_quotes_and_comments_is_normalized():
+    assert QueryResultCache.normalize_sql("SELECT  a /* it's */\nFROM T -- done;\n WHERE b = 'X';") == \
+        QueryResultCache.normalize_sql("select a from t where b = 'X'")
+
+
+def test_quoted_identifiers_get_their_own_results(db):
+    db.execute_query('CREATE TABLE q ("A  B" TEXT, "A B" TEXT)', is_ddl_dml=True, show_code=False)
+    db.execute_query("INSERT INTO q VALUES ('two spaces', 'one space')", is_ddl_dml=True, show_code=False)
+    assert db.execute_query('SELECT "A  B" FROM q', fetch_all=True, show_code=False).iloc[0, 0] == "two spaces"
+    assert db.execute_query('SELECT "A B" FROM q', fetch_all=True, show_code=False).iloc[0, 0] == "one space"
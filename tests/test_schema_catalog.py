@@ -0,0 +1,26 @@
+import pytest
+
+from database_manager import DatabaseManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "t.sqlite"))
+    assert db.connect()
+    db.execute_query("CREATE TABLE sales (Region TEXT, Amount REAL)", is_ddl_dml=True, show_code=False)
+    yield db
+    db.close()
+
+
+def test_lookups_ignore_case(db):
+    for name in ("sales", "Sales", "SALES"):
+        assert db.table_exists(name)
+        assert db.catalog.table(name).name == "sales"
+    assert "Region TEXT" in db.describe_table("Sales")
+
+
+def test_table_names_keep_declared_spelling_and_follow_schema_changes(db):
+    db.execute_query("CREATE TABLE MixedCase (a INTEGER)", is_ddl_dml=True, show_code=False)
+    assert db.catalog.table_names() == ["sales", "MixedCase"]
+    db.execute_query("DROP TABLE mixedcase", is_ddl_dml=True, show_code=False)
+    assert db.catalog.table_names() == ["sales"]
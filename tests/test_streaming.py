@@ -0,0 +1,79 @@
+import threading
+import time
+
+from llm_executor import LLMExecutor
+from paragraph_handler import ParagraphHandler
+from stream_parsers import JsonArrayStream, MarkdownTableStream
+from virtual_table import StreamingRowSource
+
+
+def test_markdown_rows_split_across_chunks():
+    parser = MarkdownTableStream()
+    text = "| a | b |\n|---|---|\n| 1 | 2 |\n| 3 | 4 |"
+    rows = []
+    for i in range(0, len(text), 5):
+        rows += parser.feed(text[i:i + 5])
+    rows += parser.finish()
+    assert parser.valid and parser.headers == ["a", "b"]
+    assert rows == [["1", "2"], ["3", "4"]]
+
+
+def test_markdown_without_table_is_invalid():
+    parser = MarkdownTableStream()
+    parser.feed("no table here\n")
+    parser.finish()
+    assert not parser.valid
+
+
+def test_json_array_elements_split_across_chunks():
+    parser = JsonArrayStream()
+    text = '[{"a": "x, ]"}, {"a": "y\\"z"}, 3, "s", [1, 2]]'
+    elements = []
+    for i in range(0, len(text), 4):
+        elements += parser.feed(text[i:i + 4])
+    assert elements == [{"a": "x, ]"}, {"a": 'y"z'}, 3, "s", [1, 2]]
+
+
+def test_stale_attempt_and_closed_source_are_ignored():
+    source = StreamingRowSource()
+    first = source.attempt()
+    first.extend(["a"], [(1,)])
+    second = source.attempt()
+    first.extend(["a"], [("stale",)])
+    first.finish()
+    assert len(source) == 0 and not source.exhausted
+    second.extend(["a"], [(2,)])
+    source.close()
+    second.extend(["a"], [("late",)])
+    assert source.rows(0, 10) == [(2,)] and source.exhausted
+
+
+class SlowThenFastModel:
+    # The first attempt stalls past the timeout and then keeps streaming; the retry answers at once.
+    def __init__(self):
+        self.calls = 0
+        self.stale_done = threading.Event()
+
+    def generate_content_stream(self, prompt):
+        self.calls += 1
+        if self.calls == 1:
+            yield "| Name |\n|---|\n"
+            time.sleep(0.6)
+            yield "| stale |\n"
+            self.stale_done.set()
+        else:
+            yield "| Name |\n|---|\n| fresh |\n"
+
+
+def test_timed_out_attempt_cannot_write_into_retry():
+    model = SlowThenFastModel()
+    handler = ParagraphHandler(model=model)
+    executor = LLMExecutor(max_workers=1, timeout=0.3, retries=1, backoff=0.01)
+    source = StreamingRowSource()
+    job = executor.submit("paragraph", handler.paragraph_to_table, "Ann", row_sink=source, chunked=False,
+                          retry_if=lambda result: result is None)
+    df = job.result()
+    assert model.stale_done.wait(2)
+    assert df["Name"].tolist() == ["fresh"]
+    assert source.rows(0, 10) == [("fresh",)]
+    executor.shutdown()
@@ -0,0 +1,52 @@
+import pytest
+
+from database_manager import DatabaseManager
+from table_copier import BatchedTableCopier
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "t.sqlite"))
+    assert db.connect()
+    db.conn.execute("CREATE TABLE src (id INTEGER, grp TEXT)")
+    db.conn.executemany("INSERT INTO src VALUES (?, ?)", [(i, "even" if i % 2 == 0 else "odd") for i in range(1, 101)])
+    # Gaps in rowid must not shrink batches or skip rows.
+    db.conn.execute("DELETE FROM src WHERE id BETWEEN 40 AND 60")
+    db.conn.commit()
+    yield db
+    db.close()
+
+
+def _ids(conn, table):
+    return [row[0] for row in conn.execute(f"SELECT id FROM {table} ORDER BY id")]
+
+
+def test_filtered_copy(db):
+    job = BatchedTableCopier(db, batch_size=7).start("src", "evens", where_clause="grp = 'even'")
+    assert job.status == "done"
+    expected = [i for i in range(2, 101, 2) if not 40 <= i <= 60]
+    assert _ids(db.conn, "evens") == expected and job.rows_copied == len(expected)
+    assert len(_ids(db.conn, "src")) == 79
+
+
+def test_paused_move_resumes_without_duplicates(db):
+    copier = BatchedTableCopier(db, batch_size=10)
+    job = copier.start("src", "dest", move=True, progress_callback=lambda copied, total, rate: copier.cancel())
+    assert job.status == "paused" and job.rows_copied == 10
+    assert [pending.job_id for pending in copier.pending_jobs()] == [job.job_id]
+
+    job = copier.resume(job.job_id)
+    assert job.status == "done" and job.rows_copied == 79
+    assert _ids(db.conn, "dest") == [i for i in range(1, 101) if not 40 <= i <= 60]
+    assert _ids(db.conn, "src") == []
+    assert copier.pending_jobs() == []
+
+
+def test_copy_into_another_database(tmp_path, db):
+    import sqlite3
+
+    other = tmp_path / "other.sqlite"
+    job = BatchedTableCopier(db, batch_size=25).start("src", "archived", dest_db=str(other))
+    assert job.status == "done"
+    with sqlite3.connect(other) as conn:
+        assert len(_ids(conn, "archived")) == 79
@@ -0,0 +1,227 @@
+import threading
+
+# pandas is not imported here: this module is on the path that opens the window at startup.
+class DataFrameRowSource:
+    def __init__(self, df):
+        self.df = df
+        self.columns = list(df.columns)
+        self.exhausted = True
+
+    def __len__(self):
+        return len(self.df)
+
+    def ensure(self, count):
+        pass
+
+    def rows(self, start, stop):
+        return list(self.df.iloc[start:stop].itertuples(index=False, name=None))
+
+
+class IteratorRowSource:
+    # Rows are pulled from the batch iterator only as far as the user has scrolled,
+    # so a live cursor is never drained up front.
+    def __init__(self, columns, batches):
+        self.columns = list(columns)
+        self._batches = iter(batches)
+        self._rows = []
+        self.exhausted = False
+
+    def __len__(self):
+        return len(self._rows)
+
+    def ensure(self, count):
+        while not self.exhausted and len(self._rows) < count:
+            batch = next(self._batches, None)
+            if batch is None:
+                self.exhausted = True
+                break
+            if hasattr(batch, "itertuples"):
+                self._rows.extend(batch.itertuples(index=False, name=None))
+            else:
+                self._rows.extend(tuple(row) for row in batch)
+
+    def rows(self, start, stop):
+        self.ensure(stop)
+        return self._rows[start:stop]
+
+
+class StreamingRowSource:
+    # Filled by a worker thread while the Tk thread renders it. Rows only grow until reset()
+    # (a retried request starts over), and columns may grow as later rows bring new keys.
+    def __init__(self, on_change=None):
+        self.columns = []
+        self._rows = []
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.exhausted = False
+        self.on_change = on_change
+
+    def __len__(self):
+        return len(self._rows)
+
+    def ensure(self, count):
+        pass
+
+    def rows(self, start, stop):
+        with self._lock:
+            width = len(self.columns)
+            return [row + ("",) * (width - len(row)) for row in self._rows[start:stop]]
+
+    def attempt(self):
+        # Each request attempt writes through its own handle. Starting a new attempt (a retry) or
+        # closing the source turns older handles into no-ops, so an abandoned call that is still
+        # streaming can no longer interleave its rows with the retry's.
+        with self._lock:
+            self._generation += 1
+            self.columns, self._rows, self.exhausted = [], [], False
+            generation = self._generation
+        self._notify(True)
+        return _StreamAttempt(self, generation)
+
+    def close(self):
+        # Cancelled or failed job: whatever its worker still sends is dropped.
+        with self._lock:
+            self._generation += 1
+            self.exhausted = True
+        self._notify(False)
+
+    def reset(self):
+        self._reset(None)
+
+    def extend(self, columns, rows):
+        self._extend(None, columns, rows)
+
+    def finish(self):
+        self._finish(None)
+
+    def _reset(self, generation):
+        with self._lock:
+            if generation not in (None, self._generation):
+                return
+            self.columns, self._rows, self.exhausted = [], [], False
+        self._notify(True)
+
+    def _extend(self, generation, columns, rows):
+        with self._lock:
+            if generation not in (None, self._generation):
+                return
+            columns_changed = list(columns) != self.columns
+            if columns_changed:
+                self.columns = list(columns)
+            self._rows.extend(tuple(row) for row in rows)
+        self._notify(columns_changed)
+
+    def _finish(self, generation):
+        with self._lock:
+            if generation not in (None, self._generation):
+                return
+            self.exhausted = True
+        self._notify(False)
+
+    def _notify(self, columns_changed):
+        if self.on_change:
+            self.on_change(self, columns_changed)
+
+
+class _StreamAttempt:
+    def __init__(self, source, generation):
+        self.source = source
+        self.generation = generation
+
+    def reset(self):
+        self.source._reset(self.generation)
+
+    def extend(self, columns, rows):
+        self.source._extend(self.generation, columns, rows)
+
+    def finish(self):
+        self.source._finish(self.generation)
+
+
+class VirtualTreeview:
+    def __init__(self, tree, scrollbar, row_height=25, buffer_rows=40, on_window_change=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.row_height = row_height
+        self.buffer_rows = buffer_rows
+        self.on_window_change = on_window_change
+        self.source = None
+        self.offset = 0
+        self._block_start = 0
+        self._block_len = 0
+
+        self.scrollbar.config(command=self._on_scrollbar)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_by(3))
+        self.tree.bind("<Configure>", lambda e: self._render(force=True))
+
+    def set_source(self, source):
+        self.source = source
+        self.offset = 0
+        self._block_len = 0
+        self.tree.delete(*self.tree.get_children())
+        self._render(force=True)
+
+    def refresh(self):
+        self._render(force=True)
+
+    def _visible_rows(self):
+        height = self.tree.winfo_height()
+        if height <= 1:
+            return 30
+        return max(1, (height - self.row_height) // self.row_height)
+
+    def _total_rows(self, visible):
+        total = len(self.source)
+        # While a live source is still streaming, leave room below so the scrollbar keeps going.
+        return total if self.source.exhausted else total + visible
+
+    def _on_mousewheel(self, event):
+        self._scroll_by(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if self.source is None:
+            return
+        visible = self._visible_rows()
+        if action == "moveto":
+            self.offset = int(float(amount) * self._total_rows(visible))
+            self._render()
+        elif action == "scroll":
+            step = visible if unit == "pages" else 1
+            self._scroll_by(int(amount) * step)
+
+    def _scroll_by(self, delta_rows):
+        if self.source is None:
+            return "break"
+        self.offset += delta_rows
+        self._render()
+        return "break"
+
+    def _render(self, force=False):
+        if self.source is None:
+            return
+        visible = self._visible_rows()
+        self.source.ensure(self.offset + visible + self.buffer_rows)
+        total = len(self.source)
+        self.offset = max(0, min(self.offset, total - visible))
+
+        block_end = self._block_start + self._block_len
+        in_block = self._block_start <= self.offset and self.offset + visible <= block_end
+        if force or not in_block:
+            self._block_start = max(0, self.offset - self.buffer_rows)
+            rows = self.source.rows(self._block_start, self.offset + visible + self.buffer_rows)
+            self._block_len = len(rows)
+            self.tree.delete(*self.tree.get_children())
+            for values in rows:
+                self.tree.insert("", "end", values=values)
+
+        if self._block_len:
+            self.tree.yview_moveto((self.offset - self._block_start) / self._block_len)
+
+        total_est = max(self._total_rows(visible), 1)
+        self.scrollbar.set(self.offset / total_est, min(1.0, (self.offset + visible) / total_est))
+        if self.on_window_change:
+            shown_to = min(self.offset + visible, total)
+            self.on_window_change(self.offset + 1 if total else 0, shown_to, total, self.source.exhausted)